@@ -4,8 +4,12 @@ DynoAgent - A dynamic role-based agent framework for complex task execution.
 
 from .core import DynoAgent
 from .dyno_agent_with_tools import DynoAgentWithTools
-from .task_complexity import TaskComplexityAnalyzer
+from .segments import SegmentedIndex
+from .task_complexity import ComplexityRuleSet, TaskComplexityAnalyzer
 from .team import Team
+from .token_budget import TokenBudgetEstimator
+from .tool_cache import ToolCache
+from .vector_index import VectorIndex
 
 __version__ = "0.1.0"
 __author__ = "izoon"
@@ -14,5 +18,10 @@ __all__ = [
     "DynoAgent",
     "Team",
     "TaskComplexityAnalyzer",
+    "ComplexityRuleSet",
+    "TokenBudgetEstimator",
+    "ToolCache",
+    "VectorIndex",
+    "SegmentedIndex",
     "DynoAgentWithTools",
 ]
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Marker for a missing entry, since None can be a cached value
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe mapping of bounded size that evicts the least recently used entry.
+    Entries can optionally expire after a time to live.
+    Counts hits and misses so that its effectiveness can be monitored.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize an empty cache.
+
+        Args:
+            maxsize: Maximum number of entries kept
+            ttl: Seconds an entry stays valid after it is stored; None keeps entries
+                until they are evicted
+            timer: Clock used for expiry
+        """
+        self._validate_maxsize(maxsize)
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        # Entries map keys to (value, expiry time or None)
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _validate_maxsize(maxsize: int) -> None:
+        if not isinstance(maxsize, int) or maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up an entry, marking it as most recently used.
+
+        Args:
+            key: Key of the entry
+            default: Value returned if there is no valid entry for the key
+
+        Returns:
+            The cached value, or default
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] is not None:
+                if entry[1] <= self._timer():
+                    del self._data[key]
+                    entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store an entry, evicting the least recently used one if the cache is full.
+
+        Args:
+            key: Key of the entry
+            value: Value to cache
+        """
+        expires = None if self.ttl is None else self._timer() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def resize(self, maxsize: int) -> None:
+        """
+        Change the maximum size, evicting least recently used entries if needed.
+
+        Args:
+            maxsize: New maximum number of entries
+        """
+        self._validate_maxsize(maxsize)
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self, reset_stats: bool = True) -> None:
+        """
+        Remove all entries.
+
+        Args:
+            reset_stats: Whether to also reset the hit and miss counters
+        """
+        with self._lock:
+            self._data.clear()
+            if reset_stats:
+                self.hits = 0
+                self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, hit_rate, size and maxsize
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Locks cannot be pickled, and expiry times of one process's clock mean
+        # nothing in another, so entries carry the seconds they have left instead
+        with self._lock:
+            state = self.__dict__.copy()
+            del state["_lock"]
+            now = self._timer()
+            state["_data"] = OrderedDict(
+                (key, (value, None if expires is None else expires - now))
+                for key, (value, expires) in self._data.items()
+            )
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        now = self._timer()
+        for key, (value, remaining) in self._data.items():
+            if remaining is not None:
+                self._data[key] = (value, now + remaining)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return False
+        return entry[1] is None or entry[1] > self._timer()
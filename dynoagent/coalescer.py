@@ -0,0 +1,133 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+# Function searching several queries at once for their top-k results
+BatchSearch = Callable[[Sequence[str], int], List[List[Dict[str, Any]]]]
+
+
+class QueryCoalescer:
+    """
+    Merges queries issued concurrently into batched searches.
+
+    Queries arriving within a short window of the first pending one are searched
+    together with a single batch search, which then answers each of them. It runs on
+    the event loop it is created on; threads outside the loop can submit queries
+    with query_threadsafe.
+    """
+
+    def __init__(
+        self,
+        search_batch: BatchSearch,
+        window: float = 0.002,
+        max_batch: int = 256,
+    ):
+        """
+        Initialize the coalescer on the running event loop.
+
+        Args:
+            search_batch: Function taking a list of queries and k, returning the
+                results of every query, best first
+            window: Seconds to wait for more queries after the first pending one
+            max_batch: Number of pending queries that triggers a search immediately
+        """
+        if window < 0:
+            raise ValueError("window must not be negative")
+        if not isinstance(max_batch, int) or max_batch <= 0:
+            raise ValueError("max_batch must be a positive integer")
+        self.search_batch = search_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._loop = asyncio.get_running_loop()
+        self._pending: List[Tuple[str, int, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Searches run on their own thread, so they neither block the event loop nor
+        # wait behind threads that are themselves waiting for query results
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._tasks: Set[asyncio.Task] = set()  # Keeps running tasks referenced
+        self.batches = 0
+        self.queries = 0
+
+    async def query(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search for a query as part of the next batch.
+
+        Args:
+            query: Query text
+            k: Maximum number of results
+
+        Returns:
+            The results of the query, best first
+        """
+        future = self._loop.create_future()
+        self._pending.append((query, k, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self.window, self._flush)
+        return await future
+
+    def query_threadsafe(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search for a query from a thread other than the event loop's, blocking until
+        its batch is done.
+
+        Args:
+            query: Query text
+            k: Maximum number of results
+
+        Returns:
+            The results of the query, best first
+        """
+        if self.in_loop_thread():
+            raise RuntimeError("query_threadsafe cannot be called on the event loop")
+        return asyncio.run_coroutine_threadsafe(
+            self.query(query, k), self._loop
+        ).result()
+
+    def in_loop_thread(self) -> bool:
+        """Check whether the current thread is running the coalescer's event loop."""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _flush(self) -> None:
+        """Start a batch search for all pending queries."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        queries = [query for query, _, _ in batch]
+        # The k best results for the largest k start with those for smaller ones
+        k = max(query_k for _, query_k, _ in batch)
+        self.batches += 1
+        self.queries += len(batch)
+        search = self._loop.run_in_executor(
+            self._executor, self.search_batch, queries, k
+        )
+        task = self._loop.create_task(self._resolve(batch, search))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(
+        self, batch: List[Tuple[str, int, asyncio.Future]], search: asyncio.Future
+    ) -> None:
+        """Wait for a batch search and resolve the futures of its queries."""
+        try:
+            results = await search
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, query_k, future), query_results in zip(batch, results):
+            if not future.done():
+                future.set_result(query_results[:query_k])
+
+    def close(self) -> None:
+        """Start searching any pending queries and release the search thread after."""
+        self._flush()
+        self._executor.shutdown(wait=False)
@@ -1,3 +1,7 @@
+from .history import HistoryRecord, LearningLog, RecordBuffer, ScoreBuffer
+from .tool_cache import ToolCache
+
+
 class DynoAgent:
     """Base agent with dynamic role assignment, adaptation, and learning orchestration."""
 
@@ -13,6 +17,7 @@ class DynoAgent:
         use_rl_decision_agent=True,
         input_dependencies=None,
         tools_dataloaders=None,
+        history_limit=None,
     ):
         """Initialize a DynoAgent with the given parameters."""
         if not name or not isinstance(name, str):
@@ -23,16 +28,26 @@ class DynoAgent:
             raise ValueError("Skills must be a list")
         if not goal or not isinstance(goal, str):
             raise ValueError("Goal must be a non-empty string")
+        if history_limit is not None and (
+            not isinstance(history_limit, int) or history_limit <= 0
+        ):
+            raise ValueError("History limit must be a positive integer")
 
         self.name = name
         self.role = role
         self.skills = skills  # Dynamic skills matrix
         self.goal = goal
-        self.history = []  # Track past interactions
-        self.human_feedback_scores = []  # Track human feedback (1-10)
-        self.input_quality_scores = []  # Track self-assessment of input quality
+        # Keep only the most recent entries of history, scores and learning data
+        # when a limit is given; None keeps everything
+        self.history_limit = history_limit
+        self.history = RecordBuffer(maxlen=history_limit)  # Track past interactions
+        # Track human feedback (1-10)
+        self.human_feedback_scores = ScoreBuffer(history_limit)
+        # Track self-assessment of input quality
+        self.input_quality_scores = ScoreBuffer(history_limit)
         self.custom_metrics = {}  # Store user-defined metrics
-        self.learning_data = []  # Store task execution history for learning
+        # Store task execution history for learning
+        self.learning_data = LearningLog(maxlen=history_limit)
         self.learning_threshold = (
             learning_threshold  # Number of inputs needed before adjusting sequencing
         )
@@ -52,13 +67,14 @@ class DynoAgent:
         self.tools_dataloaders = (
             tools_dataloaders if tools_dataloaders is not None else {}
         )
+        self.tool_caches = {}  # Memoized results of tools registered with a cache
 
     def perform_task(self, task, context=None):
         """Perform a given task, considering role optimization, learning, and tracking metrics."""
         if context is None:
             context = {}
 
-        self.history.append({"task": task, "context": context, "role": self.role})
+        self._record_history(task, context)
 
         # Default human feedback and input quality
         human_feedback = 6.5
@@ -70,19 +86,22 @@ class DynoAgent:
 
         return f"{self.name} executed {task} with role: {self.role}"
 
+    def _record_history(self, task, context):
+        """Append an interaction to the agent's history."""
+        self.history.append(HistoryRecord(task, context, self.role))
+
+    async def perform_task_async(self, task, context=None):
+        """Asynchronous version of perform_task, to be overridden for natively async work."""
+        # Delegate to the sync version so subclasses overriding only perform_task work
+        return self.perform_task(task, context)
+
     def add_skill(self, skill):
         """Add a new skill to the agent's skill set."""
         if not skill or not isinstance(skill, str):
             raise ValueError("Skill must be a non-empty string")
         if skill not in self.skills:
             self.skills.append(skill)
-            self.history.append(
-                {
-                    "task": "Add skill",
-                    "context": f"Added new skill: {skill}",
-                    "role": self.role,
-                }
-            )
+            self._record_history("Add skill", f"Added new skill: {skill}")
         return f"Added skill: {skill}"
 
     def update_goal(self, new_goal):
@@ -91,24 +110,16 @@ class DynoAgent:
             raise ValueError("Goal must be a non-empty string")
         old_goal = self.goal
         self.goal = new_goal
-        self.history.append(
-            {
-                "task": "Update goal",
-                "context": f"Updated goal from '{old_goal}' to '{new_goal}'",
-                "role": self.role,
-            }
+        self._record_history(
+            "Update goal", f"Updated goal from '{old_goal}' to '{new_goal}'"
         )
         return f"Updated goal to: {new_goal}"
 
     def add_input_dependency(self, dependency):
         """Add a new input dependency for processing."""
         self.input_dependencies.append(dependency)
-        self.history.append(
-            {
-                "task": "Add input dependency",
-                "context": f"Added new dependency: {type(dependency).__name__}",
-                "role": self.role,
-            }
+        self._record_history(
+            "Add input dependency", f"Added new dependency: {type(dependency).__name__}"
         )
         return f"Added {type(dependency).__name__} as a dependency"
 
@@ -116,44 +127,47 @@ class DynoAgent:
         """Remove an input dependency by index."""
         if 0 <= dependency_index < len(self.input_dependencies):
             dependency = self.input_dependencies.pop(dependency_index)
-            self.history.append(
-                {
-                    "task": "Remove input dependency",
-                    "context": f"Removed dependency: {type(dependency).__name__}",
-                    "role": self.role,
-                }
+            self._record_history(
+                "Remove input dependency",
+                f"Removed dependency: {type(dependency).__name__}",
             )
             return f"Removed {type(dependency).__name__} dependency"
         return "Invalid dependency index"
 
-    def register_tool(self, name, tool_function):
-        """Register a new tool or dataloader."""
+    def register_tool(self, name, tool_function, cache=None):
+        """
+        Register a new tool or dataloader.
+
+        Pure tools can be memoized by passing cache=True for a default ToolCache, or
+        a ToolCache configured with a key function, size, TTL and disk tier.
+        """
         if not name or not isinstance(name, str):
             raise ValueError("Tool name must be a non-empty string")
         if not callable(tool_function):
             raise ValueError("Tool function must be callable")
+        if cache is True:
+            cache = ToolCache()
+        elif (
+            cache is not None
+            and cache is not False
+            and not isinstance(cache, ToolCache)
+        ):
+            raise ValueError("Tool cache must be a bool or a ToolCache")
 
         self.tools_dataloaders[name] = tool_function
-        self.history.append(
-            {
-                "task": "Register tool",
-                "context": f"Added new tool: {name}",
-                "role": self.role,
-            }
-        )
+        if cache:
+            self.tool_caches[name] = cache
+        else:
+            self.tool_caches.pop(name, None)
+        self._record_history("Register tool", f"Added new tool: {name}")
         return f"Registered new tool: {name}"
 
     def unregister_tool(self, name):
         """Unregister a tool or dataloader by name."""
         if name in self.tools_dataloaders:
             del self.tools_dataloaders[name]
-            self.history.append(
-                {
-                    "task": "Unregister tool",
-                    "context": f"Removed tool: {name}",
-                    "role": self.role,
-                }
-            )
+            self.tool_caches.pop(name, None)
+            self._record_history("Unregister tool", f"Removed tool: {name}")
             return f"Unregistered tool: {name}"
         return f"Tool {name} not found"
 
@@ -169,15 +183,32 @@ class DynoAgent:
             )
 
         tool = self.tools_dataloaders[name]
-        self.history.append(
-            {"task": "Use tool", "context": f"Used tool: {name}", "role": self.role}
-        )
+        self._record_history("Use tool", f"Used tool: {name}")
 
+        cache = self.tool_caches.get(name)
         try:
+            if cache is not None:
+                return cache.call(tool, *args, **kwargs)
             return tool(*args, **kwargs)
         except Exception as e:
             return f"Error using tool {name}: {str(e)}"
 
+    def tool_cache_info(self, name=None):
+        """Get cache statistics of a memoized tool, or of all of them by name."""
+        if name is not None:
+            cache = self.tool_caches.get(name)
+            return cache.stats() if cache is not None else None
+        return {tool: cache.stats() for tool, cache in self.tool_caches.items()}
+
+    def clear_tool_cache(self, name=None):
+        """Drop the memoized results of a tool, or of all tools."""
+        if name is None:
+            caches = list(self.tool_caches.values())
+        else:
+            caches = [self.tool_caches[name]] if name in self.tool_caches else []
+        for cache in caches:
+            cache.clear()
+
     def adapt_role(self, new_role):
         """Allow external systems to update the agent's role dynamically."""
         self.role = new_role
@@ -197,10 +228,7 @@ class DynoAgent:
 
     def optimize_with_internal_rl(self):
         """Internal RL-based optimization using learning data."""
-        success_rates = [
-            1 if outcome == "success" else 0 for _, _, outcome in self.learning_data
-        ]
-        avg_success = sum(success_rates) / len(success_rates) if success_rates else 0
+        avg_success = self.learning_data.success_rate
         avg_quality = (
             self.average_input_quality() or 5
         )  # Default quality if none available
@@ -222,7 +250,7 @@ class DynoAgent:
         """Suggests increasing input data quality to improve accuracy based on feedback."""
         if not self.input_quality_scores:
             return "No input quality data available."
-        avg_quality = sum(self.input_quality_scores) / len(self.input_quality_scores)
+        avg_quality = self.input_quality_scores.mean()
         suggested_quality = avg_quality * self.accuracy_boost_factor
         return f"Suggested minimum input quality: {suggested_quality:.2f} for better accuracy."
 
@@ -230,14 +258,14 @@ class DynoAgent:
         """Calculate the inverse margin of error based on human feedback."""
         if not self.human_feedback_scores:
             return None
-        avg_feedback = sum(self.human_feedback_scores) / len(self.human_feedback_scores)
+        avg_feedback = self.human_feedback_scores.mean()
         return 10 - avg_feedback  # Higher feedback = Lower error margin
 
     def average_input_quality(self):
         """Calculate the average quality of input data assessments."""
         if not self.input_quality_scores:
             return None
-        return sum(self.input_quality_scores) / len(self.input_quality_scores)
+        return self.input_quality_scores.mean()
 
     def add_custom_metric(self, metric_name, metric_function):
         """Allow users to define and add their own metric calculations."""
@@ -0,0 +1,197 @@
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import networkx as nx
+
+
+class IncrementalTopologicalOrder:
+    """
+    Maintains a topological order of a directed graph while edges are inserted.
+
+    Uses the Pearce-Kelly algorithm: inserting an edge only searches the part of the
+    graph lying between its endpoints in the current order, and edges that already
+    agree with the order are accepted in constant time. An edge that would close a
+    cycle is rejected and the offending cycle is reported.
+    """
+
+    def __init__(self, graph: nx.DiGraph):
+        """
+        Initialize the order for an acyclic graph.
+
+        Args:
+            graph: The graph whose order is maintained; edges must be inserted
+                through add_edge to keep the order valid
+        """
+        self.graph = graph
+        self._position: Dict[Hashable, int] = {}
+        self._next_position = 0
+        self.reset(nx.topological_sort(graph))
+
+    def reset(self, order: Iterable[Hashable]) -> None:
+        """
+        Replace the maintained order with a known topological order of the graph.
+
+        Args:
+            order: All nodes of the graph in topological order
+        """
+        self._position = {node: index for index, node in enumerate(order)}
+        self._next_position = len(self._position)
+
+    def add_node(self, node: Hashable, **attr: Any) -> None:
+        """
+        Add a node to the graph, placing it last in the order.
+
+        Args:
+            node: The node to add
+            **attr: Node attributes stored on the graph
+        """
+        self.graph.add_node(node, **attr)
+        if node not in self._position:
+            self._position[node] = self._next_position
+            self._next_position += 1
+
+    def remove_node(self, node: Hashable) -> None:
+        """
+        Remove a node and its edges from the graph.
+
+        Args:
+            node: The node to remove
+        """
+        if node in self.graph:
+            self.graph.remove_node(node)
+        self._position.pop(node, None)
+
+    def add_edge(self, source: Hashable, target: Hashable) -> None:
+        """
+        Insert an edge, updating the order or rejecting the edge if it creates a cycle.
+
+        Args:
+            source: Node the edge starts from
+            target: Node the edge points to
+
+        Raises:
+            ValueError: If the edge would create a cycle; the graph is left unchanged
+        """
+        if source == target:
+            raise ValueError(f"Circular dependency: {source} -> {target}")
+
+        for node in (source, target):
+            if node not in self._position:
+                self.add_node(node)
+
+        lower = self._position[target]
+        upper = self._position[source]
+        if lower < upper:
+            # Only nodes ordered between target and source need to move
+            forward, cycle = self._search_forward(source, target, upper)
+            if cycle:
+                raise ValueError(
+                    "Circular dependency: " + " -> ".join(str(node) for node in cycle)
+                )
+            backward = self._search_backward(source, lower)
+            self._reorder(backward, forward)
+
+        self.graph.add_edge(source, target)
+
+    def add_edges(self, edges: Iterable[Tuple[Hashable, Hashable]]) -> None:
+        """
+        Insert many edges at once with a single linear-time check.
+
+        Cheaper than repeated add_edge calls when most of the graph is built in one
+        go, since edges inserted against the current order can each force a search
+        of the nodes between their endpoints.
+
+        Args:
+            edges: Pairs of (source, target) nodes
+
+        Raises:
+            ValueError: If the edges would create a cycle; the graph is left unchanged
+        """
+        new_edges = [edge for edge in edges if not self.graph.has_edge(*edge)]
+        if not new_edges:
+            return
+        for source, target in new_edges:
+            for node in (source, target):
+                if node not in self._position:
+                    self.add_node(node)
+
+        self.graph.add_edges_from(new_edges)
+        try:
+            order = list(nx.topological_sort(self.graph))
+        except nx.NetworkXUnfeasible:
+            # The graph was acyclic before, so any cycle runs through a new edge
+            cycle = [edge[0] for edge in nx.find_cycle(self.graph)]
+            self.graph.remove_edges_from(new_edges)
+            raise ValueError(
+                "Circular dependency: "
+                + " -> ".join(str(node) for node in cycle + cycle[:1])
+            ) from None
+        self.reset(order)
+
+    def find_cycle(
+        self, source: Hashable, target: Hashable
+    ) -> Optional[List[Hashable]]:
+        """
+        Check whether inserting an edge would create a cycle.
+
+        Args:
+            source: Node the edge would start from
+            target: Node the edge would point to
+
+        Returns:
+            The cycle as a list of nodes starting and ending with source, or None
+        """
+        if source == target:
+            return [source, target]
+        if source not in self._position or target not in self._position:
+            return None
+        upper = self._position[source]
+        if self._position[target] > upper:
+            return None
+        _, cycle = self._search_forward(source, target, upper)
+        return cycle
+
+    def _search_forward(
+        self, source: Hashable, target: Hashable, upper: int
+    ) -> Tuple[List[Hashable], Optional[List[Hashable]]]:
+        """
+        Collect nodes reachable from target that are ordered before source.
+
+        Returns:
+            The visited nodes, and the cycle through source if source is reachable
+        """
+        parents = {target: None}
+        stack = [target]
+        while stack:
+            node = stack.pop()
+            for successor in self.graph.successors(node):
+                if successor == source:
+                    path = [node]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    return list(parents), [source] + path[::-1] + [source]
+                if successor not in parents and self._position[successor] < upper:
+                    parents[successor] = node
+                    stack.append(successor)
+        return list(parents), None
+
+    def _search_backward(self, source: Hashable, lower: int) -> List[Hashable]:
+        """Collect nodes that reach source and are ordered after the edge target."""
+        visited = {source}
+        stack = [source]
+        while stack:
+            node = stack.pop()
+            for predecessor in self.graph.predecessors(node):
+                if predecessor not in visited and self._position[predecessor] > lower:
+                    visited.add(predecessor)
+                    stack.append(predecessor)
+        return list(visited)
+
+    def _reorder(self, backward: List[Hashable], forward: List[Hashable]) -> None:
+        """Move the backward set before the forward set, reusing their positions."""
+        position = self._position
+        backward.sort(key=position.__getitem__)
+        forward.sort(key=position.__getitem__)
+        nodes = backward + forward
+        slots = sorted(position[node] for node in nodes)
+        for node, slot in zip(nodes, slots):
+            position[node] = slot
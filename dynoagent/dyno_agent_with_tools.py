@@ -1,7 +1,16 @@
+import asyncio
 import os
-from typing import Any, Callable, Dict, List, Optional, Union
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+from .cache import LRUCache
 from .core import DynoAgent
+from .loaders import iter_documents
+from .segments import SEGMENTS_MANIFEST, SegmentedIndex
+from .summaries import SummaryStore, summarize_text, summary_pages
+from .task_complexity import TaskComplexityAnalyzer
+from .token_budget import TokenBudgetEstimator
+from .vector_index import VectorIndex
 
 # Comment out external dependencies for now
 # from dyno_llamaindex import DynoDataLoader
@@ -13,9 +22,27 @@ from .core import DynoAgent
 # )
 
 
+# Database of document summaries, kept in the index directory
+SUMMARIES_FILE = "summaries.sqlite3"
+
+
 class DynoAgentWithTools(DynoAgent):
     """Extended DynoAgent with LlamaIndex data loading and querying tools."""
 
+    # Documents embedded and added to the index at a time by index_documents
+    INDEX_BATCH_SIZE = 256
+
+    # Complexity analyses kept per agent when auto_parameters is enabled
+    COMPLEXITY_CACHE_SIZE = 1024
+
+    # Generation settings per task complexity, used when auto_parameters is enabled
+    COMPLEXITY_PROFILES = {
+        "simple": {"temperature": 0.2, "provider_tier": "fast"},
+        "medium": {"temperature": 0.5, "provider_tier": "standard"},
+        "complex": {"temperature": 0.4, "provider_tier": "advanced"},
+        "creative": {"temperature": 0.9, "provider_tier": "advanced"},
+    }
+
     def __init__(
         self,
         name,
@@ -31,6 +58,16 @@ class DynoAgentWithTools(DynoAgent):
         llm_provider=None,
         temperature=0.7,
         max_tokens=1500,
+        history_limit=None,
+        auto_parameters=False,
+        token_budget=None,
+        complexity_profiles=None,
+        embedder=None,
+        index_path=None,
+        query_cache_size=1024,
+        query_cache_ttl=None,
+        segment_size=None,
+        summarizer=None,
     ):
         """Initialize DynoAgentWithTools with LlamaIndex integration."""
         super().__init__(
@@ -44,6 +81,7 @@ class DynoAgentWithTools(DynoAgent):
             use_rl_decision_agent=use_rl_decision_agent,
             input_dependencies=input_dependencies,
             tools_dataloaders=tools_dataloaders,
+            history_limit=history_limit,
         )
         self.llm_provider = llm_provider
         if (
@@ -57,45 +95,297 @@ class DynoAgentWithTools(DynoAgent):
             raise ValueError("max_tokens must be a positive integer")
         self.max_tokens = max_tokens
 
+        # Per-task parameter selection: max_tokens then always comes from the token
+        # budget or the fixed estimates, and the static temperature above is only
+        # used for complexity levels whose profile sets none
+        self.auto_parameters = auto_parameters
+        if token_budget is not None and not isinstance(
+            token_budget, TokenBudgetEstimator
+        ):
+            raise ValueError("token_budget must be a TokenBudgetEstimator")
+        self.token_budget = token_budget
+        self.complexity_profiles = dict(self.COMPLEXITY_PROFILES)
+        self.complexity_profiles.update(complexity_profiles or {})
+        # Templated tasks repeat, so classify each distinct task only once. The
+        # cache belongs to the agent, leaving the analyzer's shared cache alone
+        self.complexity_cache = (
+            LRUCache(self.COMPLEXITY_CACHE_SIZE) if auto_parameters else None
+        )
+
+        # Vector index of the documents, created on first use with the given
+        # embedding function (an offline hashing embedder by default)
+        self.embedder = embedder
+        self.index_path = index_path
+        self.index = None
+        # With a segment size, documents go to a SegmentedIndex, which supports
+        # deletion and keeps adding documents cheap for continuously growing indexes
+        if segment_size is not None and (
+            not isinstance(segment_size, int) or segment_size <= 0
+        ):
+            raise ValueError("segment_size must be a positive integer")
+        self.segment_size = segment_size
+        # Document summaries are computed on demand and kept by content hash, in a
+        # database next to the index when there is an index_path
+        self.summarizer = summarizer or summarize_text
+        self.summary_store = None
+        # Recent query results, keyed by query, k and index version; 0 disables it
+        self.query_cache = (
+            LRUCache(query_cache_size, ttl=query_cache_ttl)
+            if query_cache_size
+            else None
+        )
+        # Set by Team during parallel execution to batch queries across agents
+        self.query_coalescer = None
+
+    def __getstate__(self):
+        # A query coalescer batches queries on this process's event loop, so a
+        # copy of the agent, such as one sent to a process pool, goes without it
+        state = self.__dict__.copy()
+        state["query_coalescer"] = None
+        return state
+
+    def select_parameters(self, task):
+        """Select complexity, max_tokens, temperature and provider tier for a task."""
+        text = task if isinstance(task, str) else str(task)
+        complexity = self._analyze_complexity(text)
+        if self.token_budget is not None:
+            max_tokens = self.token_budget.estimate(complexity, len(text))
+        else:
+            max_tokens = TaskComplexityAnalyzer.estimate_token_needs(complexity)
+
+        profile = self.complexity_profiles.get(complexity, {})
+        provider_tier = profile.get("provider_tier")
+        llm_provider = self.llm_provider
+        if isinstance(llm_provider, dict):
+            # Providers given per tier
+            llm_provider = llm_provider.get(provider_tier)
+        return {
+            "complexity": complexity,
+            "temperature": profile.get("temperature", self.temperature),
+            "max_tokens": max_tokens,
+            "provider_tier": provider_tier,
+            "llm_provider": llm_provider,
+        }
+
+    def record_token_usage(self, task, tokens_used):
+        """Record the tokens a task used, calibrating future max_tokens budgets."""
+        if self.token_budget is None:
+            raise ValueError("Recording token usage requires a token_budget")
+        text = task if isinstance(task, str) else str(task)
+        complexity = self._analyze_complexity(text)
+        self.token_budget.record(complexity, len(text), tokens_used)
+
+    def _analyze_complexity(self, text: str) -> str:
+        """Analyze the complexity of a task text, through the agent's cache if any."""
+        return TaskComplexityAnalyzer.analyze_complexity(
+            text, self.role, cache=self.complexity_cache
+        )
+
+    def complexity_cache_info(self) -> Optional[Dict[str, Any]]:
+        """Return hits, misses, hit_rate, size and maxsize of the complexity cache."""
+        return (
+            self.complexity_cache.stats() if self.complexity_cache is not None else None
+        )
+
     # Simplified implementation of methods
     def perform_task(self, task, context=None):
         """Override to provide a simplified implementation."""
         result = super().perform_task(task, context)
+        if self.auto_parameters:
+            metrics = self.select_parameters(task)
+        else:
+            metrics = {
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                "llm_provider": self.llm_provider,
+            }
         return {
             "task": task,
             "context": context or {},
             "result": result,
-            "metrics": {
-                "temperature": self.temperature,
-                "max_tokens": self.max_tokens,
-                "llm_provider": self.llm_provider,
-            },
+            "metrics": metrics,
         }
 
     def _register_data_tools(self) -> None:
         """Register data loading and indexing tools."""
         pass
 
-    def load_data(self, source_type: str, source_data: Any) -> List[Any]:
-        """Simplified load_data method."""
-        return []
+    def iter_data(
+        self, source_type: str, source_data: Any, **options: Any
+    ) -> Iterator[Dict[str, Any]]:
+        """Lazily load documents from a source; options as for loaders.iter_documents."""
+        return iter_documents(source_type, source_data, **options)
 
-    def index_documents(self, documents: List[Any]) -> None:
-        """Simplified index_documents method."""
-        pass
+    def load_data(
+        self, source_type: str, source_data: Any, **options: Any
+    ) -> List[Dict[str, Any]]:
+        """Load all documents from a source into a list."""
+        return list(self.iter_data(source_type, source_data, **options))
 
-    def save_index(self) -> None:
-        """Simplified save_index method."""
-        pass
+    def index_documents(
+        self, documents: Iterable[Any], batch_size: Optional[int] = None
+    ) -> None:
+        """Embed documents and add them to the vector index, a batch at a time."""
+        batch_size = batch_size or self.INDEX_BATCH_SIZE
+        if self.index is None:
+            if self.segment_size is not None:
+                self.index = SegmentedIndex(
+                    self.embedder, segment_size=self.segment_size
+                )
+            else:
+                self.index = VectorIndex(self.embedder)
+        # Pull only one batch from a lazy source at a time, so loading keeps pace
+        # with indexing instead of running ahead of it
+        documents = iter(documents)
+        while True:
+            batch = list(islice(documents, batch_size))
+            if not batch:
+                break
+            self.index.add(batch)
+            self._invalidate_query_cache()
 
-    def load_index(self) -> None:
-        """Simplified load_index method."""
-        pass
+    def save_index(self, path: Optional[str] = None) -> None:
+        """Save the vector index to path, or to the index_path given at creation."""
+        path = path or self.index_path
+        if path is None:
+            raise ValueError("No path given to save the index to")
+        if self.index is None:
+            raise ValueError("No documents have been indexed")
+        self.index.save(path)
+
+    def load_index(self, path: Optional[str] = None) -> None:
+        """Load the vector index from path, or from the index_path given at creation."""
+        path = path or self.index_path
+        if path is None:
+            raise ValueError("No path given to load the index from")
+        if os.path.exists(os.path.join(path, SEGMENTS_MANIFEST)):
+            options = {}
+            if self.segment_size is not None:
+                options["segment_size"] = self.segment_size
+            index = SegmentedIndex.load(path, self.embedder, **options)
+        else:
+            index = VectorIndex.load(path, self.embedder)
+        self._close_index()
+        self.index = index
+        self._invalidate_query_cache()
+
+    def _close_index(self) -> None:
+        """Release the resources of the index, such as its compaction worker."""
+        close = getattr(self.index, "close", None)
+        if close is not None:
+            close()
+
+    def close(self) -> None:
+        """Release the index and the summary store; the agent can still be used."""
+        self._close_index()
+        if self.summary_store is not None:
+            self.summary_store.close()
+            self.summary_store = None
+
+    def __enter__(self) -> "DynoAgentWithTools":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
-    def query_index(self, query: str) -> str:
-        """Simplified query_index method."""
-        return f"Query result for: {query}"
+    def delete_documents(self, ids: Iterable[int]) -> int:
+        """Delete documents from a segmented index by id; returns how many were."""
+        if not isinstance(self.index, SegmentedIndex):
+            raise ValueError("Deleting documents requires a segment_size")
+        deleted = self.index.delete(ids)
+        if deleted:
+            self._invalidate_query_cache()
+        return deleted
 
-    def get_document_summaries(self) -> List[Dict[str, Any]]:
-        """Simplified get_document_summaries method."""
-        return []
+    def query_index(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Return the k indexed documents most similar to the query, best first."""
+        if self.index is None:
+            return []
+        key, results = self._cached_query(query, k)
+        if results is None:
+            coalescer = self.query_coalescer
+            if coalescer is not None and not coalescer.in_loop_thread():
+                results = coalescer.query_threadsafe(query, k)
+            else:
+                results = self.index.search(query, k)
+            self._cache_query(key, results)
+        return [dict(result) for result in results]
+
+    async def query_index_async(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Like query_index, batching the search with other queries when coalescing."""
+        if self.index is None:
+            return []
+        key, results = self._cached_query(query, k)
+        if results is None:
+            if self.query_coalescer is not None:
+                results = await self.query_coalescer.query(query, k)
+            else:
+                results = await asyncio.to_thread(self.index.search, query, k)
+            self._cache_query(key, results)
+        return [dict(result) for result in results]
+
+    def query_index_batch(
+        self, queries: List[str], k: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        """Return the k most similar documents for each query, searching all at once."""
+        if self.index is None:
+            return [[] for _ in queries]
+        lookups = [self._cached_query(query, k) for query in queries]
+        missing = [i for i, (_, results) in enumerate(lookups) if results is None]
+        found = self.index.search_batch([queries[i] for i in missing], k)
+        for i, results in zip(missing, found):
+            self._cache_query(lookups[i][0], results)
+            lookups[i] = (lookups[i][0], results)
+        return [[dict(result) for result in results] for _, results in lookups]
+
+    def _cached_query(self, query: str, k: int) -> Tuple[Any, Optional[List[Dict]]]:
+        """Return the cache key of a query and its cached results, if any."""
+        if self.query_cache is None:
+            return None, None
+        # Results of a query only depend on its words and on the index contents
+        key = (" ".join(query.split()), k, self.index.version)
+        return key, self.query_cache.get(key)
+
+    def _cache_query(self, key: Any, results: List[Dict[str, Any]]) -> None:
+        """Store the results of a query in the query cache, if enabled."""
+        if self.query_cache is not None:
+            self.query_cache.put(key, results)
+
+    def _invalidate_query_cache(self) -> None:
+        """Drop cached query results after the index changed, keeping statistics."""
+        if self.query_cache is not None:
+            self.query_cache.clear(reset_stats=False)
+
+    def query_cache_info(self) -> Optional[Dict[str, Any]]:
+        """Return hits, misses, hit_rate, size and maxsize of the query cache."""
+        return self.query_cache.stats() if self.query_cache is not None else None
+
+    def get_document_summaries(
+        self, page_size: int = 100, start_id: int = 0
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Iterate over pages of summaries of the indexed documents, in id order.
+
+        Summaries are computed when their page is requested and stored by content
+        hash, so documents whose text has not changed are never summarized again.
+
+        Args:
+            page_size: Number of documents per page
+            start_id: Id of the first document, to resume after a previous page
+
+        Returns:
+            Iterator of pages, lists of dictionaries with id, summary and metadata
+        """
+        if not isinstance(page_size, int) or page_size <= 0:
+            raise ValueError("page_size must be a positive integer")
+        if self.index is None:
+            return iter([])
+        if self.summary_store is None:
+            path = self.index_path and os.path.join(self.index_path, SUMMARIES_FILE)
+            self.summary_store = SummaryStore(path)
+        return summary_pages(
+            self.index.iter_records(start_id),
+            self.summary_store,
+            self.summarizer,
+            page_size,
+        )
@@ -0,0 +1,238 @@
+from array import array
+from collections import deque
+from itertools import islice
+from numbers import Real
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from .metrics import RunningStats
+
+
+class HistoryRecord:
+    """
+    Compact record of an agent interaction.
+    Readable like the dictionaries previously stored in an agent's history.
+    """
+
+    __slots__ = ("task", "context", "role")
+
+    def __init__(self, task: Any, context: Any, role: str):
+        self.task = task
+        self.context = context
+        self.role = role
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, HistoryRecord):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"HistoryRecord({self.to_dict()!r})"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a field by name, or default if there is no such field."""
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self) -> List[str]:
+        """Return the field names."""
+        return list(self.__slots__)
+
+    def items(self) -> List[tuple]:
+        """Return (field name, value) pairs."""
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the record as a dictionary."""
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+class RecordBuffer(deque):
+    """
+    Deque of records, bounded by an optional maximum length, that also supports slicing.
+    When full, appending a record discards the oldest one.
+
+    Compares equal to lists and tuples holding equal records, like the lists it
+    replaces. It is not JSON serializable itself; to_list returns plain values.
+    """
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return list(self)[index]
+        return super().__getitem__(index)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (deque, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __ne__(self, other: Any) -> bool:
+        # deque implements != itself, so it must be overridden along with ==
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def to_list(self) -> List[Any]:
+        """Return the records as a list, with history records as dictionaries."""
+        return [
+            record.to_dict() if isinstance(record, HistoryRecord) else record
+            for record in self
+        ]
+
+
+class LearningLog(RecordBuffer):
+    """
+    Record buffer of (input, output, outcome) learning entries.
+    Keeps a running count of successful outcomes among the retained entries.
+    """
+
+    def __init__(self, iterable: Iterable[tuple] = (), maxlen: Optional[int] = None):
+        super().__init__(maxlen=maxlen)
+        self.successes = 0
+        self.extend(iterable)
+
+    @staticmethod
+    def _is_success(entry: tuple) -> bool:
+        return entry[-1] == "success"
+
+    def append(self, entry: tuple) -> None:
+        """Add an entry, discarding the oldest one if the log is full."""
+        if self.maxlen is not None and len(self) == self.maxlen:
+            self.successes -= self._is_success(self[0])
+        super().append(entry)
+        self.successes += self._is_success(entry)
+
+    def extend(self, entries: Iterable[tuple]) -> None:
+        """Add several entries."""
+        for entry in entries:
+            self.append(entry)
+
+    def popleft(self) -> tuple:
+        """Remove and return the oldest entry."""
+        entry = super().popleft()
+        self.successes -= self._is_success(entry)
+        return entry
+
+    def pop(self) -> tuple:
+        """Remove and return the newest entry."""
+        entry = super().pop()
+        self.successes -= self._is_success(entry)
+        return entry
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        super().clear()
+        self.successes = 0
+
+    @property
+    def success_rate(self) -> float:
+        """Fraction of retained entries whose outcome is "success", or 0 if empty."""
+        return self.successes / len(self) if len(self) else 0
+
+    def __reduce__(self):
+        return (type(self), (list(self), self.maxlen))
+
+
+class ScoreBuffer:
+    """
+    Sequence of float scores stored in a compact array('d').
+    With a maximum length it acts as a ring buffer that keeps the most recent scores.
+    Unlike a list it only accepts real numbers, which are stored as floats; it
+    compares equal to sequences of equal scores, and to_list gives a plain list.
+
+    Running statistics are kept up to date on every append, so that the mean and
+    variance of the retained scores (stats) and of all scores ever added (lifetime)
+    are available in constant time.
+    """
+
+    def __init__(
+        self,
+        maxlen: Optional[int] = None,
+        scores: Iterable[float] = (),
+        ewma_alpha: Optional[float] = None,
+    ):
+        """
+        Initialize the buffer.
+
+        Args:
+            maxlen: Maximum number of scores kept; None means unbounded
+            scores: Initial scores
+            ewma_alpha: Weight of the newest score in the exponentially weighted mean
+                kept in lifetime; None disables it
+        """
+        if maxlen is not None and (not isinstance(maxlen, int) or maxlen <= 0):
+            raise ValueError("maxlen must be a positive integer")
+        self.maxlen = maxlen
+        self._data = array("d")
+        self._start = 0  # Index of the oldest score once the ring buffer is full
+        self.stats = RunningStats()  # Statistics of the retained scores
+        self.lifetime = RunningStats(ewma_alpha)  # Statistics of all scores
+        self.extend(scores)
+
+    def append(self, score: float) -> None:
+        """Add a score, discarding the oldest one if the buffer is full."""
+        if not isinstance(score, Real) or isinstance(score, bool):
+            raise ValueError(f"Scores must be real numbers, not {score!r}")
+        score = float(score)
+        if self.maxlen is None or len(self._data) < self.maxlen:
+            self._data.append(score)
+        else:
+            self.stats.discard(self._data[self._start])
+            self._data[self._start] = score
+            self._start = (self._start + 1) % self.maxlen
+        self.stats.add(score)
+        self.lifetime.add(score)
+
+    def mean(self) -> Optional[float]:
+        """Mean of the retained scores, or None if there are none."""
+        return self.stats.mean if self.stats.count else None
+
+    def extend(self, scores: Iterable[float]) -> None:
+        """Add several scores."""
+        for score in scores:
+            self.append(score)
+
+    def clear(self) -> None:
+        """Remove all scores."""
+        self._data = array("d")
+        self._start = 0
+        self.stats.reset()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[float]:
+        if self._start:
+            yield from islice(self._data, self._start, None)
+            yield from islice(self._data, 0, self._start)
+        else:
+            yield from self._data
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[float, List[float]]:
+        if isinstance(index, slice):
+            return list(self)[index]
+        length = len(self._data)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("score index out of range")
+        return self._data[(self._start + index) % length]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (ScoreBuffer, list, tuple, array, deque)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def to_list(self) -> List[float]:
+        """Return the retained scores as a list, oldest first."""
+        return list(self)
+
+    def __repr__(self) -> str:
+        return f"ScoreBuffer({list(self)!r}, maxlen={self.maxlen})"
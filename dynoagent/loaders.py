@@ -0,0 +1,209 @@
+import codecs
+import fnmatch
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .vector_index import document_text
+
+SOURCE_TYPES = ("text", "documents", "file", "directory")
+
+# Bytes read from a file per prefetched block
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+
+def iter_documents(
+    source_type: str,
+    source_data: Any,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: int = 0,
+    prefetch: int = 4,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    pattern: str = "*",
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily load documents from a source, optionally split into chunks.
+
+    Documents are produced one at a time, so a corpus can be processed in constant
+    memory as long as chunk_size is set. Files are read in blocks by a thread pool
+    that stays at most prefetch blocks ahead of the consumer.
+
+    Args:
+        source_type: "text" (a string or iterable of strings), "documents" (an
+            iterable of documents), "file" (a path) or "directory" (a path, searched
+            recursively)
+        source_data: The source, as described for source_type
+        chunk_size: Maximum characters per document; None keeps texts whole
+        chunk_overlap: Characters repeated at the start of each following chunk
+        prefetch: Maximum number of file blocks read ahead
+        block_size: Bytes per file block
+        pattern: Shell-style pattern file names in a directory must match
+
+    Returns:
+        Iterator of documents as dictionaries with text and metadata
+    """
+    if source_type not in SOURCE_TYPES:
+        raise ValueError(
+            f"Unknown source type: {source_type}. "
+            f"Expected one of {', '.join(SOURCE_TYPES)}"
+        )
+    if chunk_size is not None and (not isinstance(chunk_size, int) or chunk_size <= 0):
+        raise ValueError("chunk_size must be a positive integer")
+    if not isinstance(chunk_overlap, int) or chunk_overlap < 0:
+        raise ValueError("chunk_overlap must be a non-negative integer")
+    if chunk_size is not None and chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+    if not isinstance(prefetch, int) or prefetch <= 0:
+        raise ValueError("prefetch must be a positive integer")
+
+    if source_type == "file" and not os.path.isfile(source_data):
+        raise ValueError(f"File not found: {source_data}")
+    if source_type == "directory" and not os.path.isdir(source_data):
+        raise ValueError(f"Directory not found: {source_data}")
+
+    # Arguments are checked above, before the first document is requested
+    return _iter_documents(
+        source_type,
+        source_data,
+        chunk_size,
+        chunk_overlap,
+        prefetch,
+        block_size,
+        pattern,
+    )
+
+
+def _iter_documents(
+    source_type: str,
+    source_data: Any,
+    chunk_size: Optional[int],
+    chunk_overlap: int,
+    prefetch: int,
+    block_size: int,
+    pattern: str,
+) -> Iterator[Dict[str, Any]]:
+    """Generate the documents of a validated source, see iter_documents."""
+    if source_type == "text":
+        texts = [source_data] if isinstance(source_data, str) else source_data
+        for text in texts:
+            if not isinstance(text, str):
+                raise ValueError(f"Text source contains a non-string: {text!r}")
+            yield from _chunk_document([text], {}, chunk_size, chunk_overlap)
+    elif source_type == "documents":
+        for document in source_data:
+            text, metadata = document_text(document)
+            yield from _chunk_document([text], metadata, chunk_size, chunk_overlap)
+    else:
+        if source_type == "file":
+            paths: Iterable[str] = [source_data]
+        else:
+            paths = _walk_files(source_data, pattern)
+        for path, blocks in _prefetch_files(paths, prefetch, block_size):
+            yield from _chunk_document(
+                _decode_blocks(blocks), {"source": path}, chunk_size, chunk_overlap
+            )
+
+
+def _walk_files(directory: str, pattern: str) -> Iterator[str]:
+    """Yield the files below a directory matching a pattern, in sorted order."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if fnmatch.fnmatch(name, pattern):
+                yield os.path.join(root, name)
+
+
+def _read_block(path: str, offset: int, size: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def _prefetch_files(
+    paths: Iterable[str], prefetch: int, block_size: int
+) -> Iterator[Tuple[str, Iterator[bytes]]]:
+    """
+    Yield (path, blocks) pairs, reading blocks on a thread pool ahead of the consumer.
+
+    At most prefetch blocks are read or waiting to be consumed at any time, so a slow
+    consumer holds back reading instead of letting blocks pile up in memory.
+    """
+    work = (
+        (path, offset) for path in paths for offset in _block_offsets(path, block_size)
+    )
+    with ThreadPoolExecutor(max_workers=prefetch) as pool:
+        pending: deque = deque()
+
+        def fill() -> None:
+            while len(pending) < prefetch:
+                item = next(work, None)
+                if item is None:
+                    return
+                path, offset = item
+                pending.append(
+                    (path, pool.submit(_read_block, path, offset, block_size))
+                )
+
+        def blocks_of(path: str) -> Iterator[bytes]:
+            # Consume the blocks of one file, which are contiguous in the queue
+            while True:
+                fill()
+                if not pending or pending[0][0] != path:
+                    return
+                yield pending.popleft()[1].result()
+
+        try:
+            fill()
+            while pending:
+                path = pending[0][0]
+                blocks = blocks_of(path)
+                yield path, blocks
+                # Skip any blocks the consumer did not read
+                for _ in blocks:
+                    pass
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def _block_offsets(path: str, block_size: int) -> List[int]:
+    """Offsets of the blocks of a file; an empty file has one empty block."""
+    size = os.path.getsize(path)
+    return list(range(0, size, block_size)) or [0]
+
+
+def _decode_blocks(blocks: Iterable[bytes]) -> Iterator[str]:
+    """Decode UTF-8 blocks incrementally, so characters may span blocks."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for block in blocks:
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+def _chunk_document(
+    pieces: Iterable[str],
+    metadata: Dict[str, Any],
+    chunk_size: Optional[int],
+    chunk_overlap: int,
+) -> Iterator[Dict[str, Any]]:
+    """Join text pieces and split them into chunks of at most chunk_size characters."""
+    if chunk_size is None:
+        yield {"text": "".join(pieces), "metadata": dict(metadata)}
+        return
+
+    # Chunks start every step characters; one that reaches the end of the text is
+    # the last, so the buffer only ever holds the current chunk and the next piece
+    step = chunk_size - chunk_overlap
+    buffer = ""
+    chunk = 0
+    for piece in pieces:
+        buffer += piece
+        start = 0
+        while len(buffer) - start > chunk_size:
+            text = buffer[start : start + chunk_size]
+            yield {"text": text, "metadata": {**metadata, "chunk": chunk}}
+            chunk += 1
+            start += step
+        buffer = buffer[start:]
+    yield {"text": buffer, "metadata": {**metadata, "chunk": chunk}}
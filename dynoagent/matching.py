@@ -0,0 +1,79 @@
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+
+class MultiPatternMatcher:
+    """
+    Aho-Corasick automaton that finds which of a fixed set of patterns occur in a text.
+    Matching is a single pass over the text, independent of the number of patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Build the automaton for the given patterns.
+
+        Args:
+            patterns: Substrings to search for; duplicates are ignored
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        self._matches_empty = False
+
+        for pattern in set(patterns):
+            if not pattern:
+                # The empty string occurs in every text
+                self._matches_empty = True
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern)
+
+        self._build_failure_links()
+
+    def _build_failure_links(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+
+    def find(self, text: str) -> Set[str]:
+        """
+        Find the patterns that occur in a text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Set of patterns found as substrings of the text
+        """
+        found = {""} if self._matches_empty else set()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
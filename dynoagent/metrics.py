@@ -0,0 +1,194 @@
+import math
+from bisect import insort
+from typing import Any, Dict, List, Optional
+
+
+class RunningStats:
+    """
+    Incrementally maintained count, mean and variance of a stream of values.
+    Values can also be discarded again, which keeps statistics over a sliding window
+    in constant time per update. An exponentially weighted mean is kept optionally.
+    """
+
+    __slots__ = ("count", "mean", "_m2", "ewma_alpha", "ewma")
+
+    def __init__(self, ewma_alpha: Optional[float] = None):
+        """
+        Initialize empty statistics.
+
+        Args:
+            ewma_alpha: Weight of the newest value in the exponentially weighted mean,
+                between 0 and 1; None disables it
+        """
+        if ewma_alpha is not None and not 0 < ewma_alpha <= 1:
+            raise ValueError("ewma_alpha must be between 0 and 1")
+        self.ewma_alpha = ewma_alpha
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all values."""
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.ewma: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        """Add a value (Welford's algorithm)."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+        if self.ewma_alpha is not None:
+            if self.ewma is None:
+                self.ewma = float(value)
+            else:
+                self.ewma += self.ewma_alpha * (value - self.ewma)
+
+    def discard(self, value: float) -> None:
+        """Remove a previously added value from the count, mean and variance."""
+        if self.count <= 1:
+            ewma = self.ewma
+            self.reset()
+            self.ewma = ewma
+            return
+        delta = value - self.mean
+        self.count -= 1
+        self.mean -= delta / self.count
+        self._m2 = max(self._m2 - delta * (value - self.mean), 0.0)
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Population variance of the values, or None if there are none."""
+        if not self.count:
+            return None
+        return self._m2 / self.count
+
+    @property
+    def stddev(self) -> Optional[float]:
+        """Population standard deviation of the values, or None if there are none."""
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    def __repr__(self) -> str:
+        return (
+            f"RunningStats(count={self.count}, mean={self.mean}, "
+            f"variance={self.variance}, ewma={self.ewma})"
+        )
+
+
+class P2Quantile:
+    """
+    Streaming estimate of a quantile in constant memory (the P-square algorithm).
+
+    Five markers track the minimum, the maximum, the target quantile and two
+    quantiles around it; their heights are adjusted with piecewise-parabolic
+    interpolation as values arrive, so no values need to be stored.
+    """
+
+    __slots__ = ("p", "count", "_heights", "_positions", "_desired", "_increments")
+
+    def __init__(self, p: float):
+        """
+        Initialize an empty estimate.
+
+        Args:
+            p: The quantile to estimate, between 0 and 1 (0.95 for the 95th percentile)
+        """
+        if not 0 < p < 1:
+            raise ValueError("p must be between 0 and 1")
+        self.p = p
+        self.count = 0
+        self._heights: List[float] = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self._increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, value: float) -> None:
+        """Add a value."""
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            # The first values are kept exactly, and become the initial markers
+            insort(heights, float(value))
+            return
+
+        # Find the cell the value falls in, extending the extremes if needed
+        if value < heights[0]:
+            heights[0] = float(value)
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = float(value)
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        positions = self._positions
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Move the middle markers towards their desired positions
+        for i in range(1, 4):
+            offset = self._desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (
+                offset <= -1 and positions[i - 1] - positions[i] < -1
+            ):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (
+                        positions[i + step] - positions[i]
+                    )
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        """Piecewise-parabolic prediction of marker i's height after moving it."""
+        q = self._heights
+        n = self._positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> Optional[float]:
+        """Current estimate of the quantile, or None if no values were added."""
+        if not self.count:
+            return None
+        if self.count <= 5:
+            # Nearest rank among the values seen so far
+            return self._heights[max(math.ceil(self.p * self.count) - 1, 0)]
+        return self._heights[2]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the state of the estimate as a JSON-serializable dictionary."""
+        return {
+            "p": self.p,
+            "count": self.count,
+            "heights": list(self._heights),
+            "positions": list(self._positions),
+            "desired": list(self._desired),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "P2Quantile":
+        """Restore an estimate from a dictionary created by to_dict."""
+        estimate = cls(data["p"])
+        estimate.count = int(data["count"])
+        estimate._heights = [float(height) for height in data["heights"]]
+        estimate._positions = [int(position) for position in data["positions"]]
+        estimate._desired = [float(desired) for desired in data["desired"]]
+        if (
+            len(estimate._heights) != min(estimate.count, 5)
+            or len(estimate._positions) != 5
+        ):
+            raise ValueError("Invalid quantile estimate state")
+        return estimate
+
+    def __repr__(self) -> str:
+        return f"P2Quantile(p={self.p}, count={self.count}, value={self.value})"
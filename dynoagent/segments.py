@@ -0,0 +1,616 @@
+import heapq
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .vector_index import (
+    _SCORE_BLOCK,
+    Embedder,
+    HashingEmbedder,
+    VectorIndex,
+    _versions,
+    document_text,
+    normalize_rows,
+    top_k,
+)
+
+# Identification of the on-disk format written by SegmentedIndex.save
+SEGMENTS_MANIFEST = "segments.json"
+SEGMENTS_FORMAT = "dynoagent-segmented-index"
+SEGMENTS_VERSION = 1
+
+
+class Segment:
+    """
+    Immutable-once-sealed part of a SegmentedIndex.
+
+    Rows of the segment's vector index are mapped to document ids by the sorted ids
+    array, and deleted documents stay in place, marked in the dead mask, until the
+    segment is merged into another one.
+    """
+
+    def __init__(self, name: str, index: VectorIndex, ids: np.ndarray):
+        """
+        Initialize a segment.
+
+        Args:
+            name: Name of the segment, unique within its SegmentedIndex
+            index: Vector index holding the documents of the segment
+            ids: Increasing document id of every row of the index
+        """
+        self.name = name
+        self.index = index
+        self.ids = ids
+        # Replaced rather than modified, so searches can use it without locking
+        self.dead = np.zeros(len(ids), dtype=bool)
+        self.dead_count = 0
+        # Directories the segment has been saved to since it last changed
+        self.saved_to: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows_of(self, ids: np.ndarray) -> np.ndarray:
+        """Rows holding the given document ids, ignoring ids of other segments."""
+        rows = np.searchsorted(self.ids, ids)
+        found = rows < len(self.ids)
+        found[found] = self.ids[rows[found]] == ids[found]
+        return rows[found]
+
+
+class SegmentedIndex:
+    """
+    Vector index made of append-only segments, for indexes that change continuously.
+
+    New documents go to a small active segment, which is sealed once it holds
+    segment_size documents, so adding a batch costs time proportional to the batch
+    only. Deleting documents marks them with tombstones, and a worker thread merges
+    small segments and segments with many deletions in the background, keeping the
+    number of segments a query searches bounded. Document ids are stable across
+    merges.
+
+    Search results, the version attribute and save/load follow VectorIndex, and
+    saving only writes the segments that changed since the last save.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        segment_size: int = 10000,
+        max_segments: int = 8,
+        max_dead_ratio: float = 0.25,
+        background_compaction: bool = True,
+    ):
+        """
+        Initialize an empty index.
+
+        Args:
+            embedder: Function embedding a sequence of texts into a matrix;
+                defaults to an offline HashingEmbedder
+            segment_size: Number of documents after which the active segment is
+                sealed and a new one started
+            max_segments: Number of sealed segments above which the smallest
+                ones are merged
+            max_dead_ratio: Fraction of deleted documents above which a sealed
+                segment is rewritten without them
+            background_compaction: Whether segments are merged on a worker thread;
+                if False, merging happens during the add or delete that calls for it
+        """
+        if not isinstance(segment_size, int) or segment_size <= 0:
+            raise ValueError("segment_size must be a positive integer")
+        if not isinstance(max_segments, int) or max_segments <= 0:
+            raise ValueError("max_segments must be a positive integer")
+        if not 0 < max_dead_ratio <= 1:
+            raise ValueError("max_dead_ratio must be between 0 and 1")
+
+        self.embedder = embedder if embedder is not None else HashingEmbedder()
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.max_dead_ratio = max_dead_ratio
+        self.background_compaction = background_compaction
+        self.dim: Optional[int] = None
+        self._segments: List[Segment] = []  # Sealed segments
+        self._segment_names = 0
+        self._active = self._new_segment()
+        self._next_id = 0
+        # Ids of deleted documents that are still stored in a segment
+        self._tombstones: Set[int] = set()
+        self._lock = threading.RLock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._compaction: Optional[Future] = None
+        self._compacting = False  # Whether a background compaction is pending
+        self._merge_lock = threading.Lock()  # Only one compaction runs at a time
+        self.compactions = 0
+        self._touch()
+
+    def _touch(self) -> None:
+        """Give the index a new version after a change that can affect results."""
+        self.version = next(_versions)
+
+    def _new_segment(
+        self, index: Optional[VectorIndex] = None, ids: Optional[np.ndarray] = None
+    ) -> Segment:
+        name = f"segment-{self._segment_names:06d}"
+        self._segment_names += 1
+        if index is None:
+            index = VectorIndex(self.embedder)
+            ids = np.zeros(0, dtype=np.int64)
+        return Segment(name, index, ids)
+
+    @property
+    def segments(self) -> List[Segment]:
+        """All segments holding documents, the active one last."""
+        with self._lock:
+            return self._segments + ([self._active] if len(self._active) else [])
+
+    def __len__(self) -> int:
+        """Number of documents that have not been deleted."""
+        return sum(len(s) - s.dead_count for s in self.segments)
+
+    def add(self, documents: Iterable[Any]) -> List[int]:
+        """
+        Embed and add documents.
+
+        Args:
+            documents: Documents as accepted by vector_index.document_text
+
+        Returns:
+            Ids of the added documents
+        """
+        texts, metadata = [], []
+        for document in documents:
+            text, meta = document_text(document)
+            texts.append(text)
+            metadata.append(meta)
+        if not texts:
+            return []
+        vectors = normalize_rows(self.embedder(texts))
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError("Embedder must return one row per text")
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} does not match "
+                f"index dimension {self.dim}"
+            )
+
+        with self._lock:
+            self.dim = vectors.shape[1]
+            ids = list(range(self._next_id, self._next_id + len(texts)))
+            self._next_id += len(texts)
+            start = 0
+            while start < len(texts):
+                active = self._active
+                end = start + self.segment_size - len(active)
+                active.index.add_vectors(
+                    vectors[start:end], texts[start:end], metadata[start:end]
+                )
+                added = np.asarray(ids[start:end], dtype=np.int64)
+                active.ids = np.concatenate([active.ids, added])
+                active.dead = np.concatenate(
+                    [active.dead, np.zeros(len(added), dtype=bool)]
+                )
+                active.saved_to.clear()
+                if len(active) >= self.segment_size:
+                    self._segments.append(active)
+                    self._active = self._new_segment()
+                start = end
+            self._touch()
+        self._schedule_compaction()
+        return ids
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """
+        Delete documents, which stop appearing in search results immediately.
+
+        Args:
+            ids: Ids of the documents to delete; unknown and already deleted ids
+                are ignored
+
+        Returns:
+            Number of documents deleted
+        """
+        ids = np.unique(np.fromiter(ids, dtype=np.int64))
+        deleted = 0
+        with self._lock:
+            for segment in self.segments:
+                rows = segment.rows_of(ids)
+                rows = rows[~segment.dead[rows]]
+                if not len(rows):
+                    continue
+                dead = segment.dead.copy()
+                dead[rows] = True
+                segment.dead = dead
+                segment.dead_count += len(rows)
+                self._tombstones.update(segment.ids[rows].tolist())
+                deleted += len(rows)
+            if deleted:
+                self._touch()
+        if deleted:
+            self._schedule_compaction()
+        return deleted
+
+    def iter_records(
+        self, start_id: int = 0
+    ) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Iterate over the documents that have not been deleted in id order, decoding
+        them lazily.
+
+        Args:
+            start_id: Smallest id of the documents to return
+
+        Returns:
+            Iterator of (id, text, metadata) tuples
+        """
+        with self._lock:
+            snapshot = [(s, s.ids, s.dead) for s in self.segments]
+
+        def records(segment: Segment, ids: np.ndarray, dead: np.ndarray) -> Iterator:
+            for row in range(int(np.searchsorted(ids, start_id)), len(ids)):
+                if not dead[row]:
+                    index = segment.index
+                    yield int(ids[row]), index.texts[row], index.metadata[row]
+
+        # Ids are sorted within every segment, so merging the segments sorts them
+        return heapq.merge(*(records(*entry) for entry in snapshot))
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find the documents most similar to a query, across all segments.
+
+        Args:
+            query: Query text
+            k: Maximum number of results
+
+        Returns:
+            Results, best first, as dictionaries with id, score, text and metadata
+        """
+        return self.search_batch([query], k)[0]
+
+    def search_batch(
+        self, queries: Sequence[str], k: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Find the documents most similar to each of several queries.
+
+        Every segment is scored with matrix-matrix products over blocks of queries,
+        and the best k of every segment are then merged.
+
+        Args:
+            queries: Query texts
+            k: Maximum number of results per query
+
+        Returns:
+            Results of every query, as returned by search
+        """
+        if not isinstance(k, int) or k <= 0:
+            raise ValueError("k must be a positive integer")
+        # Segment state is read once, so concurrent changes do not mix into a search
+        with self._lock:
+            snapshot = [
+                (s, s.index.vectors, s.ids, s.dead, s.dead_count) for s in self.segments
+            ]
+        if not snapshot or not len(queries):
+            return [[] for _ in queries]
+        vectors = normalize_rows(self.embedder(list(queries)))
+        size = sum(len(ids) for _, _, ids, _, _ in snapshot)
+
+        results = []
+        rows = max(_SCORE_BLOCK // size, 1)
+        for start in range(0, len(vectors), rows):
+            block = vectors[start : start + rows]
+            candidates = []
+            for number, (segment, matrix, ids, dead, dead_count) in enumerate(snapshot):
+                scores = block @ matrix.T
+                if dead_count:
+                    scores[:, dead] = -np.inf
+                best = top_k(scores, k)
+                candidates.append(
+                    (
+                        np.take_along_axis(scores, best, -1),
+                        best,
+                        np.full(best.shape, number),
+                    )
+                )
+            scores, best, numbers = (
+                np.concatenate(parts, axis=1) for parts in zip(*candidates)
+            )
+            order = top_k(scores, k)
+            for query_scores, query_rows, query_numbers in zip(
+                np.take_along_axis(scores, order, -1),
+                np.take_along_axis(best, order, -1),
+                np.take_along_axis(numbers, order, -1),
+            ):
+                results.append(
+                    [
+                        self._result(snapshot[number][0], row, score)
+                        for score, row, number in zip(
+                            query_scores, query_rows, query_numbers
+                        )
+                        if score != -np.inf
+                    ]
+                )
+        return results
+
+    @staticmethod
+    def _result(segment: Segment, row: int, score: float) -> Dict[str, Any]:
+        return {
+            "id": int(segment.ids[row]),
+            "score": float(score),
+            "text": segment.index.texts[row],
+            "metadata": segment.index.metadata[row],
+        }
+
+    def _plan_compaction(self) -> List[Segment]:
+        """Choose the sealed segments to merge next; none if no merge is needed."""
+        chosen = [
+            s for s in self._segments if s.dead_count > self.max_dead_ratio * len(s)
+        ]
+        excess = len(self._segments) - self.max_segments
+        if excess > 0:
+            remaining = sorted(
+                (s for s in self._segments if s not in chosen),
+                key=lambda s: len(s) - s.dead_count,
+            )
+            chosen.extend(remaining[: excess + 1])
+        return chosen
+
+    def _schedule_compaction(self) -> None:
+        """Start merging segments if needed, on the worker thread if enabled."""
+        if not self.background_compaction:
+            self._compact()
+            return
+        with self._lock:
+            if not self._plan_compaction():
+                return
+            if self._compacting:
+                # The running compaction checks the plan again under the lock
+                # before it stops, so it will see the change just made
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="segment-compaction"
+                )
+            self._compacting = True
+            self._compaction = self._executor.submit(self._compact_in_background)
+
+    def _compact_in_background(self) -> None:
+        """Merge segments until no merge is needed, then mark compaction as done."""
+        try:
+            while True:
+                self._compact()
+                with self._lock:
+                    # Marked done in the same critical section as the last plan
+                    # check, so a change made after it schedules a new compaction
+                    if not self._plan_compaction():
+                        self._compacting = False
+                        return
+        except BaseException:
+            with self._lock:
+                self._compacting = False
+            raise
+
+    def _compact(self, segments: Optional[List[Segment]] = None) -> None:
+        """Merge segments until no merge is needed, or the given segments once."""
+        with self._merge_lock:
+            self._compact_locked(segments)
+
+    def _compact_locked(self, segments: Optional[List[Segment]]) -> None:
+        while True:
+            with self._lock:
+                chosen = self._plan_compaction() if segments is None else segments
+                if not chosen:
+                    return
+                snapshot = [(s, len(s), s.dead) for s in chosen]
+            # Copying the surviving rows is the slow part and runs without the lock;
+            # deletions made meanwhile are applied when the merged segment is swapped in
+            merged, purged = self._merge(snapshot)
+            with self._lock:
+                self._segments = [s for s in self._segments if s not in chosen]
+                if len(merged):
+                    merged.dead = np.isin(merged.ids, list(self._tombstones))
+                    merged.dead_count = int(merged.dead.sum())
+                    self._segments.append(merged)
+                self._tombstones.difference_update(purged)
+                self.compactions += 1
+            if segments is not None:
+                return
+
+    def _merge(
+        self, snapshot: List[Tuple[Segment, int, np.ndarray]]
+    ) -> Tuple[Segment, List[int]]:
+        """Build a segment from the live rows of segments; also returns purged ids."""
+        vectors, texts, metadata, ids, purged = [], [], [], [], []
+        for segment, size, dead in snapshot:
+            live = np.flatnonzero(~dead[:size])
+            vectors.append(segment.index.vectors[live])
+            texts.extend(segment.index.texts[row] for row in live)
+            metadata.extend(segment.index.metadata[row] for row in live)
+            ids.append(segment.ids[live])
+            purged.extend(segment.ids[:size][dead[:size]].tolist())
+
+        ids = np.concatenate(ids)
+        order = np.argsort(ids, kind="stable")
+        index = VectorIndex(self.embedder)
+        if len(ids):
+            index.add_vectors(
+                np.concatenate(vectors)[order],
+                [texts[row] for row in order],
+                [metadata[row] for row in order],
+            )
+        with self._lock:
+            merged = self._new_segment(index, ids[order])
+        return merged, purged
+
+    def compact(self) -> None:
+        """Merge all segments, the active one included, into one without deletions."""
+        with self._merge_lock:
+            with self._lock:
+                if len(self._active):
+                    self._segments.append(self._active)
+                    self._active = self._new_segment()
+                chosen = list(self._segments)
+            if chosen:
+                self._compact_locked(chosen)
+
+    def wait_for_compaction(self) -> None:
+        """Block until a running background compaction is done."""
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.result()
+
+    def close(self) -> None:
+        """Wait for background compaction and release its worker thread."""
+        self.wait_for_compaction()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Locks and the compaction worker cannot be pickled; the copy gets its own
+        with self._lock:
+            state = self.__dict__.copy()
+            state["_segments"] = list(self._segments)
+            state["_tombstones"] = set(self._tombstones)
+        for name in ("_lock", "_merge_lock", "_executor", "_compaction"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._merge_lock = threading.Lock()
+        self._executor = None
+        self._compaction = None
+        self._compacting = False
+
+    def save(self, path: str) -> None:
+        """
+        Save the index to a directory, one VectorIndex directory per segment.
+
+        Segments already saved to the directory that have not changed since are not
+        written again, so saving after adding a batch costs time proportional to
+        the batch. The manifest is replaced atomically last, and directories of
+        segments merged away are removed after it.
+
+        Args:
+            path: Directory to write; created if needed
+        """
+        os.makedirs(path, exist_ok=True)
+        key = os.path.abspath(path)
+        # Only what to write is decided under the lock; writing runs without it,
+        # so searches, additions and deletions are not held up by the disk
+        with self._lock:
+            segments = self.segments
+            tombstones = np.asarray(sorted(self._tombstones), dtype=np.int64)
+            manifest = {
+                "format": SEGMENTS_FORMAT,
+                "version": SEGMENTS_VERSION,
+                "segments": [s.name for s in segments],
+                "next_id": self._next_id,
+                "dim": self.dim,
+            }
+            pending = []
+            for segment in segments:
+                if key in segment.saved_to:
+                    continue
+                index = segment.index
+                if segment is self._active:
+                    # The active segment keeps growing, so a copy of it is written
+                    index = VectorIndex(self.embedder)
+                    index.add_vectors(
+                        segment.index.vectors,
+                        segment.index.texts,
+                        segment.index.metadata,
+                    )
+                pending.append((segment, index, segment.ids))
+
+        for segment, index, ids in pending:
+            segment_path = os.path.join(path, segment.name)
+            index.save(segment_path)
+            _write_atomic(
+                os.path.join(segment_path, "ids.npy"), lambda f: np.save(f, ids)
+            )
+            with self._lock:
+                # Unless documents were added to it while it was written
+                if segment.ids is ids:
+                    segment.saved_to.add(key)
+
+        _write_atomic(
+            os.path.join(path, "tombstones.npy"), lambda f: np.save(f, tombstones)
+        )
+        _write_atomic(
+            os.path.join(path, SEGMENTS_MANIFEST),
+            lambda f: f.write(json.dumps(manifest).encode("utf-8")),
+        )
+        for name in os.listdir(path):
+            if name.startswith("segment-") and name not in manifest["segments"]:
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        embedder: Optional[Embedder] = None,
+        mmap: bool = True,
+        **options: Any,
+    ) -> "SegmentedIndex":
+        """
+        Open an index saved with save; all its segments are sealed.
+
+        Args:
+            path: Directory the index was saved to
+            embedder: Embedding function; must be the one the index was built with
+            mmap: Whether to memory-map the segment files instead of reading them
+            **options: Other constructor arguments, such as segment_size
+
+        Returns:
+            The loaded index
+        """
+        with open(os.path.join(path, SEGMENTS_MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if (
+            manifest.get("format") != SEGMENTS_FORMAT
+            or manifest.get("version") != SEGMENTS_VERSION
+        ):
+            raise ValueError(f"Unsupported index format in {path}")
+
+        index = cls(embedder, **options)
+        key = os.path.abspath(path)
+        tombstones = np.load(os.path.join(path, "tombstones.npy"))
+        for name in manifest["segments"]:
+            segment_path = os.path.join(path, name)
+            segment = Segment(
+                name,
+                VectorIndex.load(segment_path, index.embedder, mmap=mmap),
+                np.load(os.path.join(segment_path, "ids.npy")),
+            )
+            if len(segment.index) != len(segment):
+                raise ValueError(f"Index segment {segment_path} is inconsistent")
+            segment.dead = np.isin(segment.ids, tombstones)
+            segment.dead_count = int(segment.dead.sum())
+            segment.saved_to.add(key)
+            index._segments.append(segment)
+
+        index.dim = manifest["dim"]
+        index._next_id = manifest["next_id"]
+        index._tombstones = set(tombstones.tolist())
+        # New segments must not reuse the names of the loaded ones
+        index._segment_names = 1 + max(
+            (int(name.split("-")[1]) for name in manifest["segments"]), default=-1
+        )
+        index._active = index._new_segment()
+        return index
+
+
+def _write_atomic(path: str, writer: Any) -> None:
+    """Write a file under a temporary name and move it into place."""
+    temp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    with open(temp_path, "wb") as f:
+        writer(f)
+    os.replace(temp_path, path)
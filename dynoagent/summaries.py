@@ -0,0 +1,198 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Document as returned by the iter_records method of the indexes
+Record = Tuple[int, str, Dict[str, Any]]
+
+# Sentence ends: terminal punctuation followed by whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+DEFAULT_SUMMARY_CHARS = 200
+
+
+def summarize_text(text: str, max_chars: int = DEFAULT_SUMMARY_CHARS) -> str:
+    """
+    Summarize a text extractively by its leading sentences.
+
+    Args:
+        text: Text to summarize
+        max_chars: Maximum length of the summary
+
+    Returns:
+        The leading sentences fitting in max_chars, or the start of the first
+        sentence cut at a word boundary and followed by an ellipsis
+    """
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    summary = ""
+    for sentence in _SENTENCE_END.split(text):
+        candidate = f"{summary} {sentence}" if summary else sentence
+        if len(candidate) > max_chars:
+            break
+        summary = candidate
+    if summary:
+        return summary
+    cut = text[: max_chars - 1]
+    if " " in cut:
+        cut = cut[: cut.rindex(" ")]
+    return cut + "…"
+
+
+def content_hash(text: str) -> str:
+    """Hex digest identifying the content of a text."""
+    return hashlib.blake2b(
+        text.encode("utf-8", "surrogatepass"), digest_size=16
+    ).hexdigest()
+
+
+class SummaryStore:
+    """
+    Persistent mapping of content hashes to document summaries.
+
+    Summaries are kept in a SQLite database, so a store for millions of documents
+    is neither loaded into memory nor rewritten as a whole; only the rows looked up
+    or added are read or written. Without a path the database is kept in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open the store, creating its database if needed.
+
+        Args:
+            path: Database file; None keeps the summaries in memory only
+        """
+        self.path = path
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Shared by all threads, which the lock serializes
+        self._connection = sqlite3.connect(
+            path if path is not None else ":memory:", check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS summaries "
+                "(hash TEXT PRIMARY KEY, summary TEXT NOT NULL)"
+            )
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Connections cannot be pickled: the copy opens the same database file, or
+        # a new in-memory database holding the summaries of this one
+        state: Dict[str, Any] = {"path": self.path}
+        if self.path is None:
+            with self._lock:
+                state["rows"] = self._connection.execute(
+                    "SELECT hash, summary FROM summaries"
+                ).fetchall()
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"])
+        if "rows" in state:
+            self.put_many(state["rows"])
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """
+        Look up the summaries stored for content hashes.
+
+        Args:
+            hashes: Content hashes to look up
+
+        Returns:
+            Dictionary mapping the hashes that have a summary to it
+        """
+        hashes = list(set(hashes))
+        found: Dict[str, str] = {}
+        with self._lock:
+            # Stay well below SQLite's limit on the number of query parameters
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start : start + 500]
+                rows = self._connection.execute(
+                    "SELECT hash, summary FROM summaries WHERE hash IN "
+                    f"({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+                found.update(rows)
+        return found
+
+    def put_many(self, summaries: Iterable[Tuple[str, str]]) -> None:
+        """
+        Store summaries, replacing any stored for the same hashes.
+
+        Args:
+            summaries: (content hash, summary) pairs
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO summaries (hash, summary) VALUES (?, ?)",
+                summaries,
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM summaries"
+            ).fetchone()
+        return count
+
+    def clear(self) -> None:
+        """Remove all summaries, for instance after changing the summarizer."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM summaries")
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+
+def summary_pages(
+    records: Iterable[Record],
+    store: SummaryStore,
+    summarize: Callable[[str], str],
+    page_size: int,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield pages of document summaries, summarizing only documents not in the store.
+
+    Args:
+        records: (id, text, metadata) tuples of the documents
+        store: Store of the summaries computed before
+        summarize: Function summarizing a text
+        page_size: Number of documents per page
+
+    Returns:
+        Iterator of pages, lists of dictionaries with id, summary and metadata
+    """
+    page: List[Record] = []
+    for record in records:
+        page.append(record)
+        if len(page) == page_size:
+            yield _summarize_page(page, store, summarize)
+            page = []
+    if page:
+        yield _summarize_page(page, store, summarize)
+
+
+def _summarize_page(
+    page: List[Record], store: SummaryStore, summarize: Callable[[str], str]
+) -> List[Dict[str, Any]]:
+    """Summarize the documents of a page, computing only missing summaries."""
+    hashes = [content_hash(text) for _, text, _ in page]
+    stored = store.get_many(hashes)
+    computed = {}
+    for (_, text, _), digest in zip(page, hashes):
+        if digest not in stored and digest not in computed:
+            computed[digest] = summarize(text)
+    if computed:
+        store.put_many(computed.items())
+    stored.update(computed)
+    return [
+        {"id": doc_id, "summary": stored[digest], "metadata": metadata}
+        for (doc_id, _, metadata), digest in zip(page, hashes)
+    ]
@@ -1,5 +1,208 @@
+import codecs
+import hashlib
+import io
+import json
+import os
 import re
-from typing import Dict, List, Optional
+import stat
+from collections import Counter
+from functools import partial
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .cache import LRUCache
+
+# Complexity levels in tie-breaking order
+COMPLEXITY_LEVELS = ("simple", "medium", "complex", "creative")
+
+# Base token estimates of the levels, used for levels a rule set does not estimate
+DEFAULT_TOKEN_ESTIMATES = {
+    "simple": 500,
+    "medium": 1000,
+    "complex": 2000,
+    "creative": 1500,
+}
+
+# Characters read at a time when streaming a file object
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Texts at least this long are cached under a digest rather than kept as keys
+_CACHE_DIGEST_THRESHOLD = 1024
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    Build a regex alternation matching any of the words, shaped like a trie.
+
+    Shared prefixes are matched once, and at every branch longer continuations are
+    tried before stopping, so the regex engine finds the longest word at a position
+    without trying each word in turn.
+
+    Args:
+        words: Words to match
+
+    Returns:
+        Regex source for a non-capturing group matching exactly the given words
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        ends_here = "" in node
+        branches = [
+            re.escape(char) + build(child) for char, child in node.items() if char
+        ]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not ends_here:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if ends_here else "")
+
+    return "(?:" + build(trie) + ")"
+
+
+class ComplexityRuleSet:
+    """
+    Indicators, role defaults and token estimates used to analyze task complexity.
+
+    Indicators are compiled once into a single whole-word pattern, so texts are
+    scanned in one pass however many indicators there are. Matches do not overlap:
+    text is scanned left to right and at each position only the longest matching
+    indicator counts, so with indicators "deep" and "deep dive" the text "deep dive"
+    counts "deep dive" once and "deep" not at all. A rule set is not changed after
+    construction, which lets analyses share it safely between threads.
+    """
+
+    def __init__(
+        self,
+        indicators: Dict[str, Iterable[str]],
+        role_mapping: Optional[Dict[str, str]] = None,
+        token_estimates: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Compile a rule set.
+
+        Args:
+            indicators: Mapping of complexity level to indicator phrases
+            role_mapping: Mapping of role name to its default complexity level;
+                None for no role defaults
+            token_estimates: Mapping of complexity level to its base token
+                estimate; levels left out use DEFAULT_TOKEN_ESTIMATES
+
+        Raises:
+            ValueError: If a level is unknown, an indicator is empty, or a token
+                estimate is not a positive integer
+        """
+        self.indicators = {
+            self._check_level(level): tuple(
+                self._check_indicator(indicator) for indicator in level_indicators
+            )
+            for level, level_indicators in indicators.items()
+        }
+        self.role_mapping = {
+            role.lower(): self._check_level(level)
+            for role, level in (role_mapping or {}).items()
+        }
+        self.token_estimates = dict(DEFAULT_TOKEN_ESTIMATES)
+        for level, tokens in (token_estimates or {}).items():
+            if not isinstance(tokens, int) or isinstance(tokens, bool) or tokens <= 0:
+                raise ValueError(
+                    f"Token estimate for {level} must be a positive integer"
+                )
+            self.token_estimates[self._check_level(level)] = tokens
+
+        # Indicators match lowercased text, each counting toward all of its levels
+        self.levels_by_indicator: Dict[str, List[str]] = {}
+        for level, level_indicators in self.indicators.items():
+            for indicator in level_indicators:
+                self.levels_by_indicator.setdefault(indicator, []).append(level)
+        if self.levels_by_indicator:
+            self.pattern = re.compile(
+                r"\b" + _trie_regex(self.levels_by_indicator) + r"\b"
+            )
+        else:
+            self.pattern = re.compile(r"(?!)")  # Never matches
+        self.longest_indicator = max(map(len, self.levels_by_indicator), default=0)
+        self.shortest_indicator = min(map(len, self.levels_by_indicator), default=1)
+
+    @staticmethod
+    def _check_level(level: str) -> str:
+        if level not in COMPLEXITY_LEVELS:
+            raise ValueError(
+                f"Unknown complexity level: {level}. "
+                f"Expected one of {', '.join(COMPLEXITY_LEVELS)}"
+            )
+        return level
+
+    @staticmethod
+    def _check_indicator(indicator: str) -> str:
+        if not isinstance(indicator, str) or not indicator.strip():
+            raise ValueError(f"Invalid complexity indicator: {indicator!r}")
+        return indicator.strip().lower()
+
+    @classmethod
+    def from_dict(
+        cls, data: Dict[str, dict], defaults: Optional["ComplexityRuleSet"] = None
+    ) -> "ComplexityRuleSet":
+        """
+        Create a rule set from a dictionary.
+
+        Sections missing from data are taken from defaults, and so are the token
+        estimates of levels missing from the "token_estimates" section. The
+        "indicators" and "roles" sections replace those of defaults as a whole.
+
+        Args:
+            data: Dictionary with "indicators", "roles" and "token_estimates" sections
+            defaults: Rule set providing what data leaves out; defaults to
+                TaskComplexityAnalyzer.DEFAULT_RULE_SET
+
+        Returns:
+            The compiled rule set
+        """
+        unknown = set(data) - {"indicators", "roles", "token_estimates"}
+        if unknown:
+            raise ValueError(f"Unknown rule set sections: {', '.join(sorted(unknown))}")
+
+        if defaults is None:
+            defaults = TaskComplexityAnalyzer.DEFAULT_RULE_SET
+        return cls(
+            data.get("indicators", defaults.indicators),
+            data.get("roles", defaults.role_mapping),
+            {**defaults.token_estimates, **data.get("token_estimates", {})},
+        )
+
+    @classmethod
+    def from_json(
+        cls, path: str, defaults: Optional["ComplexityRuleSet"] = None
+    ) -> "ComplexityRuleSet":
+        """
+        Load a rule set from a JSON file.
+
+        Args:
+            path: Path of a JSON file holding a dictionary as accepted by from_dict
+            defaults: Rule set providing what the file leaves out; defaults to
+                TaskComplexityAnalyzer.DEFAULT_RULE_SET
+
+        Returns:
+            The compiled rule set
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f), defaults)
+
+    def to_dict(self) -> Dict[str, dict]:
+        """Return the rule set as a dictionary accepted by from_dict."""
+        return {
+            "indicators": {
+                level: list(indicators) for level, indicators in self.indicators.items()
+            },
+            "roles": dict(self.role_mapping),
+            "token_estimates": dict(self.token_estimates),
+        }
 
 
 class TaskComplexityAnalyzer:
@@ -8,7 +211,7 @@ class TaskComplexityAnalyzer:
     This helps optimize model selection and generation parameters based on task needs.
     """
 
-    # Complexity indicators (words that suggest complexity level)
+    # Default complexity indicators (words that suggest complexity level)
     COMPLEXITY_INDICATORS = {
         "simple": [
             "brief",
@@ -73,7 +276,7 @@ class TaskComplexityAnalyzer:
         ],
     }
 
-    # Role-based default complexity mappings
+    # Default role-based complexity mappings
     ROLE_COMPLEXITY_MAPPING = {
         "researcher": "complex",
         "expert": "complex",
@@ -96,24 +299,193 @@ class TaskComplexityAnalyzer:
         "approver": "simple",
     }
 
+    # Default base token estimates per complexity level
+    TOKEN_ESTIMATES = DEFAULT_TOKEN_ESTIMATES
+
+    # Rule set compiled from the defaults above
+    DEFAULT_RULE_SET = ComplexityRuleSet(
+        COMPLEXITY_INDICATORS, ROLE_COMPLEXITY_MAPPING, TOKEN_ESTIMATES
+    )
+
+    # Rule set used by all analyses. It is only ever replaced as a whole, and each
+    # analysis reads it once, so swapping it never pauses or mixes up analyses.
+    _rules = DEFAULT_RULE_SET
+
+    @classmethod
+    def get_rule_set(cls) -> ComplexityRuleSet:
+        """Return the rule set currently used for analysis."""
+        return cls._rules
+
+    @classmethod
+    def set_rule_set(cls, rule_set: ComplexityRuleSet) -> None:
+        """
+        Replace the rule set used for analysis.
+
+        Analyses already running finish with the previous rule set. Cached results
+        are keyed by rule set, so they are never reused across rule sets.
+
+        Args:
+            rule_set: The compiled rule set to use
+        """
+        if not isinstance(rule_set, ComplexityRuleSet):
+            raise ValueError("rule_set must be a ComplexityRuleSet")
+        cls._rules = rule_set
+
+    @classmethod
+    def load_rule_set(cls, source: Union[str, Dict[str, dict]]) -> ComplexityRuleSet:
+        """
+        Load, compile and activate a rule set.
+
+        Sections missing from the source are taken from the default rule set, so a
+        source can change only the token estimates, for instance.
+
+        Indicators are counted as non-overlapping whole-word matches, the longest
+        one at each position, rather than each indicator on its own. The default
+        indicators do not overlap, but with custom ones such as "deep" and
+        "deep dive" the text "deep dive" scores only for "deep dive".
+
+        Args:
+            source: Path of a JSON rule set file, or a rule set dictionary
+
+        Returns:
+            The activated rule set
+        """
+        if isinstance(source, dict):
+            rule_set = ComplexityRuleSet.from_dict(source, cls.DEFAULT_RULE_SET)
+        else:
+            rule_set = ComplexityRuleSet.from_json(source, cls.DEFAULT_RULE_SET)
+        cls.set_rule_set(rule_set)
+        return rule_set
+
+    # Optional cache of analysis results, see enable_cache
+    _cache: Optional[LRUCache] = None
+
+    @classmethod
+    def enable_cache(cls, maxsize: int = 1024) -> None:
+        """
+        Cache analyze_complexity results for repeated texts.
+
+        Calling it again with the cache enabled resizes the cache and keeps its entries.
+
+        Args:
+            maxsize: Maximum number of cached results, least recently used evicted first
+        """
+        if cls._cache is None:
+            cls._cache = LRUCache(maxsize)
+        else:
+            cls._cache.resize(maxsize)
+
+    @classmethod
+    def disable_cache(cls) -> None:
+        """Stop caching analysis results and drop the cache."""
+        cls._cache = None
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Remove all cached analysis results and reset the cache statistics."""
+        if cls._cache is not None:
+            cls._cache.clear()
+
     @classmethod
-    def analyze_complexity(cls, text: str, role: Optional[str] = None) -> str:
+    def cache_info(cls) -> Optional[Dict[str, object]]:
+        """
+        Get statistics of the analysis cache.
+
+        Returns:
+            Dictionary with hits, misses, hit_rate, size and maxsize, or None if the
+            cache is disabled
+        """
+        return cls._cache.stats() if cls._cache is not None else None
+
+    @staticmethod
+    def _cache_key(
+        text: str, role: Optional[str], rules: ComplexityRuleSet
+    ) -> Tuple[object, ...]:
+        """
+        Build the cache key of an analysis with a rule set.
+
+        Surrounding whitespace and the case of the role do not affect the result, so
+        they are normalized away. Long texts are replaced by a digest so the cache
+        does not keep large documents alive.
+        """
+        text = text.strip()
+        if len(text) >= _CACHE_DIGEST_THRESHOLD:
+            text = hashlib.blake2b(
+                text.encode("utf-8", "surrogatepass"), digest_size=16
+            ).digest()
+        return rules, text, role.lower() if role else None
+
+    @classmethod
+    def analyze_complexity(
+        cls, text: str, role: Optional[str] = None, cache: Optional[LRUCache] = None
+    ) -> str:
         """
         Analyze the complexity of a task based on text content and role.
 
         Args:
             text: The task text to analyze
             role: Optional role for role-based complexity bias
+            cache: Cache of results to use instead of the shared one enabled by
+                enable_cache, for instance one owned by an agent
 
         Returns:
             Complexity level: "simple", "medium", "complex", or "creative"
         """
-        # Clean and normalize text
-        text = text.lower().strip()
+        rules = cls._rules
+        if cache is None:
+            cache = cls._cache
+        if cache is None:
+            return cls._analyze_complexity(text, role, rules)
+
+        key = cls._cache_key(text, role, rules)
+        complexity = cache.get(key)
+        if complexity is None:
+            complexity = cls._analyze_complexity(text, role, rules)
+            cache.put(key, complexity)
+        return complexity
+
+    @classmethod
+    def _analyze_complexity(
+        cls, text: str, role: Optional[str], rules: ComplexityRuleSet
+    ) -> str:
+        """Analyze the complexity of a task with a rule set, bypassing the cache."""
+        # Normalize text
+        text = text.lower()
 
         # Count words to establish base complexity
         word_count = len(text.split())
 
+        # Check for complexity indicators in text
+        indicator_scores = {level: 0 for level in COMPLEXITY_LEVELS}
+
+        # Count indicators, found as whole words, for each complexity level
+        levels_by_indicator = rules.levels_by_indicator
+        for indicator, count in Counter(rules.pattern.findall(text)).items():
+            for level in levels_by_indicator[indicator]:
+                indicator_scores[level] += count
+
+        return cls._resolve_complexity(word_count, indicator_scores, role, rules)
+
+    @classmethod
+    def _resolve_complexity(
+        cls,
+        word_count: int,
+        indicator_scores: Dict[str, int],
+        role: Optional[str],
+        rules: ComplexityRuleSet,
+    ) -> str:
+        """
+        Combine word count, indicator scores and role into a complexity level.
+
+        Args:
+            word_count: Number of words in the task text
+            indicator_scores: Number of indicators found for each complexity level
+            role: Optional role for role-based complexity bias
+            rules: Rule set providing the role defaults
+
+        Returns:
+            Complexity level: "simple", "medium", "complex", or "creative"
+        """
         # Base complexity on word count
         base_complexity = "simple"
         if word_count > 50:
@@ -121,16 +493,6 @@ class TaskComplexityAnalyzer:
         if word_count > 200:
             base_complexity = "complex"
 
-        # Check for complexity indicators in text
-        indicator_scores = {"simple": 0, "medium": 0, "complex": 0, "creative": 0}
-
-        # Count indicators for each complexity level
-        for level, indicators in cls.COMPLEXITY_INDICATORS.items():
-            for indicator in indicators:
-                # Look for the indicator as a whole word
-                matches = re.findall(r"\b" + re.escape(indicator) + r"\b", text)
-                indicator_scores[level] += len(matches)
-
         # Determine the highest scoring complexity level
         max_score = 0
         content_complexity = base_complexity
@@ -145,8 +507,8 @@ class TaskComplexityAnalyzer:
             content_complexity = base_complexity
 
         # Apply role-based bias if role is provided
-        if role and role.lower() in cls.ROLE_COMPLEXITY_MAPPING:
-            role_complexity = cls.ROLE_COMPLEXITY_MAPPING[role.lower()]
+        if role and role.lower() in rules.role_mapping:
+            role_complexity = rules.role_mapping[role.lower()]
 
             # Compute final complexity, with content analysis having more weight
             # Content analysis: 70%, Role-based default: 30%
@@ -176,15 +538,7 @@ class TaskComplexityAnalyzer:
         Returns:
             Estimated max tokens needed
         """
-        # Base token estimates
-        token_estimates = {
-            "simple": 500,
-            "medium": 1000,
-            "complex": 2000,
-            "creative": 1500,
-        }
-
-        base_tokens = token_estimates.get(complexity, 1000)
+        base_tokens = cls._rules.token_estimates.get(complexity, 1000)
 
         # Add extra tokens for references if needed
         if with_references:
@@ -193,6 +547,259 @@ class TaskComplexityAnalyzer:
 
         return base_tokens
 
+    @classmethod
+    def analyze_batch(
+        cls,
+        texts: Sequence[str],
+        roles: Optional[Union[str, Sequence[Optional[str]]]] = None,
+        with_references: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Analyze the complexity of many tasks at once.
+
+        Gives the same results as calling analyze_complexity and estimate_token_needs
+        for each text, but scans all texts with a single pass of the indicator pattern
+        and scores them with NumPy on a (texts x levels) matrix of indicator counts.
+
+        Args:
+            texts: The task texts to analyze
+            roles: Optional role for all texts, or one optional role per text
+            with_references: Whether references/citations are needed
+
+        Returns:
+            Tuple of (array of complexity levels, array of estimated max tokens)
+        """
+        count = len(texts)
+        if roles is None or isinstance(roles, str):
+            roles = [roles] * count
+        elif len(roles) != count:
+            raise ValueError("roles must have one entry per text")
+
+        rules = cls._rules
+        num_levels = len(COMPLEXITY_LEVELS)
+        level_index = {level: i for i, level in enumerate(COMPLEXITY_LEVELS)}
+
+        # Scan all texts as one string; newlines keep word boundaries at their edges
+        lowered = [text.lower() for text in texts]
+        word_counts = np.fromiter(
+            (len(text.split()) for text in lowered), dtype=np.int64, count=count
+        )
+        ends = np.cumsum([len(text) + 1 for text in lowered], dtype=np.int64)
+
+        starts, columns = [], []
+        levels_by_indicator = rules.levels_by_indicator
+        for match in rules.pattern.finditer("\n".join(lowered)):
+            for level in levels_by_indicator[match.group()]:
+                starts.append(match.start())
+                columns.append(level_index[level])
+
+        rows = np.searchsorted(ends, np.asarray(starts, dtype=np.int64), side="right")
+        scores = np.bincount(
+            rows * num_levels + np.asarray(columns, dtype=np.int64),
+            minlength=count * num_levels,
+        ).reshape(count, num_levels)
+
+        # Base complexity on word count
+        base = np.where(
+            word_counts > 200,
+            level_index["complex"],
+            np.where(word_counts > 50, level_index["medium"], level_index["simple"]),
+        )
+
+        # Highest scoring level, ties going to the earlier level
+        max_scores = scores.max(axis=1)
+        content = np.where(max_scores == 0, base, scores.argmax(axis=1))
+
+        # Role-based bias, overridden by strong content indicators
+        role_levels = np.fromiter(
+            (
+                level_index[rules.role_mapping[role.lower()]]
+                if role and role.lower() in rules.role_mapping
+                else -1
+                for role in roles
+            ),
+            dtype=np.int64,
+            count=count,
+        )
+        keep_content = (role_levels < 0) | (content == role_levels) | (max_scores >= 3)
+        final = np.where(keep_content, content, role_levels)
+
+        levels = np.asarray(COMPLEXITY_LEVELS)[final]
+        tokens = np.asarray(
+            [rules.token_estimates[level] for level in COMPLEXITY_LEVELS]
+        )[final]
+        if with_references:
+            tokens = (tokens + tokens * 0.3).astype(np.int64)
+
+        return levels, tokens
+
+    @classmethod
+    def analyze_complexity_stream(
+        cls,
+        source: Union[IO, Iterable[Union[str, bytes]]],
+        role: Optional[str] = None,
+        total_length: Optional[int] = None,
+    ) -> str:
+        """
+        Analyze the complexity of a task text that is read in chunks.
+
+        Gives the same result as analyze_complexity on the concatenated text, without
+        holding the whole text in memory. Indicators spanning chunk boundaries are
+        found, and reading stops as soon as the remaining text can no longer change
+        the result. That needs a bound on the remaining text, which is taken from
+        total_length or, for a file object opened directly on a regular file, from
+        the size of the file. Other sources, such as pipes or compressed files, are
+        read to the end.
+
+        Args:
+            source: File object, or iterable of text chunks; bytes are decoded as UTF-8
+            role: Optional role for role-based complexity bias
+            total_length: Optional upper bound on the number of characters in the text
+
+        Returns:
+            Complexity level: "simple", "medium", "complex", or "creative"
+        """
+        if hasattr(source, "read"):
+            if total_length is None:
+                total_length = cls._remaining_file_length(source)
+            source = iter(partial(source.read, STREAM_CHUNK_SIZE), source.read(0))
+
+        rules = cls._rules
+        pattern = rules.pattern
+        levels_by_indicator = rules.levels_by_indicator
+        # A match starting at a position depends on the preceding character and on at
+        # most the longest indicator plus one character after it
+        lookahead = rules.longest_indicator + 1
+        shortest = rules.shortest_indicator
+
+        indicator_scores = {level: 0 for level in COMPLEXITY_LEVELS}
+        word_count = 0
+        ends_in_word = False
+        consumed = 0
+        buffer = ""
+        scan_from = 0
+
+        for chunk in cls._decode_chunks(source):
+            if not chunk:
+                continue
+            consumed += len(chunk)
+            chunk = chunk.lower()
+
+            # Count words, joining a word split across the chunk boundary
+            word_count += len(chunk.split())
+            if ends_in_word and not chunk[0].isspace():
+                word_count -= 1
+            ends_in_word = not chunk[-1].isspace()
+
+            # Count matches that lie far enough from the end to be complete
+            buffer += chunk
+            cutoff = len(buffer) - lookahead
+            for match in pattern.finditer(buffer, scan_from):
+                if match.start() >= cutoff:
+                    break
+                for level in levels_by_indicator[match.group()]:
+                    indicator_scores[level] += 1
+                scan_from = match.end()
+            scan_from = max(scan_from, cutoff, 0)
+
+            # Keep one character before the unscanned text for word boundaries
+            keep = max(scan_from - 1, 0)
+            buffer = buffer[keep:]
+            scan_from -= keep
+
+            if total_length is not None:
+                unscanned = len(buffer) - scan_from + max(total_length - consumed, 0)
+                result = cls._settled_complexity(
+                    indicator_scores, unscanned // shortest, role, rules
+                )
+                if result is not None:
+                    return result
+
+        for match in pattern.finditer(buffer, scan_from):
+            for level in levels_by_indicator[match.group()]:
+                indicator_scores[level] += 1
+
+        return cls._resolve_complexity(word_count, indicator_scores, role, rules)
+
+    @staticmethod
+    def _remaining_file_length(source: IO) -> Optional[int]:
+        """
+        Bound the number of characters left in a file object, if it can be trusted.
+
+        Only a file object reading a regular file directly qualifies, optionally
+        through buffering and text decoding, since each character takes at least one
+        byte. Pipes report no size, and wrappers such as gzip files report the size
+        of what they decompress, so neither gives a bound.
+        """
+        raw = getattr(source, "buffer", source)
+        raw = getattr(raw, "raw", raw)
+        if not isinstance(raw, io.FileIO):
+            return None
+        try:
+            status = os.fstat(raw.fileno())
+            if not stat.S_ISREG(status.st_mode):
+                return None
+            size = status.st_size
+            position = source.tell()
+        except (OSError, ValueError):
+            return None
+        # The position of a text file can be an opaque cookie rather than a byte
+        # offset, in which case the whole file size is the bound
+        return size - position if 0 <= position <= size else size
+
+    @staticmethod
+    def _decode_chunks(chunks: Iterable[Union[str, bytes]]) -> Iterator[str]:
+        """Yield text chunks, decoding bytes incrementally as UTF-8."""
+        decoder = None
+        for chunk in chunks:
+            if isinstance(chunk, (bytes, bytearray)):
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                chunk = decoder.decode(chunk)
+            yield chunk
+        if decoder is not None:
+            yield decoder.decode(b"", final=True)
+
+    @classmethod
+    def _settled_complexity(
+        cls,
+        indicator_scores: Dict[str, int],
+        max_gain: int,
+        role: Optional[str],
+        rules: ComplexityRuleSet,
+    ) -> Optional[str]:
+        """
+        Determine the complexity if it can no longer change.
+
+        Args:
+            indicator_scores: Indicator scores counted so far
+            max_gain: Upper bound on the score any level can still gain
+            role: Optional role for role-based complexity bias
+            rules: Rule set providing the role defaults
+
+        Returns:
+            The final complexity level, or None if more text could change it
+        """
+        role_complexity = rules.role_mapping.get(role.lower()) if role else None
+        max_score = max(indicator_scores.values())
+
+        # Weak content indicators can no longer override the role default
+        if role_complexity is not None and max_score + max_gain < 3:
+            return role_complexity
+
+        # The leading level stays ahead even if every other level gains the most
+        leader = max(indicator_scores, key=indicator_scores.get)
+        if any(
+            score + max_gain >= max_score
+            for level, score in indicator_scores.items()
+            if level != leader
+        ):
+            return None
+        if role_complexity in (None, leader) or max_score >= 3:
+            return leader
+        # Whether the role default applies depends on the score still reaching 3
+        return None
+
 
 # Example usage
 if __name__ == "__main__":
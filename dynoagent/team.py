@@ -1,10 +1,16 @@
 import asyncio
+import inspect
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 import networkx as nx
 
+from .coalescer import QueryCoalescer
 from .core import DynoAgent
+from .dag import IncrementalTopologicalOrder
 from .dyno_agent_with_tools import DynoAgentWithTools
+from .matching import MultiPatternMatcher
 
 
 class Team:
@@ -13,11 +19,26 @@ class Team:
     The team can execute agents in parallel or sequentially based on the dependency graph.
     """
 
+    # Ways of running an agent during parallel execution
+    EXECUTOR_KINDS = ("thread", "process", "async")
+
+    # Weight of the latest measurement in each agent's moving average cost
+    COST_SMOOTHING = 0.3
+
+    # Estimated scheduling cost in seconds of running one agent in parallel
+    PARALLEL_DISPATCH_OVERHEAD = 0.0002
+
     def __init__(
         self,
         name: str,
         agents: List[DynoAgent] = None,
         explicit_dependencies: Dict[str, List[str]] = None,
+        incremental: bool = False,
+        max_concurrency: Optional[int] = None,
+        executor: Union[str, Executor] = "thread",
+        agent_executors: Dict[str, Union[str, Executor]] = None,
+        coalesce_queries: bool = False,
+        query_window: float = 0.002,
     ):
         """
         Initialize a team with a list of agents and optional explicit dependencies.
@@ -26,17 +47,52 @@ class Team:
             name: Name of the team
             agents: List of DynoAgent instances
             explicit_dependencies: Dictionary mapping agent names to lists of agent names they depend on
+            incremental: If True, add_agent only compares the new agent against the
+                existing agents and updates the levels of the affected subgraph
+                instead of re-analyzing the whole team
+            max_concurrency: Maximum number of agents running at once during parallel
+                execution; None means unbounded
+            executor: How agents run during parallel execution: "thread" (default
+                thread pool), "process" (a process pool owned by the team, for
+                CPU-bound agents), "async" (directly on the event loop, for agents
+                whose perform_task is a coroutine) or a concurrent.futures.Executor.
+                Agents overriding perform_task_async are always awaited directly
+            agent_executors: Dictionary mapping agent names to executors overriding
+                the team-wide executor
+            coalesce_queries: If True, index queries that agents sharing a vector
+                index make during parallel execution are merged into batch searches
+            query_window: Seconds a coalesced query waits for others to join its batch
         """
         if not name or not isinstance(name, str):
             raise ValueError("Team name must be a non-empty string")
+        if max_concurrency is not None and (
+            not isinstance(max_concurrency, int) or max_concurrency <= 0
+        ):
+            raise ValueError("max_concurrency must be a positive integer")
+        if query_window < 0:
+            raise ValueError("query_window must not be negative")
 
         self.name = name
         self.agents = agents or []
         self.agent_map = {agent.name: agent for agent in self.agents}
         self.explicit_dependencies = explicit_dependencies or {}
         self.dependency_graph = nx.DiGraph()
+        self._topological_order = IncrementalTopologicalOrder(self.dependency_graph)
         self.execution_plan = []
         self.results = {}
+        self.incremental = incremental
+        self._levels: Dict[str, int] = {}
+        self.max_concurrency = max_concurrency
+        self.executor = self._validate_executor(executor)
+        self.agent_executors = {}
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._runner: Optional[asyncio.Runner] = None
+        self.agent_costs: Dict[str, float] = {}  # Measured seconds per agent run
+        self.coalesce_queries = coalesce_queries
+        self.query_window = query_window
+
+        for agent_name, agent_executor in (agent_executors or {}).items():
+            self.set_agent_executor(agent_name, agent_executor)
 
         # Validate dependencies
         if explicit_dependencies:
@@ -49,16 +105,11 @@ class Team:
 
         # Add agents to the dependency graph
         for agent in self.agents:
-            self.dependency_graph.add_node(agent.name, agent=agent)
+            self._topological_order.add_node(agent.name, agent=agent)
 
-        # Add explicit dependencies to the graph
+        # Add explicit dependencies to the graph, checking for cycles in one pass
         self._add_explicit_dependencies()
 
-        # Check for circular dependencies
-        if not nx.is_directed_acyclic_graph(self.dependency_graph):
-            cycles = list(nx.simple_cycles(self.dependency_graph))
-            raise ValueError(f"Circular dependencies detected in team: {cycles}")
-
         # Analyze dependencies between agents
         self._analyze_dependencies()
 
@@ -73,6 +124,8 @@ class Team:
             agent: The agent to add
             dependencies: List of agent names this agent depends on
         """
+        if agent.name in self.agent_map:
+            raise ValueError(f"Agent '{agent.name}' is already in the team")
         if dependencies:
             # Validate all dependencies exist before adding the agent
             for dep in dependencies:
@@ -81,51 +134,226 @@ class Team:
 
         self.agents.append(agent)
         self.agent_map[agent.name] = agent
-        self.dependency_graph.add_node(agent.name, agent=agent)
+        self._topological_order.add_node(agent.name, agent=agent)
 
         if dependencies:
             self.explicit_dependencies[agent.name] = dependencies
             for dep in dependencies:
                 if dep in self.agent_map:
-                    self.dependency_graph.add_edge(dep, agent.name)
+                    self._add_dependency_edge(dep, agent.name)
 
-        # Re-analyze dependencies and update execution plan
-        self._analyze_dependencies()
-        self._create_execution_plan()
+        try:
+            if self.incremental:
+                # Only pairs involving the new agent can produce new edges
+                self._analyze_agent_dependencies(agent, self.agents)
+                self._update_levels(agent.name)
+                return
+
+            # Re-analyze dependencies and update execution plan
+            self._analyze_dependencies()
+            self._create_execution_plan()
+        except ValueError:
+            self._remove_agent(agent)
+            raise
+
+    def add_agents(
+        self,
+        agents: List[DynoAgent],
+        dependencies: Dict[str, List[str]] = None,
+    ) -> None:
+        """
+        Add several agents at once, rebuilding the execution plan a single time.
+
+        Args:
+            agents: The agents to add
+            dependencies: Dictionary mapping new agent names to lists of agent names
+                they depend on; dependencies may refer to agents in the same batch
+        """
+        dependencies = dependencies or {}
+        new_names = set()
+
+        # Validate names and dependencies before adding any agent, so that the
+        # rollback below only ever removes agents of this batch
+        for agent in agents:
+            if agent.name in self.agent_map or agent.name in new_names:
+                raise ValueError(f"Agent '{agent.name}' is already in the team")
+            new_names.add(agent.name)
+        for agent_name, deps in dependencies.items():
+            if agent_name not in new_names:
+                raise ValueError(f"Agent '{agent_name}' not found in new agents")
+            for dep in deps:
+                if dep not in self.agent_map and dep not in new_names:
+                    raise ValueError(f"Dependency '{dep}' not found in team")
+
+        existing_count = len(self.agents)
+        for agent in agents:
+            self.agents.append(agent)
+            self.agent_map[agent.name] = agent
+            self._topological_order.add_node(agent.name, agent=agent)
+
+        try:
+            for agent_name, deps in dependencies.items():
+                if deps:
+                    self.explicit_dependencies[agent_name] = deps
+                    self._add_dependency_edges([(dep, agent_name) for dep in deps])
+
+            if self.incremental:
+                # Compare each new agent with every agent added before it, so that
+                # each pair involving at least one new agent is checked once
+                for index in range(existing_count, len(self.agents)):
+                    agent = self.agents[index]
+                    self._analyze_agent_dependencies(agent, self.agents[:index])
+            else:
+                self._analyze_dependencies()
+
+            self._create_execution_plan()
+        except ValueError:
+            for agent in agents:
+                self._remove_agent(agent)
+            raise
+
+    def _remove_agent(self, agent: DynoAgent) -> None:
+        """
+        Undo the addition of an agent whose dependencies could not be applied.
+
+        Args:
+            agent: The agent to remove
+        """
+        self.agents.remove(agent)
+        self.agent_map.pop(agent.name, None)
+        self.explicit_dependencies.pop(agent.name, None)
+        self._topological_order.remove_node(agent.name)
+        self._levels.pop(agent.name, None)
+
+    def _add_dependency_edge(self, provider_name: str, consumer_name: str) -> None:
+        """
+        Add an edge to the dependency graph, rejecting edges that would create a cycle.
+
+        The topological order of the graph is maintained incrementally, so only the
+        agents ordered between the two endpoints are searched.
+
+        Args:
+            provider_name: Name of the agent that must run first
+            consumer_name: Name of the agent that depends on it
+        """
+        if self.dependency_graph.has_edge(provider_name, consumer_name):
+            return
+        try:
+            self._topological_order.add_edge(provider_name, consumer_name)
+        except ValueError as e:
+            raise ValueError(
+                f"Adding dependency from {provider_name} to {consumer_name} "
+                f"would create circular dependencies: {e}"
+            ) from None
+
+    def _add_dependency_edges(self, edges: List[Tuple[str, str]]) -> None:
+        """
+        Add many edges to the dependency graph with a single cycle check.
+
+        Args:
+            edges: Pairs of (provider name, consumer name)
+        """
+        try:
+            self._topological_order.add_edges(edges)
+        except ValueError as e:
+            raise ValueError(f"Circular dependencies detected in team: {e}") from None
 
     def _add_explicit_dependencies(self) -> None:
         """Add explicit dependencies to the dependency graph."""
-        for agent_name, dependencies in self.explicit_dependencies.items():
-            if agent_name in self.agent_map:
-                for dep in dependencies:
-                    if dep in self.agent_map:
-                        self.dependency_graph.add_edge(dep, agent_name)
-                        # Check for cycles after each edge addition
-                        if not nx.is_directed_acyclic_graph(self.dependency_graph):
-                            cycles = list(nx.simple_cycles(self.dependency_graph))
-                            self.dependency_graph.remove_edge(
-                                dep, agent_name
-                            )  # Remove the edge that caused the cycle
-                            raise ValueError(
-                                f"Adding dependency from {dep} to {agent_name} would create circular dependencies: {cycles}"
-                            )
+        self._add_dependency_edges(
+            [
+                (dep, agent_name)
+                for agent_name, dependencies in self.explicit_dependencies.items()
+                if agent_name in self.agent_map
+                for dep in dependencies
+                if dep in self.agent_map
+            ]
+        )
 
     def _analyze_dependencies(self) -> None:
         """
         Analyze dependencies between agents based on their input dependencies and tools.
         Adds edges to the dependency graph representing these dependencies.
+
+        Instead of comparing every pair of agents, tool names and dependency types are
+        indexed once and matched against each agent's text in a single pass.
+        """
+        # Check if agents need any tool or data that other agents provide
+        self._add_tool_dependency_edges()
+
+        # Check if agents have input dependencies that can be resolved by other agents
+        self._add_input_dependency_edges()
+
+    def _add_tool_dependency_edges(self) -> None:
+        """Add edges from tool providers to the agents referencing their tools."""
+        agents = [agent for agent in self.agents if hasattr(agent, "tools_dataloaders")]
+
+        # Index tool name -> providers
+        providers_by_tool: Dict[str, List[DynoAgent]] = {}
+        for provider in agents:
+            for tool in provider.tools_dataloaders:
+                providers_by_tool.setdefault(tool, []).append(provider)
+        if not providers_by_tool:
+            return
+
+        matcher = MultiPatternMatcher(providers_by_tool)
+        edges = []
+        for consumer in agents:
+            # If consumer references provider's tools in its name or goal
+            tools = matcher.find(consumer.name.lower())
+            if hasattr(consumer, "goal"):
+                tools |= matcher.find(consumer.goal.lower())
+            for tool in tools:
+                for provider in providers_by_tool[tool]:
+                    if provider != consumer:
+                        edges.append((provider.name, consumer.name))
+        self._add_dependency_edges(edges)
+
+    def _add_input_dependency_edges(self) -> None:
+        """Add edges from agents whose role or skills match another agent's input dependencies."""
+        # Index dependency type -> consumers
+        consumers_by_type: Dict[str, List[DynoAgent]] = {}
+        for consumer in self.agents:
+            if hasattr(consumer, "input_dependencies") and consumer.input_dependencies:
+                for dep_type in {
+                    type(dependency).__name__.lower()
+                    for dependency in consumer.input_dependencies
+                }:
+                    consumers_by_type.setdefault(dep_type, []).append(consumer)
+        if not consumers_by_type:
+            return
+
+        matcher = MultiPatternMatcher(consumers_by_type)
+        edges = []
+        for provider in self.agents:
+            # If provider's role or skills indicate it can provide these dependencies
+            dep_types = matcher.find(provider.role.lower())
+            for skill in provider.skills:
+                dep_types |= matcher.find(skill.lower())
+            for dep_type in dep_types:
+                for consumer in consumers_by_type[dep_type]:
+                    if provider != consumer:
+                        edges.append((provider.name, consumer.name))
+        self._add_dependency_edges(edges)
+
+    def _analyze_agent_dependencies(
+        self, agent: DynoAgent, others: List[DynoAgent]
+    ) -> None:
         """
-        # Check for input/output dependencies based on tools and dependencies
-        for agent_a in self.agents:
-            for agent_b in self.agents:
-                if agent_a == agent_b:
-                    continue
+        Analyze dependencies between a single agent and a list of other agents, in both directions.
 
-                # Check if agent_b needs any tool or data that agent_a provides
-                self._check_tool_dependencies(agent_a, agent_b)
+        Args:
+            agent: The agent to analyze
+            others: Agents to compare the agent against
+        """
+        for other in others:
+            if other == agent:
+                continue
 
-                # Check if agent_b has input dependencies that can be resolved by agent_a
-                self._check_input_dependencies(agent_a, agent_b)
+            self._check_tool_dependencies(other, agent)
+            self._check_input_dependencies(other, agent)
+            self._check_tool_dependencies(agent, other)
+            self._check_input_dependencies(agent, other)
 
     def _check_tool_dependencies(
         self, provider: DynoAgent, consumer: DynoAgent
@@ -148,7 +376,7 @@ class Team:
                 if tool in consumer.name.lower() or (
                     hasattr(consumer, "goal") and tool in consumer.goal.lower()
                 ):
-                    self.dependency_graph.add_edge(provider.name, consumer.name)
+                    self._add_dependency_edge(provider.name, consumer.name)
                     break
 
     def _check_input_dependencies(
@@ -173,7 +401,7 @@ class Team:
                 if dep_type in provider_role or any(
                     dep_type in skill for skill in provider_skills
                 ):
-                    self.dependency_graph.add_edge(provider.name, consumer.name)
+                    self._add_dependency_edge(provider.name, consumer.name)
                     break
 
     def _create_execution_plan(self) -> None:
@@ -182,45 +410,81 @@ class Team:
         Groups agents that can be executed in parallel.
         """
         try:
-            # Check for cycles in the dependency graph
-            if not nx.is_directed_acyclic_graph(self.dependency_graph):
-                cycles = list(nx.simple_cycles(self.dependency_graph))
-                raise ValueError(f"Dependency graph contains cycles: {cycles}")
-
-            # Get topological sort (respects dependencies)
-            topo_sort = list(nx.topological_sort(self.dependency_graph))
-
-            # Group agents that can be executed in parallel
-            self.execution_plan = []
-            visited = set()
-
-            for agent_name in topo_sort:
-                if agent_name in visited:
-                    continue
-
-                # Find all agents at the same "level" (can be executed in parallel)
-                level = set()
-                for node in topo_sort:
-                    if node in visited:
-                        continue
-
-                    # If all node's dependencies are visited, it's at current level
-                    if all(
-                        pred in visited
-                        for pred in self.dependency_graph.predecessors(node)
-                    ):
-                        level.add(node)
-
-                self.execution_plan.append(list(level))
-                visited.update(level)
+            # Group agents that can be executed in parallel: each generation holds
+            # the agents whose dependencies all lie in earlier generations, which is
+            # computed in a single Kahn-style pass over the graph
+            self.execution_plan = [
+                list(generation)
+                for generation in nx.topological_generations(self.dependency_graph)
+            ]
+
+            # The plan is a topological order, so resynchronize the cycle detector
+            self._topological_order.reset(
+                node for level in self.execution_plan for node in level
+            )
 
-        except ValueError as e:
-            # Re-raise ValueError for circular dependencies
-            raise ValueError(str(e))
+            self._levels = {
+                node: index
+                for index, level in enumerate(self.execution_plan)
+                for node in level
+            }
+
+        except nx.NetworkXUnfeasible:
+            # Report one concrete cycle rather than enumerating all of them
+            cycle = [edge[0] for edge in nx.find_cycle(self.dependency_graph)]
+            cycle.append(cycle[0])
+            raise ValueError(
+                f"Dependency graph contains cycles: {' -> '.join(cycle)}"
+            ) from None
         except Exception as e:
             print(f"Error creating execution plan: {str(e)}")
             # Fallback to sequential execution
             self.execution_plan = [[agent.name] for agent in self.agents]
+            self._levels = {agent.name: i for i, agent in enumerate(self.agents)}
+
+    def _update_levels(self, agent_name: str) -> None:
+        """
+        Update the execution plan after a single agent was added to the graph.
+
+        Only the new agent and the agents reachable from it can change level, so the
+        longest-path levels are recomputed for that subgraph alone.
+
+        Args:
+            agent_name: Name of the newly added agent
+        """
+        # Collect the agents downstream of the new agent
+        affected = set()
+        stack = list(self.dependency_graph.successors(agent_name))
+        while stack:
+            node = stack.pop()
+            if node in affected:
+                continue
+            affected.add(node)
+            stack.extend(self.dependency_graph.successors(node))
+
+        new_levels = {}
+
+        def level_of(node):
+            return new_levels.get(node, self._levels.get(node, 0))
+
+        order = [agent_name]
+        if affected:
+            order.extend(nx.topological_sort(self.dependency_graph.subgraph(affected)))
+        for node in order:
+            level = 1 + max(
+                (level_of(pred) for pred in self.dependency_graph.predecessors(node)),
+                default=-1,
+            )
+            if node == agent_name or level != level_of(node):
+                new_levels[node] = level
+
+        self._levels.update(new_levels)
+
+        # Regroup the agents by level, keeping the order in which they were added
+        plan: List[List[str]] = [[] for _ in range(max(self._levels.values()) + 1)]
+        for agent in self.agents:
+            plan[self._levels[agent.name]].append(agent.name)
+        self.execution_plan = plan
 
     def execute_sequential(self, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -240,25 +504,70 @@ class Team:
                 agent = self.agent_map.get(agent_name)
                 if agent:
                     print(f"Executing {agent_name} sequentially")
+                    start = time.perf_counter()
                     result = agent.perform_task(f"Execute {agent_name}", context)
+                    self._record_cost(agent_name, time.perf_counter() - start)
                     results[agent_name] = result
                     context[agent_name] = result
 
         self.results = results
         return results
 
-    async def execute_parallel(self, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def execute_parallel(
+        self, context: Dict[str, Any] = None, scheduling: str = "levels"
+    ) -> Dict[str, Any]:
         """
         Execute agents in parallel based on the execution plan.
-        Agents within each level are executed in parallel, while levels are executed sequentially.
+
+        With "levels" scheduling, agents within each level are executed in parallel,
+        while levels are executed sequentially. With "dataflow" scheduling, each agent
+        starts as soon as all of its predecessors in the dependency graph have
+        completed, so the run takes as long as the critical path rather than the sum
+        of the slowest agent of every level.
 
         Args:
             context: Initial context for the agents
+            scheduling: Scheduling mode, "levels" or "dataflow"
 
         Returns:
             Dictionary of results from all agents
         """
+        if scheduling not in ("levels", "dataflow"):
+            raise ValueError("Scheduling must be 'levels' or 'dataflow'")
+
         context = context or {}
+        semaphore = (
+            asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        )
+
+        attached = self._attach_query_coalescers() if self.coalesce_queries else []
+        try:
+            if scheduling == "dataflow":
+                results = await self._execute_dataflow(context, semaphore)
+            else:
+                results = await self._execute_levels(context, semaphore)
+        finally:
+            self._detach_query_coalescers(attached)
+
+        self.results = results
+        return results
+
+    async def _execute_levels(
+        self,
+        context: Dict[str, Any],
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute the levels of the execution plan one after another, running the
+        agents of each level in parallel.
+
+        Args:
+            context: Context for the agents, updated with each agent's result
+            semaphore: Optional semaphore bounding the number of running agents
+
+        Returns:
+            Dictionary of results from all agents
+        """
         results = {}
 
         for level in self.execution_plan:
@@ -269,7 +578,7 @@ class Team:
                 if agent:
                     print(f"Preparing {agent_name} for parallel execution")
                     task = asyncio.create_task(
-                        self._execute_agent_async(agent, agent_name, context)
+                        self._execute_agent_async(agent, agent_name, context, semaphore)
                     )
                     level_tasks.append((agent_name, task))
 
@@ -279,15 +588,177 @@ class Team:
                 results[agent_name] = result
                 context[agent_name] = result
 
-        self.results = results
         return results
 
+    def _attach_query_coalescers(
+        self,
+    ) -> List[Tuple[DynoAgentWithTools, QueryCoalescer]]:
+        """
+        Give agents that share a vector index a common query coalescer.
+
+        Agents running in other processes are skipped, since their queries never
+        reach this process's event loop, and so are agents that already have a
+        coalescer of their own.
+
+        Returns:
+            The agents given a coalescer, each with the coalescer it was given
+        """
+        coalescers: Dict[int, QueryCoalescer] = {}
+        attached = []
+        for agent in self.agents:
+            if not isinstance(agent, DynoAgentWithTools) or agent.index is None:
+                continue
+            if agent.query_coalescer is not None:
+                continue
+            executor = self.agent_executors.get(agent.name, self.executor)
+            if executor == "process" or isinstance(executor, ProcessPoolExecutor):
+                continue
+            coalescer = coalescers.get(id(agent.index))
+            if coalescer is None:
+                coalescer = QueryCoalescer(
+                    agent.index.search_batch, window=self.query_window
+                )
+                coalescers[id(agent.index)] = coalescer
+            agent.query_coalescer = coalescer
+            attached.append((agent, coalescer))
+        return attached
+
+    def _detach_query_coalescers(
+        self, attached: List[Tuple[DynoAgentWithTools, QueryCoalescer]]
+    ) -> None:
+        """Remove the query coalescers given to agents and release them."""
+        for agent, coalescer in attached:
+            if agent.query_coalescer is coalescer:
+                agent.query_coalescer = None
+        for coalescer in {id(c): c for _, c in attached}.values():
+            coalescer.close()
+
+    async def _execute_dataflow(
+        self,
+        context: Dict[str, Any],
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute agents as soon as their dependencies are satisfied.
+
+        Args:
+            context: Context for the agents, updated with each result as it completes
+            semaphore: Optional semaphore bounding the number of running agents
+
+        Returns:
+            Dictionary of results from all agents
+        """
+        results = {}
+        remaining = {
+            agent_name: self.dependency_graph.in_degree(agent_name)
+            for level in self.execution_plan
+            for agent_name in level
+        }
+        running: Dict[asyncio.Task, str] = {}
+        ready = [name for name, count in remaining.items() if count == 0]
+
+        try:
+            while ready or running:
+                # Launch every agent whose predecessors have all completed
+                while ready:
+                    agent_name = ready.pop()
+                    agent = self.agent_map.get(agent_name)
+                    if agent:
+                        print(f"Preparing {agent_name} for parallel execution")
+                        task = asyncio.create_task(
+                            self._execute_agent_async(
+                                agent, agent_name, context, semaphore
+                            )
+                        )
+                        running[task] = agent_name
+                    else:
+                        ready.extend(self._release_successors(agent_name, remaining))
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    agent_name = running.pop(task)
+                    result = task.result()
+                    results[agent_name] = result
+                    context[agent_name] = result
+                    ready.extend(self._release_successors(agent_name, remaining))
+        finally:
+            # Do not leave agents running if one of them failed
+            for task in running:
+                task.cancel()
+
+        return results
+
+    def _release_successors(
+        self, agent_name: str, remaining: Dict[str, int]
+    ) -> List[str]:
+        """
+        Mark an agent as completed and return the successors that became ready.
+
+        Args:
+            agent_name: Name of the completed agent
+            remaining: Number of uncompleted predecessors of each agent
+
+        Returns:
+            Names of the agents whose predecessors have now all completed
+        """
+        released = []
+        for successor in self.dependency_graph.successors(agent_name):
+            remaining[successor] -= 1
+            if remaining[successor] == 0:
+                released.append(successor)
+        return released
+
     async def _execute_agent_async(
-        self, agent: DynoAgent, agent_name: str, context: Dict[str, Any]
+        self,
+        agent: DynoAgent,
+        agent_name: str,
+        context: Dict[str, Any],
+        semaphore: Optional[asyncio.Semaphore] = None,
     ) -> Any:
         """
         Execute an agent asynchronously.
 
+        Args:
+            agent: The agent to execute
+            agent_name: Name of the agent
+            context: Context for the agent
+            semaphore: Optional semaphore bounding the number of running agents
+
+        Returns:
+            Result from the agent
+        """
+        if semaphore is None:
+            return await self._run_agent(agent, agent_name, context)
+        async with semaphore:
+            return await self._run_agent(agent, agent_name, context)
+
+    def _record_cost(self, agent_name: str, seconds: float) -> None:
+        """
+        Update the moving average of an agent's execution time.
+
+        Args:
+            agent_name: Name of the agent
+            seconds: Duration of the latest run
+        """
+        previous = self.agent_costs.get(agent_name)
+        if previous is None:
+            self.agent_costs[agent_name] = seconds
+        else:
+            self.agent_costs[agent_name] = previous + self.COST_SMOOTHING * (
+                seconds - previous
+            )
+
+    async def _run_agent(
+        self, agent: DynoAgent, agent_name: str, context: Dict[str, Any]
+    ) -> Any:
+        """
+        Run an agent's task on the executor configured for it.
+
         Args:
             agent: The agent to execute
             agent_name: Name of the agent
@@ -297,17 +768,129 @@ class Team:
             Result from the agent
         """
         print(f"Executing {agent_name} in parallel")
-        return await asyncio.to_thread(
-            agent.perform_task, f"Execute {agent_name}", context
+        start = time.perf_counter()
+        try:
+            return await self._dispatch_agent(agent, agent_name, context)
+        finally:
+            self._record_cost(agent_name, time.perf_counter() - start)
+
+    async def _dispatch_agent(
+        self, agent: DynoAgent, agent_name: str, context: Dict[str, Any]
+    ) -> Any:
+        """
+        Hand an agent's task to the executor configured for it.
+
+        Args:
+            agent: The agent to execute
+            agent_name: Name of the agent
+            context: Context for the agent
+
+        Returns:
+            Result from the agent
+        """
+        task = f"Execute {agent_name}"
+
+        # Natively async agents are awaited directly, without a thread hop
+        if self._has_native_async(agent):
+            return await agent.perform_task_async(task, context)
+
+        executor = self.agent_executors.get(agent_name, self.executor)
+
+        if executor == "async":
+            result = agent.perform_task(task, context)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+        if executor == "thread":
+            return await asyncio.to_thread(agent.perform_task, task, context)
+
+        if executor == "process":
+            executor = self._get_process_pool()
+        # Work done in another process does not update the agent in this one,
+        # so the agent and the context must be picklable
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, agent.perform_task, task, context)
+
+    @staticmethod
+    def _has_native_async(agent: DynoAgent) -> bool:
+        """
+        Check whether an agent overrides perform_task_async with its own implementation.
+
+        Args:
+            agent: The agent to check
+
+        Returns:
+            True if the agent's perform_task_async is not the default delegating one
+        """
+        perform_task_async = getattr(type(agent), "perform_task_async", None)
+        return (
+            perform_task_async is not None
+            and perform_task_async is not DynoAgent.perform_task_async
         )
 
+    def _validate_executor(
+        self, executor: Union[str, Executor]
+    ) -> Union[str, Executor]:
+        """
+        Check that an executor is a known kind or a concurrent.futures.Executor.
+
+        Args:
+            executor: Executor kind or instance
+
+        Returns:
+            The executor
+        """
+        if isinstance(executor, Executor) or executor in self.EXECUTOR_KINDS:
+            return executor
+        raise ValueError(
+            f"Executor must be one of {', '.join(self.EXECUTOR_KINDS)} "
+            "or a concurrent.futures.Executor"
+        )
+
+    def set_agent_executor(
+        self, agent_name: str, executor: Union[str, Executor]
+    ) -> None:
+        """
+        Choose how a single agent runs during parallel execution.
+
+        Args:
+            agent_name: Name of the agent
+            executor: "thread", "process", "async" or a concurrent.futures.Executor
+        """
+        if agent_name not in self.agent_map:
+            raise ValueError(f"Agent '{agent_name}' not found in team")
+        self.agent_executors[agent_name] = self._validate_executor(executor)
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Create the team's process pool on first use."""
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.max_concurrency)
+        return self._process_pool
+
+    def shutdown(self) -> None:
+        """Release the process pool and event loop created for execution, if any."""
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+        if self._runner is not None:
+            self._runner.close()
+            self._runner = None
+
+    def __enter__(self) -> "Team":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown()
+
     def execute_optimal(self, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
-        Execute the team using the optimal execution strategy based on the dependency structure.
+        Execute the team using the cheapest execution strategy.
 
-        If all agents are in a single level, executes them in parallel.
-        If all levels have only one agent, executes them sequentially.
-        Otherwise, uses a mix of parallel and sequential execution.
+        Parallel execution runs on an event loop kept by the team between calls,
+        which shutdown releases; using the team as a context manager does so on
+        exit. This method must not be called while an event loop is running; use
+        execute_optimal_async there instead.
 
         Args:
             context: Initial context for the agents
@@ -315,16 +898,81 @@ class Team:
         Returns:
             Dictionary of results from all agents
         """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                "execute_optimal cannot be called from a running event loop; "
+                "use execute_optimal_async instead"
+            )
+
+        if self._choose_strategy() == "sequential":
+            return self.execute_sequential(context)
+
+        if self._runner is None:
+            self._runner = asyncio.Runner()
+        return self._runner.run(self.execute_parallel(context, scheduling="dataflow"))
+
+    async def execute_optimal_async(
+        self, context: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute the team using the cheapest execution strategy from a running event loop.
+
+        Args:
+            context: Initial context for the agents
+
+        Returns:
+            Dictionary of results from all agents
+        """
+        if self._choose_strategy() == "sequential":
+            # Agents run blocking code, so keep them off the caller's event loop
+            return await asyncio.to_thread(self.execute_sequential, context)
+        return await self.execute_parallel(context, scheduling="dataflow")
+
+    def _choose_strategy(self) -> str:
+        """
+        Choose between sequential and parallel execution.
+
+        Once every agent has a measured cost, the strategy with the lower estimated
+        run time wins: the sum of all costs for sequential execution, and the
+        critical path plus a per-agent scheduling overhead for parallel execution.
+        Before that, the shape of the execution plan decides.
+
+        Returns:
+            "sequential" or "parallel"
+        """
+        names = [agent_name for level in self.execution_plan for agent_name in level]
+
+        if names and all(agent_name in self.agent_costs for agent_name in names):
+            sequential_cost = sum(self.agent_costs[name] for name in names)
+
+            # Longest path through the graph weighted by agent costs
+            finish = {}
+            for agent_name in names:
+                finish[agent_name] = self.agent_costs[agent_name] + max(
+                    (
+                        finish[pred]
+                        for pred in self.dependency_graph.predecessors(agent_name)
+                    ),
+                    default=0.0,
+                )
+            parallel_cost = (
+                max(finish.values()) + len(names) * self.PARALLEL_DISPATCH_OVERHEAD
+            )
+            return "sequential" if sequential_cost <= parallel_cost else "parallel"
+
         # If we only have one level in the execution plan, execute all in parallel
         if len(self.execution_plan) == 1:
-            return self.execute_parallel(context)
+            return "parallel"
 
         # If all levels have only one agent, execute sequentially
         if all(len(level) == 1 for level in self.execution_plan):
-            return self.execute_sequential(context)
+            return "sequential"
 
-        # Otherwise, use the mixed approach
-        return self.execute_parallel(context)
+        return "parallel"
 
     def visualize_dependencies(
         self, output_file: str = "team_dependencies.png"
@@ -442,3 +1090,4 @@ if __name__ == "__main__":
     # Optimal execution
     print("\nExecuting optimally...")
     optimal_results = team.execute_optimal(context)
+    team.shutdown()
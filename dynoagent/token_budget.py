@@ -0,0 +1,207 @@
+import copy
+import json
+import math
+import os
+import tempfile
+import threading
+from bisect import bisect_right
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from .metrics import P2Quantile
+from .task_complexity import COMPLEXITY_LEVELS, TaskComplexityAnalyzer
+
+# Upper bounds, in characters, of the task text length buckets
+DEFAULT_LENGTH_BUCKETS = (200, 1000, 5000)
+
+
+class TokenBudgetEstimator:
+    """
+    Estimates max token budgets from the token usage observed for past tasks.
+
+    Observations are grouped by complexity level and task text length bucket, and
+    a streaming quantile (p95 by default) of the tokens used is kept for every group
+    and for every level as a whole. Estimates come from the most specific group with
+    enough observations, falling back to the fixed TaskComplexityAnalyzer estimates.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        quantile: float = 0.95,
+        length_buckets: Sequence[int] = DEFAULT_LENGTH_BUCKETS,
+        min_observations: int = 20,
+    ):
+        """
+        Initialize the estimator, loading saved observations if path exists.
+
+        Args:
+            path: JSON file the estimator is saved to and loaded from
+            quantile: Quantile of the observed token usage used as budget
+            length_buckets: Increasing upper bounds of the text length buckets;
+                longer texts fall in a final open-ended bucket
+            min_observations: Observations a group needs before it is trusted
+        """
+        if not 0 < quantile < 1:
+            raise ValueError("quantile must be between 0 and 1")
+        length_buckets = tuple(length_buckets)
+        if any(
+            not isinstance(bound, int) or bound <= 0 for bound in length_buckets
+        ) or list(length_buckets) != sorted(set(length_buckets)):
+            raise ValueError("length_buckets must be increasing positive integers")
+        if not isinstance(min_observations, int) or min_observations <= 0:
+            raise ValueError("min_observations must be a positive integer")
+
+        self.path = path
+        self.quantile = quantile
+        self.length_buckets = length_buckets
+        self.min_observations = min_observations
+        self._lock = threading.Lock()
+        # Quantile estimates per (level, bucket); bucket None covers all lengths
+        self._estimates: Dict[Tuple[str, Optional[int]], P2Quantile] = {}
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Locks cannot be pickled, so the copy gets a new one
+        with self._lock:
+            state = self.__dict__.copy()
+            state["_estimates"] = copy.deepcopy(self._estimates)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _bucket(self, text_length: int) -> int:
+        """Index of the length bucket a text length falls in."""
+        return bisect_right(self.length_buckets, text_length - 1)
+
+    def record(self, complexity: str, text_length: int, tokens_used: int) -> None:
+        """
+        Record the tokens a task actually used.
+
+        Args:
+            complexity: Complexity level of the task
+            text_length: Length of the task text in characters
+            tokens_used: Number of tokens the task used
+        """
+        if complexity not in COMPLEXITY_LEVELS:
+            raise ValueError(f"Unknown complexity level: {complexity}")
+        if text_length < 0 or tokens_used < 0:
+            raise ValueError("text_length and tokens_used must not be negative")
+
+        with self._lock:
+            for key in ((complexity, self._bucket(text_length)), (complexity, None)):
+                estimate = self._estimates.get(key)
+                if estimate is None:
+                    estimate = self._estimates[key] = P2Quantile(self.quantile)
+                estimate.add(tokens_used)
+
+    def estimate(
+        self,
+        complexity: str,
+        text_length: Optional[int] = None,
+        with_references: bool = False,
+    ) -> int:
+        """
+        Estimate the max tokens needed for a task.
+
+        Args:
+            complexity: Complexity level of the task
+            text_length: Length of the task text in characters, if known
+            with_references: Whether references/citations are needed; only affects
+                the fixed estimate used before enough usage has been observed
+
+        Returns:
+            Estimated max tokens needed
+        """
+        keys = [(complexity, None)]
+        if text_length is not None:
+            keys.insert(0, (complexity, self._bucket(text_length)))
+
+        with self._lock:
+            for key in keys:
+                estimate = self._estimates.get(key)
+                if estimate is not None and estimate.count >= self.min_observations:
+                    return max(math.ceil(estimate.value), 1)
+
+        return TaskComplexityAnalyzer.estimate_token_needs(complexity, with_references)
+
+    def observation_count(self, complexity: str) -> int:
+        """Number of observations recorded for a complexity level."""
+        estimate = self._estimates.get((complexity, None))
+        return estimate.count if estimate is not None else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the estimator configuration and state as a dictionary."""
+        with self._lock:
+            return {
+                "version": self.FORMAT_VERSION,
+                "quantile": self.quantile,
+                "length_buckets": list(self.length_buckets),
+                "estimates": [
+                    {"level": level, "bucket": bucket, "state": estimate.to_dict()}
+                    for (level, bucket), estimate in self._estimates.items()
+                ],
+            }
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Save the estimator as JSON, replacing the file atomically.
+
+        Args:
+            path: File to save to; defaults to the path given at construction
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path to save the token budget estimator to")
+
+        data = self.to_dict()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def load(self, path: Optional[str] = None) -> None:
+        """
+        Replace the recorded observations with those saved in a file.
+
+        Args:
+            path: File to load from; defaults to the path given at construction
+
+        Raises:
+            ValueError: If the file was saved with a different configuration
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path to load the token budget estimator from")
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("version") != self.FORMAT_VERSION:
+            raise ValueError(f"Unsupported token budget file version in {path}")
+        if data["quantile"] != self.quantile or tuple(data["length_buckets"]) != (
+            self.length_buckets
+        ):
+            raise ValueError(
+                f"Token budget file {path} was saved with a different quantile "
+                "or length buckets"
+            )
+
+        estimates = {
+            (entry["level"], entry["bucket"]): P2Quantile.from_dict(entry["state"])
+            for entry in data["estimates"]
+        }
+        with self._lock:
+            self._estimates = estimates
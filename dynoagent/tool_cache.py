@@ -0,0 +1,279 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .cache import LRUCache
+
+# Marker for a missing result, since None can be a cached result
+_MISSING = object()
+
+# Function building a cache key from the positional and keyword arguments of a call
+KeyFunction = Callable[..., Hashable]
+
+
+def default_key(*args: Any, **kwargs: Any) -> Hashable:
+    """Key calls by their arguments, ignoring the order of keyword arguments."""
+    return args, tuple(sorted(kwargs.items()))
+
+
+class ToolCache:
+    """
+    Memoizes the results of a pure tool.
+
+    Results are kept in an in-memory LRU cache with an optional time to live, and
+    optionally in a SQLite database on disk as a second tier, so results survive
+    restarts and are shared by processes using the same file. Calls that raise are
+    not cached, and calls whose key cannot be built are run without the cache.
+
+    Cached results are returned as is, not copied, so callers must not modify them.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: Optional[float] = None,
+        key: Optional[KeyFunction] = None,
+        disk_path: Optional[str] = None,
+        disk_maxsize: Optional[int] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of results kept in memory
+            ttl: Seconds a result stays valid; None keeps results until evicted
+            key: Function called with the arguments of a call, returning a hashable
+                key; defaults to the arguments themselves
+            disk_path: SQLite file of the disk tier, not shared with other tools;
+                None keeps results in memory only
+            disk_maxsize: Maximum number of results kept on disk, the oldest
+                removed first; defaults to maxsize
+        """
+        self.memory = LRUCache(maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.key = key or default_key
+        self.disk = (
+            _DiskTier(disk_path, maxsize if disk_maxsize is None else disk_maxsize)
+            if disk_path is not None
+            else None
+        )
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.uncacheable = 0
+
+    def call(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Return the cached result of a call, calling the function on a miss.
+
+        Args:
+            function: The tool
+            *args: Positional arguments of the call
+            **kwargs: Keyword arguments of the call
+
+        Returns:
+            The result of the call
+        """
+        try:
+            key = self.key(*args, **kwargs)
+            hash(key)
+        except TypeError:
+            self._count("uncacheable")
+            return function(*args, **kwargs)
+
+        result = self.memory.get(key, _MISSING)
+        if result is not _MISSING:
+            self._count("memory_hits")
+            return result
+
+        disk_key = _digest(key) if self.disk is not None else None
+        if disk_key is not None:
+            result = self.disk.get(disk_key)
+            if result is not _MISSING:
+                self._count("disk_hits")
+                self.memory.put(key, result)
+                return result
+
+        self._count("misses")
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            self._count("errors")
+            raise
+        self.memory.put(key, result)
+        if disk_key is not None:
+            expires = None if self.ttl is None else time.time() + self.ttl
+            self.disk.put(disk_key, result, expires)
+        return result
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hits (memory_hits plus disk_hits), misses, hit_rate,
+            errors (failed calls, which are not cached), uncacheable (calls whose
+            key could not be built), and size and maxsize of the memory tier
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "errors": self.errors,
+                "uncacheable": self.uncacheable,
+                "size": len(self.memory),
+                "maxsize": self.memory.maxsize,
+            }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Locks cannot be pickled, so the copy gets a new one
+        with self._lock:
+            state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Remove all cached results, on disk too, and reset the statistics."""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        with self._lock:
+            self.memory_hits = self.disk_hits = self.misses = 0
+            self.errors = self.uncacheable = 0
+
+
+def _digest(key: Hashable) -> Optional[str]:
+    """
+    Stable digest of a key for the disk tier, or None if it cannot be pickled.
+
+    Keys are canonicalized first, so equal keys get the same digest in every
+    process. Objects other than tuples and frozensets are pickled as they are, so
+    the digest of an object holding a set can still differ between processes.
+    """
+    try:
+        data = pickle.dumps(_canonical(key), protocol=4)
+    except Exception:
+        return None
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _canonical(value: Any) -> Any:
+    """
+    Tag a value with its type and put the members of frozensets in a fixed order.
+
+    Iterating over a frozenset follows the hashes of its members, which differ
+    between processes for strings, and True and 1 are equal keys in memory but
+    should not share results on disk.
+    """
+    kind = f"{type(value).__module__}.{type(value).__qualname__}"
+    if isinstance(value, tuple):
+        return kind, tuple(_canonical(item) for item in value)
+    if isinstance(value, frozenset):
+        items = [_canonical(item) for item in value]
+        return kind, tuple(sorted(items, key=partial(pickle.dumps, protocol=4)))
+    return kind, value
+
+
+class _DiskTier:
+    """
+    Pickled results in a SQLite database, with wall-clock expiry times.
+
+    Expired results are deleted when found by get and on every put, and beyond
+    maxsize results the oldest stored ones are deleted, so the file stays bounded.
+    """
+
+    def __init__(self, path: str, maxsize: int):
+        if not isinstance(maxsize, int) or maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+        self.path = path
+        self.maxsize = maxsize
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Shared by all threads, which the lock serializes
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            # Replacing a row gives it a new rowid, so rowids order rows by age
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_expires ON results (expires)"
+            )
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Connections cannot be pickled; the copy opens the same database
+        return {"path": self.path, "maxsize": self.maxsize}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"], state["maxsize"])
+
+    def get(self, key: str) -> Any:
+        """Return the stored result for a key, or _MISSING."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] is not None and row[1] <= time.time():
+                with self._connection:
+                    self._connection.execute(
+                        "DELETE FROM results WHERE key = ?", (key,)
+                    )
+                row = None
+        if row is None:
+            return _MISSING
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            return _MISSING
+
+    def put(self, key: str, value: Any, expires: Optional[float]) -> None:
+        """Store a result, unless it cannot be pickled, and drop stale results."""
+        try:
+            data = pickle.dumps(value, protocol=4)
+        except Exception:
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM results WHERE expires <= ?", (time.time(),)
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires) VALUES (?, ?, ?)",
+                (key, data, expires),
+            )
+            self._connection.execute(
+                "DELETE FROM results WHERE rowid IN "
+                "(SELECT rowid FROM results ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM results"
+            ).fetchone()
+        return count
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM results")
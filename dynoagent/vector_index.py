@@ -0,0 +1,670 @@
+import itertools
+import json
+import os
+import re
+import zlib
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+# Function turning texts into a (len(texts), dim) matrix of embeddings
+Embedder = Callable[[Sequence[str]], np.ndarray]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Identification of the on-disk index format written by VectorIndex.save
+MANIFEST_FORMAT = "dynoagent-vector-index"
+MANIFEST_VERSION = 1
+
+# Scores computed at a time by search_batch, to bound memory use
+_SCORE_BLOCK = 1 << 24
+
+# Source of index version numbers, unique across all indexes of the process
+_versions = itertools.count()
+
+# Rows scored at a time when assigning vectors to partitions, to bound memory use
+_ASSIGN_BATCH = 65536
+
+
+class HashingEmbedder:
+    """
+    Offline embedding function based on the hashing trick.
+
+    Words and word bigrams are hashed into a fixed number of signed dimensions, so
+    texts sharing vocabulary get similar vectors without any model or network access.
+    Hashes are stable across processes, so saved indexes stay valid.
+    """
+
+    def __init__(self, dim: int = 384, bigrams: bool = True):
+        """
+        Initialize the embedder.
+
+        Args:
+            dim: Number of dimensions of the embeddings
+            bigrams: Whether to hash pairs of adjacent words as well as single words
+        """
+        if not isinstance(dim, int) or dim <= 0:
+            raise ValueError("dim must be a positive integer")
+        self.dim = dim
+        self.bigrams = bigrams
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN_PATTERN.findall(text.lower())
+        if self.bigrams:
+            return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return words
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Float32 matrix with one L2-normalized row per text
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                rows.append(row)
+                columns.append(digest % self.dim)
+                signs.append(1.0 if digest & 0x80000000 else -1.0)
+        if rows:
+            np.add.at(vectors, (rows, columns), signs)
+        return normalize_rows(vectors)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length, leaving all-zero rows unchanged."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Find the positions of the k highest scores, in every row for a matrix of scores.
+
+    Args:
+        scores: Scores to rank, along the last axis
+        k: Number of positions to return
+
+    Returns:
+        Positions of the highest scores, best first
+    """
+    if k >= scores.shape[-1]:
+        return np.argsort(-scores, axis=-1, kind="stable")
+    best = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, best, -1), axis=-1, kind="stable")
+    return np.take_along_axis(best, order, -1)
+
+
+def document_text(document: Any) -> Tuple[str, Dict[str, Any]]:
+    """
+    Extract the text and metadata of a document.
+
+    Args:
+        document: A string, a dictionary with "text" or "content" and optional
+            "metadata", or an object with text and metadata attributes
+
+    Returns:
+        Tuple of (text, metadata)
+    """
+    if isinstance(document, str):
+        return document, {}
+    if isinstance(document, dict):
+        text = document.get("text", document.get("content"))
+        metadata = document.get("metadata") or {}
+    else:
+        text = getattr(document, "text", None)
+        metadata = getattr(document, "metadata", None) or {}
+    if not isinstance(text, str):
+        raise ValueError(f"Document has no text: {document!r}")
+    return text, dict(metadata)
+
+
+class VectorIndex:
+    """
+    In-process vector index with cosine similarity search.
+
+    Embeddings are kept as rows of a normalized NumPy matrix, so a query is scored
+    against all documents with one matrix-vector product. For very large indexes,
+    build_ivf partitions the documents around k-means centroids and queries then
+    only score the documents of the partitions closest to the query.
+
+    The version attribute changes whenever search results may change, so results
+    can be cached per version.
+    """
+
+    def __init__(self, embedder: Optional[Embedder] = None):
+        """
+        Initialize an empty index.
+
+        Args:
+            embedder: Function embedding a sequence of texts into a matrix;
+                defaults to an offline HashingEmbedder
+        """
+        self.embedder = embedder if embedder is not None else HashingEmbedder()
+        self.texts: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self._vectors: Optional[np.ndarray] = None  # Capacity grows geometrically
+        self._size = 0
+        # Partitioned (IVF) search state, see build_ivf
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._partitions: Optional[List[np.ndarray]] = None
+        self.n_probe = 1
+        self._touch()
+
+    def _touch(self) -> None:
+        """Give the index a new version after a change that can affect results."""
+        self.version = next(_versions)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Normalized embeddings of the indexed documents, one row per document."""
+        if self._vectors is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._vectors[: self._size]
+
+    @property
+    def dim(self) -> Optional[int]:
+        """Number of embedding dimensions, or None before anything is indexed."""
+        return None if self._vectors is None else self._vectors.shape[1]
+
+    def _embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = normalize_rows(self.embedder(list(texts)))
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError("Embedder must return one row per text")
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} does not match "
+                f"index dimension {self.dim}"
+            )
+        return vectors
+
+    def add(self, documents: Iterable[Any]) -> List[int]:
+        """
+        Embed and add documents.
+
+        Args:
+            documents: Documents as accepted by document_text
+
+        Returns:
+            Ids of the added documents
+        """
+        texts, metadata = [], []
+        for document in documents:
+            text, meta = document_text(document)
+            texts.append(text)
+            metadata.append(meta)
+        if not texts:
+            return []
+        return self.add_vectors(self._embed(texts), texts, metadata)
+
+    def add_vectors(
+        self,
+        vectors: np.ndarray,
+        texts: Sequence[str],
+        metadata: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> List[int]:
+        """
+        Add documents whose embeddings were already computed with this embedder.
+
+        Args:
+            vectors: Matrix with one embedding row per document
+            texts: Texts of the documents
+            metadata: Metadata of the documents; defaults to empty dictionaries
+
+        Returns:
+            Ids of the added documents
+        """
+        vectors = normalize_rows(vectors)
+        metadata = [{} for _ in texts] if metadata is None else list(metadata)
+        if vectors.ndim != 2 or not len(vectors) == len(texts) == len(metadata):
+            raise ValueError("vectors, texts and metadata must have one row per text")
+        if not len(vectors):
+            return []
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} does not match "
+                f"index dimension {self.dim}"
+            )
+
+        start = self._size
+        end = start + len(vectors)
+        if self._vectors is None:
+            self._vectors = np.empty((max(end, 16), vectors.shape[1]), np.float32)
+        elif end > len(self._vectors):
+            grown = np.empty((max(end, 2 * len(self._vectors)), self.dim), np.float32)
+            grown[:start] = self._vectors[:start]
+            self._vectors = grown
+        self._vectors[start:end] = vectors
+        self._size = end
+        self.texts.extend(texts)
+        self.metadata.extend(metadata)
+
+        if self._centroids is not None:
+            self._assignments = np.concatenate(
+                [self._assignments, self._assign(vectors)]
+            )
+            self._partitions = None
+        self._touch()
+        return list(range(start, end))
+
+    def iter_records(
+        self, start_id: int = 0
+    ) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Iterate over the indexed documents in id order, decoding them lazily.
+
+        Args:
+            start_id: Id of the first document to return
+
+        Returns:
+            Iterator of (id, text, metadata) tuples
+        """
+        for i in range(max(start_id, 0), self._size):
+            yield i, self.texts[i], self.metadata[i]
+
+    def search(
+        self, query: str, k: int = 5, n_probe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the documents most similar to a query.
+
+        Args:
+            query: Query text
+            k: Maximum number of results
+            n_probe: Partitions searched in IVF mode; defaults to the index setting
+
+        Returns:
+            Results, best first, as dictionaries with id, score, text and metadata
+        """
+        if not isinstance(k, int) or k <= 0:
+            raise ValueError("k must be a positive integer")
+        if not self._size:
+            return []
+        vector = self._embed([query])[0]
+        return self._results(*self._search_vector(vector, k, n_probe))
+
+    def search_batch(
+        self, queries: Sequence[str], k: int = 5, n_probe: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Find the documents most similar to each of several queries.
+
+        All queries are embedded in one call, and without IVF partitioning they are
+        scored with matrix-matrix products over blocks of queries, which is much
+        faster than searching for the queries one by one.
+
+        Args:
+            queries: Query texts
+            k: Maximum number of results per query
+            n_probe: Partitions searched in IVF mode; defaults to the index setting
+
+        Returns:
+            Results of every query, as returned by search
+        """
+        if not isinstance(k, int) or k <= 0:
+            raise ValueError("k must be a positive integer")
+        if not self._size or not len(queries):
+            return [[] for _ in queries]
+        vectors = self._embed(queries)
+        if self._centroids is not None:
+            return [
+                self._results(*self._search_vector(vector, k, n_probe))
+                for vector in vectors
+            ]
+
+        results = []
+        rows = max(_SCORE_BLOCK // self._size, 1)
+        for start in range(0, len(vectors), rows):
+            scores = vectors[start : start + rows] @ self.vectors.T
+            best = top_k(scores, k)
+            best_scores = np.take_along_axis(scores, best, -1)
+            results.extend(map(self._results, best, best_scores))
+        return results
+
+    def _search_vector(
+        self, vector: np.ndarray, k: int, n_probe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the ids and scores of the k rows most similar to a vector."""
+        if self._centroids is None:
+            scores = self.vectors @ vector
+            best = top_k(scores, k)
+            return best, scores[best]
+
+        # Only score the documents of the closest partitions
+        partitions = self._get_partitions()
+        n_probe = min(n_probe or self.n_probe, len(partitions))
+        probed = top_k(self._centroids @ vector, n_probe)
+        candidates = np.concatenate([partitions[p] for p in probed])
+        scores = self.vectors[candidates] @ vector
+        best = top_k(scores, k)
+        return candidates[best], scores[best]
+
+    def _results(self, ids: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        """Build result dictionaries for document ids and their scores."""
+        return [
+            {
+                "id": int(i),
+                "score": float(score),
+                "text": self.texts[i],
+                "metadata": self.metadata[i],
+            }
+            for i, score in zip(ids, scores)
+        ]
+
+    def build_ivf(
+        self,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        iterations: int = 10,
+        sample_size: int = 100000,
+        seed: int = 0,
+    ) -> None:
+        """
+        Partition the documents for approximate search (inverted file index).
+
+        Centroids are found with spherical k-means on a sample of the documents, and
+        every document, including ones added later, joins the partition of its
+        closest centroid. Queries then score only the n_probe closest partitions,
+        trading a little recall for search time roughly n_lists / n_probe lower.
+
+        Args:
+            n_lists: Number of partitions; defaults to the square root of the size
+            n_probe: Partitions searched per query
+            iterations: k-means iterations
+            sample_size: Maximum number of documents used to find the centroids
+            seed: Random seed of the sampling and initialization
+        """
+        if not self._size:
+            raise ValueError("Cannot partition an empty index")
+        if n_lists is None:
+            n_lists = max(int(np.sqrt(self._size)), 1)
+        if not isinstance(n_lists, int) or not 0 < n_lists <= self._size:
+            raise ValueError("n_lists must be between 1 and the number of documents")
+        if not isinstance(n_probe, int) or n_probe <= 0:
+            raise ValueError("n_probe must be a positive integer")
+
+        rng = np.random.default_rng(seed)
+        vectors = self.vectors
+        if self._size > sample_size:
+            sample = vectors[rng.choice(self._size, sample_size, replace=False)]
+        else:
+            sample = vectors
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            # Empty partitions keep their previous centroid
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        self._centroids = centroids
+        self._assignments = self._assign(vectors)
+        self._partitions = None
+        self.n_probe = n_probe
+        self._touch()
+
+    def drop_ivf(self) -> None:
+        """Return to exact search over all documents."""
+        self._centroids = None
+        self._assignments = None
+        self._partitions = None
+        self._touch()
+
+    def _assign(
+        self, vectors: np.ndarray, centroids: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Index of the closest centroid of every vector."""
+        centroids = self._centroids if centroids is None else centroids
+        return np.concatenate(
+            [
+                np.argmax(vectors[start : start + _ASSIGN_BATCH] @ centroids.T, axis=1)
+                for start in range(0, len(vectors), _ASSIGN_BATCH)
+            ]
+        ).astype(np.int32)
+
+    def _get_partitions(self) -> List[np.ndarray]:
+        """Document ids of every partition, rebuilt after documents are added."""
+        if self._partitions is None:
+            order = np.argsort(self._assignments, kind="stable")
+            bounds = np.searchsorted(
+                self._assignments[order], np.arange(1, len(self._centroids))
+            )
+            self._partitions = np.split(order, bounds)
+        return self._partitions
+
+    def save(self, path: str) -> None:
+        """
+        Save the index to a directory in a format that load can memory-map.
+
+        Embeddings and partition data are raw .npy arrays, and texts and metadata are
+        UTF-8 blobs with .npy offset tables. Every file is written under a temporary
+        name and atomically moved into place, the manifest last, so processes that
+        have the previous version mapped keep reading consistent data.
+
+        Args:
+            path: Directory to write; created if needed
+        """
+        os.makedirs(path, exist_ok=True)
+
+        def write(name: str, writer: Callable[[Any], None]) -> None:
+            temp_path = os.path.join(path, f".{name}.tmp")
+            with open(temp_path, "wb") as f:
+                writer(f)
+            os.replace(temp_path, os.path.join(path, name))
+
+        write("embeddings.npy", lambda f: np.save(f, self.vectors))
+        text_offsets = _write_blob(
+            path, "texts", (text.encode("utf-8") for text in self.texts), write
+        )
+        metadata_offsets = _write_blob(
+            path,
+            "metadata",
+            (
+                json.dumps(meta).encode("utf-8") if meta else b""
+                for meta in self.metadata
+            ),
+            write,
+        )
+        if self._centroids is not None:
+            write("centroids.npy", lambda f: np.save(f, self._centroids))
+            write("assignments.npy", lambda f: np.save(f, self._assignments))
+
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "version": MANIFEST_VERSION,
+            "count": self._size,
+            "dim": self.dim,
+            "text_bytes": int(text_offsets[-1]),
+            "metadata_bytes": int(metadata_offsets[-1]),
+            "ivf": self._centroids is not None,
+            "n_probe": self.n_probe,
+        }
+        write("manifest.json", lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+
+    @classmethod
+    def load(
+        cls, path: str, embedder: Optional[Embedder] = None, mmap: bool = True
+    ) -> "VectorIndex":
+        """
+        Open an index saved with save.
+
+        With mmap, embeddings, texts and metadata are mapped read-only rather than
+        read, so opening is near-instant, only the pages a query touches are read,
+        and processes opening the same index share its pages through the OS cache.
+        Adding documents to a mapped index copies the embeddings into memory.
+
+        Args:
+            path: Directory the index was saved to
+            embedder: Embedding function; must be the one the index was built with
+            mmap: Whether to memory-map the files instead of reading them
+
+        Returns:
+            The loaded index
+        """
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if (
+            manifest.get("format") != MANIFEST_FORMAT
+            or manifest.get("version") != MANIFEST_VERSION
+        ):
+            raise ValueError(f"Unsupported index format in {path}")
+
+        mmap_mode = "r" if mmap else None
+        count = manifest["count"]
+        vectors = np.load(os.path.join(path, "embeddings.npy"), mmap_mode=mmap_mode)
+        texts = _open_blob(
+            path, "texts", manifest["text_bytes"], mmap_mode, _decode_text
+        )
+        metadata = _open_blob(
+            path, "metadata", manifest["metadata_bytes"], mmap_mode, _decode_metadata
+        )
+        if not len(vectors) == len(texts) == len(metadata) == count:
+            raise ValueError(f"Index in {path} is inconsistent")
+
+        index = cls(embedder)
+        if count:
+            index._vectors = vectors
+            index._size = count
+        index.texts = texts
+        index.metadata = metadata
+        index.n_probe = manifest["n_probe"]
+        if manifest["ivf"]:
+            index._centroids = np.load(os.path.join(path, "centroids.npy"))
+            index._assignments = np.load(
+                os.path.join(path, "assignments.npy"), mmap_mode=mmap_mode
+            )
+        return index
+
+
+def _decode_text(data: bytes) -> str:
+    return data.decode("utf-8")
+
+
+def _decode_metadata(data: bytes) -> Dict[str, Any]:
+    return json.loads(data) if data else {}
+
+
+def _write_blob(
+    path: str,
+    name: str,
+    records: Iterable[bytes],
+    write: Callable[[str, Callable[[Any], None]], None],
+) -> np.ndarray:
+    """Write records as one blob file plus an offset table; returns the offsets."""
+    offsets = [0]
+
+    def write_records(f: Any) -> None:
+        for record in records:
+            f.write(record)
+            offsets.append(offsets[-1] + len(record))
+
+    write(f"{name}.bin", write_records)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    write(f"{name}_offsets.npy", lambda f: np.save(f, offsets))
+    return offsets
+
+
+def _open_blob(
+    path: str,
+    name: str,
+    size: int,
+    mmap_mode: Optional[str],
+    decode: Callable[[bytes], Any],
+) -> "RecordTable":
+    """Open a blob file and its offset table written by _write_blob."""
+    offsets = np.load(os.path.join(path, f"{name}_offsets.npy"), mmap_mode=mmap_mode)
+    blob_path = os.path.join(path, f"{name}.bin")
+    if os.path.getsize(blob_path) != size or offsets[-1] != size:
+        raise ValueError(f"Index file {blob_path} is inconsistent")
+    if not size:
+        blob = b""
+    elif mmap_mode:
+        blob = np.memmap(blob_path, dtype=np.uint8, mode=mmap_mode)
+    else:
+        with open(blob_path, "rb") as f:
+            blob = f.read()
+    return RecordTable(blob, offsets, decode)
+
+
+class RecordTable:
+    """
+    Sequence of records decoded on access from a byte blob and an offset table.
+
+    Records added after opening are kept in memory, so a mapped table can still be
+    appended to without touching the files.
+    """
+
+    def __init__(
+        self,
+        blob: Union[bytes, np.ndarray],
+        offsets: np.ndarray,
+        decode: Callable[[bytes], Any],
+    ):
+        """
+        Initialize the table.
+
+        Args:
+            blob: Concatenated encoded records, as bytes or a uint8 array or memmap
+            offsets: Start offset of every record in the blob, followed by the end
+            decode: Function decoding one record
+        """
+        self._blob = blob
+        self._offsets = offsets
+        self._decode = decode
+        self._stored = len(offsets) - 1
+        self._extra: List[Any] = []
+
+    def __len__(self) -> int:
+        return self._stored + len(self._extra)
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+        if index >= self._stored:
+            return self._extra[index - self._stored]
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._decode(bytes(self._blob[start:end]))
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (RecordTable, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def append(self, record: Any) -> None:
+        """Add a record in memory."""
+        self._extra.append(record)
+
+    def extend(self, records: Iterable[Any]) -> None:
+        """Add several records in memory."""
+        self._extra.extend(records)
@@ -8,6 +8,33 @@ import pytest
 from dynoagent import DynoAgent, Team
 
 
+def pytest_addoption(parser):
+    """Add the option enabling timing benchmarks."""
+    parser.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        default=False,
+        help="run tests marked as benchmarks, whose limits depend on machine speed",
+    )
+
+
+def pytest_configure(config):
+    """Register the benchmark marker."""
+    config.addinivalue_line(
+        "markers", "benchmark: timing test, only run with --run-benchmarks"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip benchmarks unless they were asked for."""
+    if config.getoption("--run-benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="timing benchmark, use --run-benchmarks to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
 @pytest.fixture(scope="session")
 def event_loop_policy():
     """Configure the event loop policy for the test session."""
@@ -2,7 +2,7 @@
 
 import pytest
 
-from dynoagent import DynoAgent
+from dynoagent import DynoAgent, ToolCache
 
 
 def test_agent_initialization(basic_agent):
@@ -43,3 +43,79 @@ def test_agent_update_goal(basic_agent):
     new_goal = "new_test_goal"
     basic_agent.update_goal(new_goal)
     assert basic_agent.goal == new_goal
+
+
+@pytest.mark.asyncio
+async def test_agent_perform_task_async_delegates(basic_agent):
+    """Test that the default perform_task_async delegates to perform_task."""
+    result = await basic_agent.perform_task_async("Run a simple test")
+    assert result == basic_agent.perform_task("Run a simple test")
+    assert len(basic_agent.history) == 2
+
+
+def test_agent_history_limit():
+    """Test that history_limit bounds history and scores."""
+    agent = DynoAgent("bounded", "tester", ["testing"], "test", history_limit=5)
+    for i in range(20):
+        agent.perform_task(f"task {i}")
+    assert len(agent.history) == 5
+    assert agent.history[-1]["task"] == "task 19"
+    assert len(agent.human_feedback_scores) == 5
+    assert agent.calculate_error_margin() == pytest.approx(3.5)
+
+    with pytest.raises(ValueError):
+        DynoAgent("invalid", "tester", ["testing"], "test", history_limit=0)
+
+
+def test_agent_metrics_use_running_statistics():
+    """Test feedback metrics and the internal RL success rate."""
+    agent = DynoAgent(
+        "learner", "tester", ["a", "b", "c", "d"], "test", use_rl_decision_agent=False
+    )
+    agent.input_quality_scores.extend([8, 9, 10])
+    assert agent.average_input_quality() == pytest.approx(9.0)
+    assert "13.50" in agent.suggest_higher_input_quality()
+
+    for _ in range(9):
+        agent.learning_data.append(("input", "output", "success"))
+    agent.learning_data.append(("input", "output", "failure"))
+    agent.optimize_workflow()
+    assert agent.execution_mode == "parallel"
+
+
+def test_agent_memoized_tools():
+    """Test opt-in memoization of tools registered with a cache."""
+    agent = DynoAgent("cached", "tester", [], "run_tests")
+    calls = []
+
+    def lookup(table):
+        calls.append(table)
+        if table == "missing":
+            raise KeyError(table)
+        return [table, "id"]
+
+    agent.register_tool("schema", lookup, cache=ToolCache(maxsize=8))
+    agent.register_tool("plain", lookup)
+    for _ in range(3):
+        assert agent.use_tool("schema", "users") == ["users", "id"]
+        agent.use_tool("plain", "users")
+    assert agent.use_tool("schema", "missing").startswith("Error using tool schema")
+    agent.use_tool("schema", "missing")
+    assert calls.count("users") == 4
+    assert calls.count("missing") == 2
+
+    info = agent.tool_cache_info("schema")
+    assert (info["hits"], info["misses"], info["errors"]) == (2, 3, 2)
+    assert agent.tool_cache_info("plain") is None
+    assert set(agent.tool_cache_info()) == {"schema"}
+
+    agent.clear_tool_cache()
+    agent.use_tool("schema", "users")
+    assert calls.count("users") == 5
+
+    agent.register_tool("schema", lookup, cache=True)
+    assert agent.tool_cache_info("schema")["misses"] == 0
+    agent.unregister_tool("schema")
+    assert agent.tool_cache_info() == {}
+    with pytest.raises(ValueError):
+        agent.register_tool("bad", lookup, cache="yes")
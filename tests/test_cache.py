@@ -0,0 +1,98 @@
+"""Tests for the LRUCache class."""
+
+import pickle
+
+import pytest
+
+from dynoagent.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Test eviction order, hit/miss counting and statistics."""
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("b", "missing") == "missing"
+    assert cache.get("c") == 3
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert stats["size"] == 2
+    assert stats["maxsize"] == 2
+
+
+def test_lru_cache_resize_and_clear():
+    """Test shrinking the cache, clearing it and validating its size."""
+    cache = LRUCache(maxsize=3)
+    for key in "abc":
+        cache.put(key, key.upper())
+    cache.resize(1)
+    assert len(cache) == 1
+    assert "c" in cache
+
+    cache.get("c")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 0
+
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
+    with pytest.raises(ValueError):
+        cache.resize(-1)
+
+
+def test_lru_cache_entries_expire_after_ttl():
+    """Test that expired entries are misses and that clear can keep statistics."""
+    now = [100.0]
+    cache = LRUCache(maxsize=4, ttl=10, timer=lambda: now[0])
+    cache.put("a", 1)
+    now[0] = 109.0
+    assert cache.get("a") == 1
+    assert "a" in cache
+    now[0] = 110.0
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    cache.put("b", 2)
+    cache.clear(reset_stats=False)
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 1
+
+    with pytest.raises(ValueError):
+        LRUCache(ttl=0)
+
+
+# Time of the fake clock below, a function so that it is pickled by reference
+_now = [0.0]
+
+
+def _clock():
+    return _now[0]
+
+
+def test_lru_cache_pickles_with_remaining_ttl():
+    """Test that copies get their own lock and keep the time entries have left."""
+    _now[0] = 100.0
+    cache = LRUCache(maxsize=4, ttl=10, timer=_clock)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    _now[0] = 105.0
+    data = pickle.dumps(cache)
+
+    _now[0] = 1000.0  # The clock of another process
+    copy = pickle.loads(data)
+    copy.put("b", 2)
+    assert "b" not in cache
+    _now[0] = 1004.0
+    assert copy.get("a") == 1
+    assert copy.stats()["hits"] == 2
+    _now[0] = 1006.0
+    assert copy.get("a") is None
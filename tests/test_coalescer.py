@@ -0,0 +1,93 @@
+"""Tests for the QueryCoalescer class."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from dynoagent.coalescer import QueryCoalescer
+
+
+def _recording_search(calls):
+    """Batch search returning k fake results per query and recording each batch."""
+
+    def search_batch(queries, k):
+        calls.append((list(queries), k))
+        return [[f"{query}:{rank}" for rank in range(k)] for query in queries]
+
+    return search_batch
+
+
+@pytest.mark.asyncio
+async def test_concurrent_queries_share_one_search():
+    """Test that queries within the window are searched as one batch."""
+    calls = []
+    coalescer = QueryCoalescer(_recording_search(calls), window=0.01)
+    results = await asyncio.gather(
+        coalescer.query("a", k=1), coalescer.query("b", k=3), coalescer.query("c")
+    )
+    assert calls == [(["a", "b", "c"], 5)]
+    assert results == [["a:0"], ["b:0", "b:1", "b:2"], [f"c:{i}" for i in range(5)]]
+    assert (coalescer.batches, coalescer.queries) == (1, 3)
+    coalescer.close()
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_searched_immediately():
+    """Test that reaching max_batch does not wait for the window."""
+    calls = []
+    coalescer = QueryCoalescer(_recording_search(calls), window=60, max_batch=2)
+    results = await asyncio.wait_for(
+        asyncio.gather(coalescer.query("a", 1), coalescer.query("b", 1)), timeout=5
+    )
+    assert results == [["a:0"], ["b:0"]]
+    assert len(calls) == 1
+    coalescer.close()
+
+
+@pytest.mark.asyncio
+async def test_search_errors_reach_every_query():
+    """Test that a failing batch search fails all of its queries."""
+
+    def failing(queries, k):
+        raise RuntimeError("index unavailable")
+
+    coalescer = QueryCoalescer(failing, window=0.001)
+    results = await asyncio.gather(
+        coalescer.query("a"), coalescer.query("b"), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    coalescer.close()
+
+
+@pytest.mark.asyncio
+async def test_queries_from_threads_are_coalesced():
+    """Test that blocking queries from worker threads are batched together."""
+    calls = []
+    coalescer = QueryCoalescer(_recording_search(calls), window=0.05)
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(pool, coalescer.query_threadsafe, f"q{i}", 1)
+                for i in range(8)
+            )
+        )
+    assert results == [[f"q{i}:0"] for i in range(8)]
+    assert len(calls) < 8
+    assert coalescer.in_loop_thread()
+    with pytest.raises(RuntimeError):
+        coalescer.query_threadsafe("on the loop")
+    coalescer.close()
+
+
+def test_invalid_arguments():
+    """Test validation of the coalescer settings."""
+
+    async def create(**kwargs):
+        QueryCoalescer(lambda queries, k: [], **kwargs)
+
+    with pytest.raises(ValueError):
+        asyncio.run(create(window=-1))
+    with pytest.raises(ValueError):
+        asyncio.run(create(max_batch=0))
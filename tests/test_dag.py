@@ -0,0 +1,68 @@
+"""Tests for the IncrementalTopologicalOrder class."""
+
+import random
+
+import networkx as nx
+import pytest
+
+from dynoagent.dag import IncrementalTopologicalOrder
+
+
+def _assert_valid_order(order):
+    """Assert that every edge of the graph agrees with the maintained order."""
+    position = order._position
+    assert set(position) == set(order.graph.nodes)
+    assert len(set(position.values())) == len(position)
+    for source, target in order.graph.edges:
+        assert position[source] < position[target]
+
+
+def test_random_insertions_match_networkx():
+    """Test that edges are accepted exactly when the graph stays acyclic."""
+    rng = random.Random(7)
+    for _ in range(20):
+        order = IncrementalTopologicalOrder(nx.DiGraph())
+        reference = nx.DiGraph()
+        for node in range(30):
+            order.add_node(node)
+            reference.add_node(node)
+        for _ in range(120):
+            source, target = rng.sample(range(30), 2)
+            reference.add_edge(source, target)
+            creates_cycle = not nx.is_directed_acyclic_graph(reference)
+            if creates_cycle:
+                reference.remove_edge(source, target)
+                with pytest.raises(ValueError):
+                    order.add_edge(source, target)
+            else:
+                order.add_edge(source, target)
+            assert set(order.graph.edges) == set(reference.edges)
+        _assert_valid_order(order)
+
+
+def test_cycle_is_reported_as_path():
+    """Test that a rejected edge reports one concrete cycle."""
+    order = IncrementalTopologicalOrder(nx.DiGraph())
+    order.add_edge("a", "b")
+    order.add_edge("b", "c")
+    order.add_edge("c", "d")
+
+    assert order.find_cycle("d", "a") == ["d", "a", "b", "c", "d"]
+    assert order.find_cycle("a", "d") is None
+    with pytest.raises(ValueError, match="d -> a -> b -> c -> d"):
+        order.add_edge("d", "a")
+    assert not order.graph.has_edge("d", "a")
+
+    with pytest.raises(ValueError):
+        order.add_edge("a", "a")
+
+
+def test_initial_order_and_removal():
+    """Test initialization from an existing graph and node removal."""
+    graph = nx.DiGraph([(3, 2), (2, 1)])
+    order = IncrementalTopologicalOrder(graph)
+    _assert_valid_order(order)
+
+    order.remove_node(2)
+    order.add_edge(1, 3)
+    _assert_valid_order(order)
@@ -4,6 +4,7 @@ Tests for DynoAgentWithTools class.
 
 import pytest
 
+from dynoagent import SegmentedIndex, TaskComplexityAnalyzer, TokenBudgetEstimator
 from dynoagent.dyno_agent_with_tools import DynoAgentWithTools
 
 
@@ -54,6 +55,19 @@ def test_perform_task():
     assert "metrics" in result
 
 
+@pytest.mark.asyncio
+async def test_perform_task_async():
+    """Test that perform_task_async returns the same result structure."""
+    agent = DynoAgentWithTools(
+        name="AsyncAgent",
+        role="TaskExecutor",
+        skills=["TaskExecution"],
+        goal="Execute tasks",
+    )
+    result = await agent.perform_task_async("Test task", {"context": "test"})
+    assert result == agent.perform_task("Test task", {"context": "test"})
+
+
 def test_data_operations():
     """Test data loading and indexing operations."""
     agent = DynoAgentWithTools(
@@ -64,28 +78,43 @@ def test_data_operations():
     )
 
     # Test load_data
-    result = agent.load_data("test_type", "test_data")
-    assert isinstance(result, list)
-    assert len(result) == 0
+    result = agent.load_data("text", "test_data")
+    assert result == [{"text": "test_data", "metadata": {}}]
+    with pytest.raises(ValueError):
+        agent.load_data("test_type", "test_data")  # Unknown source type
+
+    # Test query_index before anything is indexed
+    assert agent.query_index("test query") == []
 
     # Test index_documents
     agent.index_documents([])  # Should not raise error
-
-    # Test save_index
-    agent.save_index()  # Should not raise error
-
-    # Test load_index
-    agent.load_index()  # Should not raise error
+    agent.index_documents(
+        [
+            "Neural networks learn representations from data",
+            {"text": "The stock market fell sharply", "metadata": {"source": "news"}},
+        ]
+    )
 
     # Test query_index
-    result = agent.query_index("test query")
-    assert isinstance(result, str)
-    assert "Query result for: test query" in result
+    result = agent.query_index("how do neural networks learn", k=1)
+    assert isinstance(result, list)
+    assert result[0]["text"] == "Neural networks learn representations from data"
+    assert set(result[0]) == {"id", "score", "text", "metadata"}
+
+    # Test save_index and load_index without a path
+    with pytest.raises(ValueError):
+        agent.save_index()
+    with pytest.raises(ValueError):
+        agent.load_index()
 
     # Test get_document_summaries
-    summaries = agent.get_document_summaries()
-    assert isinstance(summaries, list)
-    assert len(summaries) == 0
+    pages = list(agent.get_document_summaries(page_size=1))
+    assert [page[0]["id"] for page in pages] == [0, 1]
+    assert pages[1][0] == {
+        "id": 1,
+        "summary": "The stock market fell sharply",
+        "metadata": {"source": "news"},
+    }
 
 
 def test_register_data_tools():
@@ -159,3 +188,263 @@ def test_edge_cases():
             goal="goal",
             max_tokens=-1,  # Invalid max_tokens
         )
+
+
+def test_auto_parameters_select_per_task():
+    """Test that auto mode picks parameters from each task's complexity."""
+    agent = DynoAgentWithTools(
+        name="AutoAgent",
+        role="Assistant",
+        skills=["Writing"],
+        goal="Answer questions",
+        llm_provider={"fast": "small-model", "advanced": "large-model"},
+        auto_parameters=True,
+    )
+    # The agent caches analyses itself, without enabling the shared cache
+    assert TaskComplexityAnalyzer.cache_info() is None
+    assert agent.complexity_cache_info()["size"] == 0
+
+    simple = agent.perform_task("Give a brief, quick list")["metrics"]
+    assert simple["complexity"] == "simple"
+    assert simple["max_tokens"] == 500
+    assert simple["provider_tier"] == "fast"
+    assert simple["llm_provider"] == "small-model"
+
+    complex_task = "A comprehensive, detailed and thorough evaluation"
+    complex_metrics = agent.perform_task(complex_task)["metrics"]
+    assert complex_metrics["complexity"] == "complex"
+    assert complex_metrics["max_tokens"] == 2000
+    assert complex_metrics["llm_provider"] == "large-model"
+
+    agent.perform_task(complex_task)
+    assert agent.complexity_cache_info()["hits"] == 1
+    assert agent.complexity_cache_info()["misses"] == 2
+
+
+def test_auto_parameters_use_token_budget():
+    """Test that learned token budgets replace the fixed estimates."""
+    budget = TokenBudgetEstimator(min_observations=5)
+    agent = DynoAgentWithTools(
+        name="BudgetAgent",
+        role="Summarizer",
+        skills=["Writing"],
+        goal="Answer questions",
+        auto_parameters=True,
+        token_budget=budget,
+        complexity_profiles={"simple": {"temperature": 0.0, "provider_tier": "nano"}},
+    )
+    task = "Summarize briefly"
+    for tokens in (120, 130, 140, 150, 160):
+        agent.record_token_usage(task, tokens)
+    metrics = agent.perform_task(task)["metrics"]
+    assert metrics["max_tokens"] <= 160
+    assert metrics["temperature"] == 0.0
+    assert metrics["provider_tier"] == "nano"
+
+    static = DynoAgentWithTools("Static", "Assistant", [], "goal")
+    assert static.perform_task(task)["metrics"]["max_tokens"] == 1500
+    with pytest.raises(ValueError):
+        static.record_token_usage(task, 100)
+    with pytest.raises(ValueError):
+        DynoAgentWithTools("Bad", "Assistant", [], "goal", token_budget={})
+
+
+def test_save_and_load_index(tmp_path):
+    """Test that a saved index is queried the same after loading."""
+    index_path = str(tmp_path / "index")
+    agent = DynoAgentWithTools(
+        "IndexAgent", "Indexer", [], "Index documents", index_path=index_path
+    )
+    agent.index_documents(["apples and pears", "cars and trucks", "pears are sweet"])
+    agent.save_index()
+
+    loaded = DynoAgentWithTools(
+        "LoadAgent", "Indexer", [], "Index documents", index_path=index_path
+    )
+    loaded.load_index()
+    assert loaded.query_index("sweet pears", k=2) == agent.query_index(
+        "sweet pears", k=2
+    )
+
+
+def test_index_documents_consumes_lazy_sources_in_batches(tmp_path):
+    """Test that indexing pulls documents from a generator one batch at a time."""
+    for i in range(5):
+        (tmp_path / f"doc{i}.txt").write_text(f"document number {i} " * 20)
+    agent = DynoAgentWithTools("Loader", "Indexer", [], "Index documents")
+    pulled = []
+    batch_sizes = []
+
+    def source():
+        for document in agent.iter_data("directory", str(tmp_path), chunk_size=100):
+            pulled.append(document)
+            yield document
+
+    original_add = None
+
+    def add(batch):
+        batch_sizes.append(len(batch))
+        # The loader never runs more than one batch ahead of indexing
+        assert len(pulled) <= sum(batch_sizes)
+        return original_add(batch)
+
+    agent.index_documents([])
+    original_add = agent.index.add
+    agent.index.add = add
+    agent.index_documents(source(), batch_size=4)
+
+    assert sum(batch_sizes) == len(pulled) == len(agent.index)
+    assert max(batch_sizes) == 4
+    assert agent.query_index("document number 3", k=1)[0]["metadata"][
+        "source"
+    ].endswith("doc3.txt")
+
+
+def test_query_cache_hits_and_invalidation():
+    """Test that repeated queries are cached until the index changes."""
+    agent = DynoAgentWithTools("CacheAgent", "Retriever", [], "Retrieve documents")
+    assert agent.query_cache_info()["size"] == 0
+    agent.index_documents(["red apples", "green pears"])
+
+    first = agent.query_index("red  apples", k=1)
+    first[0]["text"] = "changed by the caller"
+    assert agent.query_index(" red apples ", k=1)[0]["text"] == "red apples"
+    assert agent.query_cache_info()["hits"] == 1
+    agent.query_index("red apples", k=2)  # Different k is a different entry
+    assert agent.query_cache_info()["misses"] == 2
+
+    # Indexing more documents invalidates cached results
+    agent.index_documents(["red apples and red cherries"])
+    assert agent.query_cache_info()["size"] == 0
+    assert len(agent.query_index("red apples", k=3)) == 3
+
+    # So does changing the index directly, through its version
+    agent.index.add(["more red apples"])
+    assert len(agent.query_index("red apples", k=5)) == 4
+    assert agent.query_cache_info()["hits"] == 1
+
+    uncached = DynoAgentWithTools(
+        "NoCache", "Retriever", [], "goal", query_cache_size=0
+    )
+    uncached.index_documents(["red apples"])
+    assert (
+        uncached.query_index("red apples") == agent.query_index("red apples", k=1)[:1]
+    )
+    assert uncached.query_cache_info() is None
+
+
+@pytest.mark.asyncio
+async def test_query_index_batch_and_async():
+    """Test batched and async queries agree with single queries."""
+    agent = DynoAgentWithTools("BatchAgent", "Retriever", [], "Retrieve documents")
+    assert agent.query_index_batch(["anything", "else"]) == [[], []]
+    agent.index_documents(["red apples", "green pears", "yellow bananas"])
+
+    agent.query_index("green pears", k=2)  # Cached, so not searched again below
+    searched = []
+    search_batch = agent.index.search_batch
+    agent.index.search_batch = lambda queries, k: searched.append(queries) or (
+        search_batch(queries, k)
+    )
+    results = agent.query_index_batch(["red apples", "green pears", "bananas"], k=2)
+    assert searched == [["red apples", "bananas"]]
+    assert [r[0]["text"] for r in results] == [
+        "red apples",
+        "green pears",
+        "yellow bananas",
+    ]
+    assert agent.query_cache_info()["size"] == 3
+
+    assert await agent.query_index_async("red apples", k=2) == results[0]
+    assert await agent.query_index_async("pears yellow", k=2) == agent.query_index(
+        "pears yellow", k=2
+    )
+
+
+def test_segmented_index_deletion_and_persistence(tmp_path):
+    """Test indexing into segments, deleting documents and reloading the index."""
+    path = str(tmp_path / "segmented")
+    agent = DynoAgentWithTools(
+        "Ingester", "Retriever", [], "Ingest documents", segment_size=2, index_path=path
+    )
+    agent.index_documents(["red apples", "green pears", "yellow bananas"])
+    assert isinstance(agent.index, SegmentedIndex)
+    assert agent.query_index("red apples", k=1)[0]["id"] == 0
+
+    assert agent.delete_documents([0]) == 1
+    assert all(r["id"] != 0 for r in agent.query_index("red apples", k=3))
+    agent.save_index()
+
+    reloaded = DynoAgentWithTools("Reader", "Retriever", [], "Read", index_path=path)
+    reloaded.load_index()
+    assert isinstance(reloaded.index, SegmentedIndex)
+    assert [r["text"] for r in reloaded.query_index("pears", k=3)] == [
+        r["text"] for r in agent.query_index("pears", k=3)
+    ]
+
+    plain = DynoAgentWithTools("Plain", "Retriever", [], "goal")
+    plain.index_documents(["red apples"])
+    with pytest.raises(ValueError):
+        plain.delete_documents([0])
+    with pytest.raises(ValueError):
+        DynoAgentWithTools("Bad", "Retriever", [], "goal", segment_size=0)
+
+
+def test_document_summaries_are_cached_with_the_index(tmp_path):
+    """Test that summaries persist next to the index and skip unchanged documents."""
+    path = str(tmp_path / "index")
+    calls = []
+
+    def summarizer(text):
+        calls.append(text)
+        return text.split()[0]
+
+    agent = DynoAgentWithTools(
+        "Summarizer",
+        "Retriever",
+        [],
+        "Summarize",
+        index_path=path,
+        summarizer=summarizer,
+    )
+    assert list(agent.get_document_summaries()) == []
+    agent.index_documents([f"doc{i} has some text" for i in range(5)])
+    pages = agent.get_document_summaries(page_size=2, start_id=1)
+    assert [[s["summary"] for s in page] for page in pages] == [
+        ["doc1", "doc2"],
+        ["doc3", "doc4"],
+    ]
+    assert len(calls) == 4
+    with pytest.raises(ValueError):
+        agent.get_document_summaries(page_size=0)
+
+    other = DynoAgentWithTools(
+        "Other", "Retriever", [], "Summarize", index_path=path, summarizer=summarizer
+    )
+    other.index_documents(["doc2 has some text", "doc9 is new"])
+    assert [s["summary"] for page in other.get_document_summaries() for s in page] == [
+        "doc2",
+        "doc9",
+    ]
+    assert calls[4:] == ["doc9 is new"]
+
+
+def test_close_releases_index_and_summary_store(tmp_path):
+    """Test that closing the agent, or loading another index, closes the index."""
+    index_path = str(tmp_path / "index")
+    with DynoAgentWithTools(
+        "Closer", "Indexer", [], "g", index_path=index_path, segment_size=4
+    ) as agent:
+        # Enough segments for a background compaction, which starts its worker
+        agent.index_documents([f"document {i}" for i in range(40)])
+        assert agent.index._executor is not None
+        agent.save_index()
+        list(agent.get_document_summaries())
+        first = agent.index
+        agent.load_index()
+        assert agent.index is not first
+        assert first._executor is None
+        agent.index_documents([f"more {i}" for i in range(40)])
+        assert agent.index._executor is not None
+    assert agent.index._executor is None
+    assert agent.summary_store is None
@@ -354,7 +354,7 @@ async def test_team_advanced_features():
     assert len(results) == 3
 
     # Test optimal execution
-    results = await team.execute_optimal()
+    results = await team.execute_optimal_async()
     assert len(results) == 3
 
     # Test team visualization (should not raise error)
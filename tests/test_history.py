@@ -0,0 +1,116 @@
+"""Tests for the agent history storage types."""
+
+import json
+import pickle
+
+import pytest
+
+from dynoagent.history import HistoryRecord, LearningLog, RecordBuffer, ScoreBuffer
+
+
+def test_history_record_reads_like_dict():
+    """Test that records support the dictionary read API."""
+    record = HistoryRecord("task", {"key": "value"}, "role")
+    assert record["task"] == "task"
+    assert record.get("context") == {"key": "value"}
+    assert record.get("missing", 1) == 1
+    assert "role" in record
+    assert record == {"task": "task", "context": {"key": "value"}, "role": "role"}
+    assert dict(record.items()) == record.to_dict()
+    with pytest.raises(KeyError):
+        record["missing"]
+    assert not hasattr(record, "__dict__")
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_record_buffer_bounds_and_slicing():
+    """Test that the record buffer keeps the most recent entries."""
+    buffer = RecordBuffer(maxlen=3)
+    for i in range(5):
+        buffer.append(i)
+    assert list(buffer) == [2, 3, 4]
+    assert buffer[-1] == 4
+    assert buffer[:2] == [2, 3]
+
+
+def test_score_buffer_ring():
+    """Test that the score buffer acts as a ring buffer with a list-like read API."""
+    scores = ScoreBuffer(maxlen=3)
+    assert len(scores) == 0
+    assert not scores
+    scores.extend([1, 2, 3, 4, 5])
+    assert scores == [3.0, 4.0, 5.0]
+    assert scores[0] == 3.0
+    assert scores[-1] == 5.0
+    assert scores[1:] == [4.0, 5.0]
+    assert sum(scores) / len(scores) == 4.0
+    with pytest.raises(IndexError):
+        scores[3]
+
+    unbounded = ScoreBuffer(scores=[1.5, 2.5])
+    unbounded.append(3.5)
+    assert unbounded == [1.5, 2.5, 3.5]
+    unbounded.clear()
+    assert unbounded == []
+
+    with pytest.raises(ValueError):
+        ScoreBuffer(maxlen=0)
+
+
+def test_score_buffer_running_statistics():
+    """Test that window and lifetime statistics follow appends and evictions."""
+    scores = ScoreBuffer(maxlen=2, ewma_alpha=0.5)
+    assert scores.mean() is None
+    scores.extend([2, 4, 9])
+    assert scores.mean() == pytest.approx(6.5)
+    assert scores.stats.variance == pytest.approx(6.25)
+    assert scores.lifetime.count == 3
+    assert scores.lifetime.mean == pytest.approx(5.0)
+    assert scores.lifetime.ewma == pytest.approx(6.0)
+    scores.clear()
+    assert scores.mean() is None
+
+
+def test_learning_log_success_rate():
+    """Test that the success rate is maintained over the retained entries."""
+    log = LearningLog(maxlen=3)
+    assert log.success_rate == 0
+    for outcome in ["success", "failure", "success", "success"]:
+        log.append(("input", "output", outcome))
+    assert log.successes == 2
+    assert log.success_rate == pytest.approx(2 / 3)
+    log.popleft()
+    assert log.success_rate == 1.0
+    copy = pickle.loads(pickle.dumps(log))
+    assert copy.successes == log.successes and copy.maxlen == 3
+
+
+def test_buffers_compare_and_serialize_like_lists():
+    """Test equality with plain lists and JSON serialization through to_list."""
+    history = RecordBuffer(maxlen=2)
+    history.append(HistoryRecord("task", {"key": 1}, "role"))
+    expected = [{"task": "task", "context": {"key": 1}, "role": "role"}]
+    assert history == expected
+    assert not history != expected
+    assert history != expected * 2
+    assert history.to_list() == expected
+    assert json.loads(json.dumps(history.to_list())) == expected
+
+    log = LearningLog([("in", "out", "success")])
+    assert log == [("in", "out", "success")]
+    assert log.to_list() == [("in", "out", "success")]
+
+    scores = ScoreBuffer(maxlen=2, scores=[1, 2.5, 3])
+    assert scores == [2.5, 3.0]
+    assert scores != [1.0, 2.5]
+    assert json.dumps(scores.to_list()) == "[2.5, 3.0]"
+
+
+def test_score_buffer_rejects_non_numeric_scores():
+    """Test that invalid scores raise a clear error and leave the buffer unchanged."""
+    scores = ScoreBuffer(scores=[1.0])
+    for invalid in (None, "7", True):
+        with pytest.raises(ValueError, match="real numbers"):
+            scores.append(invalid)
+    assert scores == [1.0]
+    assert scores.stats.count == 1
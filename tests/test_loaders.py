@@ -0,0 +1,92 @@
+"""Tests for the streaming document loaders."""
+
+import pytest
+
+from dynoagent.loaders import iter_documents
+
+
+def test_text_and_document_sources():
+    """Test loading strings and documents, whole and chunked."""
+    assert list(iter_documents("text", ["a", "b"])) == [
+        {"text": "a", "metadata": {}},
+        {"text": "b", "metadata": {}},
+    ]
+    documents = list(
+        iter_documents(
+            "documents",
+            [{"text": "abcdefghij", "metadata": {"id": 1}}],
+            chunk_size=4,
+            chunk_overlap=1,
+        )
+    )
+    assert [document["text"] for document in documents] == ["abcd", "defg", "ghij"]
+    assert [document["metadata"] for document in documents] == [
+        {"id": 1, "chunk": 0},
+        {"id": 1, "chunk": 1},
+        {"id": 1, "chunk": 2},
+    ]
+
+
+def test_chunks_cover_file_across_blocks(tmp_path):
+    """Test chunking a file read in blocks, with multi-byte characters split."""
+    text = "".join(f"{i}é☕ " for i in range(2000))
+    path = tmp_path / "big.txt"
+    path.write_text(text, encoding="utf-8")
+
+    chunks = list(
+        iter_documents(
+            "file",
+            str(path),
+            chunk_size=97,
+            chunk_overlap=13,
+            block_size=101,
+            prefetch=3,
+        )
+    )
+    assert all(len(chunk["text"]) <= 97 for chunk in chunks)
+    assert all(chunk["metadata"]["source"] == str(path) for chunk in chunks)
+    # Removing the overlaps restores the text
+    rebuilt = chunks[0]["text"] + "".join(chunk["text"][13:] for chunk in chunks[1:])
+    assert rebuilt == text
+
+    whole = list(iter_documents("file", str(path), block_size=64))
+    assert whole == [{"text": text, "metadata": {"source": str(path)}}]
+
+
+def test_directory_source_is_sorted_and_filtered(tmp_path):
+    """Test recursive directory loading with a file name pattern."""
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "b.txt").write_text("second")
+    (tmp_path / "a.txt").write_text("first")
+    (tmp_path / "sub" / "c.txt").write_text("third")
+    (tmp_path / "skip.md").write_text("skipped")
+    (tmp_path / "empty.txt").write_text("")
+
+    documents = list(iter_documents("directory", str(tmp_path), pattern="*.txt"))
+    assert [document["text"] for document in documents] == [
+        "first",
+        "second",
+        "",
+        "third",
+    ]
+
+    # Stopping early does not hang or leak reads
+    iterator = iter_documents("directory", str(tmp_path), prefetch=1)
+    assert next(iterator)["text"] == "first"
+    iterator.close()
+
+
+def test_invalid_sources_fail_immediately(tmp_path):
+    """Test that bad arguments raise before any document is requested."""
+    with pytest.raises(ValueError):
+        iter_documents("database", "table")
+    with pytest.raises(ValueError):
+        iter_documents("file", str(tmp_path / "missing.txt"))
+    with pytest.raises(ValueError):
+        iter_documents("directory", str(tmp_path / "missing"))
+    with pytest.raises(ValueError):
+        iter_documents("text", "x", chunk_size=10, chunk_overlap=10)
+    with pytest.raises(ValueError):
+        iter_documents("text", "x", prefetch=0)
+    with pytest.raises(ValueError):
+        list(iter_documents("text", [1]))
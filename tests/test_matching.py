@@ -0,0 +1,27 @@
+"""Tests for the MultiPatternMatcher class."""
+
+from dynoagent.matching import MultiPatternMatcher
+
+
+def test_find_overlapping_patterns():
+    """Test that nested and overlapping patterns are all reported."""
+    matcher = MultiPatternMatcher(["he", "she", "his", "hers", "data", "dataloader"])
+    assert matcher.find("ushers") == {"he", "she", "hers"}
+    assert matcher.find("run a dataloader") == {"data", "dataloader"}
+    assert matcher.find("nothing here") == {"he"}
+    assert matcher.find("") == set()
+
+
+def test_find_matches_substring_semantics():
+    """Test that results agree with Python's substring operator."""
+    patterns = ["a", "ab", "bab", "bc", "bca", "c", "caa"]
+    matcher = MultiPatternMatcher(patterns)
+    for text in ["abccab", "bcaab", "xyz", "cacbcab", "babab"]:
+        assert matcher.find(text) == {p for p in patterns if p in text}
+
+
+def test_empty_pattern_matches_everything():
+    """Test that an empty pattern behaves like the empty substring."""
+    matcher = MultiPatternMatcher(["", "x"])
+    assert matcher.find("abc") == {""}
+    assert matcher.find("x") == {"", "x"}
@@ -0,0 +1,70 @@
+"""Tests for the running statistics classes."""
+
+import random
+import statistics
+
+import pytest
+
+from dynoagent.metrics import P2Quantile, RunningStats
+
+
+def test_running_stats_match_batch_statistics():
+    """Test that incremental statistics agree with batch computations."""
+    values = [3.0, 7.5, 1.25, 9.0, 6.0, 6.0, 2.5]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.variance == pytest.approx(statistics.pvariance(values))
+    assert stats.stddev == pytest.approx(statistics.pstdev(values))
+
+    # Discarding values keeps statistics over the remaining ones
+    for value in values[:3]:
+        stats.discard(value)
+    assert stats.count == 4
+    assert stats.mean == pytest.approx(statistics.fmean(values[3:]))
+    assert stats.variance == pytest.approx(statistics.pvariance(values[3:]))
+
+
+def test_running_stats_ewma_and_empty():
+    """Test the exponentially weighted mean and empty statistics."""
+    stats = RunningStats(ewma_alpha=0.5)
+    assert stats.variance is None
+    assert stats.ewma is None
+    for value in [4.0, 8.0, 0.0]:
+        stats.add(value)
+    assert stats.ewma == pytest.approx(3.0)
+
+    with pytest.raises(ValueError):
+        RunningStats(ewma_alpha=0)
+
+
+def test_p2_quantile_tracks_sample_quantile():
+    """Test the streaming quantile against the exact quantile of a large sample."""
+    rng = random.Random(7)
+    values = [rng.lognormvariate(6, 0.5) for _ in range(20000)]
+    estimate = P2Quantile(0.95)
+    for value in values:
+        estimate.add(value)
+    exact = statistics.quantiles(values, n=20)[-1]
+    assert estimate.count == len(values)
+    assert estimate.value == pytest.approx(exact, rel=0.02)
+
+    restored = P2Quantile.from_dict(estimate.to_dict())
+    assert restored.value == estimate.value
+    restored.add(1.0)
+    estimate.add(1.0)
+    assert restored.value == estimate.value
+
+
+def test_p2_quantile_small_samples():
+    """Test the exact nearest-rank quantile before five values are seen."""
+    estimate = P2Quantile(0.5)
+    assert estimate.value is None
+    for value in [30, 10, 20]:
+        estimate.add(value)
+    assert estimate.value == 20
+
+    with pytest.raises(ValueError):
+        P2Quantile(1.0)
@@ -0,0 +1,244 @@
+"""Tests for the SegmentedIndex class."""
+
+import os
+import pickle
+import threading
+
+import pytest
+
+from dynoagent.segments import SegmentedIndex
+from dynoagent.vector_index import HashingEmbedder, VectorIndex
+
+
+def _texts(start, stop):
+    return [
+        f"document {i} about topic {i % 11} and item {i % 5}"
+        for i in range(start, stop)
+    ]
+
+
+def _ids(results):
+    return [[r["id"] for r in query_results] for query_results in results]
+
+
+QUERIES = ["topic 3", "item 4 topic 7", "document 42", "nothing related"]
+
+
+def test_search_matches_single_vector_index():
+    """Test that searching across segments equals searching one flat index."""
+    embedder = HashingEmbedder(dim=64)
+    segmented = SegmentedIndex(embedder, segment_size=37, background_compaction=False)
+    flat = VectorIndex(embedder)
+    for start in range(0, 300, 25):
+        assert segmented.add(_texts(start, start + 25)) == list(
+            range(start, start + 25)
+        )
+        flat.add(_texts(start, start + 25))
+
+    assert len(segmented) == 300
+    assert len(segmented.segments) > 1
+    for batch, single in zip(
+        segmented.search_batch(QUERIES, k=6), flat.search_batch(QUERIES, k=6)
+    ):
+        assert [r["score"] for r in batch] == pytest.approx(
+            [r["score"] for r in single], abs=1e-5
+        )
+        assert [r["text"] for r in batch] == [flat.texts[r["id"]] for r in batch]
+    assert SegmentedIndex().search("anything") == []
+
+
+def test_deleted_documents_are_not_returned():
+    """Test that tombstoned documents disappear from results immediately."""
+    index = SegmentedIndex(
+        HashingEmbedder(dim=64), segment_size=50, background_compaction=False
+    )
+    index.add(_texts(0, 120))
+    version = index.version
+    best = index.search(_texts(42, 43)[0], k=1)[0]["id"]
+    assert best == 42
+
+    assert index.delete([42, 43, 999, 42]) == 2
+    assert index.delete([42]) == 0
+    assert index.version != version
+    assert len(index) == 118
+    assert all(42 not in ids for ids in _ids(index.search_batch(QUERIES, k=200)))
+    assert len(index.search("document", k=200)) == 118
+
+    # Documents in the active segment can be deleted too
+    assert index.delete([110]) == 1
+    assert 110 not in _ids([index.search(_texts(110, 111)[0], k=5)])[0]
+
+
+def test_compaction_bounds_segments_and_purges_deletions():
+    """Test that merging keeps results and ids while dropping deleted documents."""
+    index = SegmentedIndex(
+        HashingEmbedder(dim=64),
+        segment_size=10,
+        max_segments=3,
+        max_dead_ratio=0.4,
+        background_compaction=False,
+    )
+    for start in range(0, 100, 10):
+        index.add(_texts(start, start + 10))
+        assert len(index._segments) <= 3
+    before = index.search_batch(QUERIES, k=100)
+    assert index.compactions > 0
+
+    index.delete(range(0, 100, 2))
+    assert index._tombstones == set()  # Segments were rewritten without them
+    assert len(index) == 50
+    for results, previous in zip(index.search_batch(QUERIES, k=100), before):
+        odd = [r for r in previous if r["id"] % 2]
+        assert sorted(r["id"] for r in results) == sorted(r["id"] for r in odd)
+        assert [r["score"] for r in results] == pytest.approx(
+            [r["score"] for r in odd], abs=1e-5
+        )
+
+    index.compact()
+    assert len(index.segments) == 1
+    assert len(index) == 50
+    assert index.search(_texts(43, 44)[0], k=1)[0]["id"] == 43
+
+
+def test_background_compaction():
+    """Test that segments are merged on the worker thread."""
+    index = SegmentedIndex(HashingEmbedder(dim=32), segment_size=5, max_segments=2)
+    for start in range(0, 60, 5):
+        index.add(_texts(start, start + 5))
+    index.wait_for_compaction()
+    index.close()
+    assert index.compactions > 0
+    assert len(index) == 60
+    assert sorted(r["id"] for r in index.search("document", k=100)) == list(range(60))
+
+
+def test_writes_during_background_compaction_are_not_lost():
+    """Test that a write just as a compaction finishes still gets merged."""
+    index = SegmentedIndex(HashingEmbedder(dim=32), segment_size=5, max_segments=2)
+    compact = index._compact
+    finished, resume = threading.Event(), threading.Event()
+
+    def compact_then_pause(segments=None):
+        compact(segments)
+        if not finished.is_set():
+            # Done with its plan, but not yet marked as done
+            finished.set()
+            resume.wait(timeout=5)
+
+    index._compact = compact_then_pause
+    index.add(_texts(0, 15))
+    assert finished.wait(timeout=5)
+    index.add(_texts(15, 30))
+    resume.set()
+    index.wait_for_compaction()
+    index.close()
+    assert len(index._segments) <= 2
+    assert len(index) == 30
+
+
+def test_save_only_writes_changed_segments(tmp_path):
+    """Test incremental saving and loading of a segmented index."""
+    path = str(tmp_path / "index")
+    embedder = HashingEmbedder(dim=64)
+    index = SegmentedIndex(embedder, segment_size=20, background_compaction=False)
+    index.add(_texts(0, 50))
+    index.delete([7])
+    index.save(path)
+
+    sealed = os.path.join(path, index._segments[0].name, "embeddings.npy")
+    written = os.path.getmtime(sealed)
+    os.utime(sealed, (written - 100, written - 100))
+    index.add(_texts(50, 55))
+    index.save(path)
+    assert os.path.getmtime(sealed) == written - 100
+
+    loaded = SegmentedIndex.load(path, embedder, background_compaction=False)
+    assert len(loaded) == 54
+    assert _ids(loaded.search_batch(QUERIES, k=5)) == _ids(
+        index.search_batch(QUERIES, k=5)
+    )
+    assert loaded.add(["a new document"]) == [55]
+    assert loaded.delete([7, 8]) == 1
+
+    # Segments merged away are removed from the directory on the next save
+    loaded.compact()
+    loaded.save(path)
+    assert sorted(n for n in os.listdir(path) if n.startswith("segment-")) == [
+        loaded.segments[0].name
+    ]
+    assert len(SegmentedIndex.load(path, embedder)) == 54
+
+
+def test_pickled_index_gets_its_own_locks_and_worker():
+    """Test that a copy of an index searches the same and compacts on its own."""
+    index = SegmentedIndex(HashingEmbedder(dim=32), segment_size=5, max_segments=2)
+    index.add(_texts(0, 30))
+    index.delete([3])
+    index.wait_for_compaction()
+
+    copy = pickle.loads(pickle.dumps(index))
+    index.close()
+    assert _ids(copy.search_batch(QUERIES, k=5)) == _ids(
+        index.search_batch(QUERIES, k=5)
+    )
+    copy.add(_texts(30, 60))
+    copy.wait_for_compaction()
+    copy.close()
+    assert len(copy) == 59
+    assert len(index) == 29
+
+
+def test_save_writes_without_holding_the_lock(tmp_path, monkeypatch):
+    """Test that documents can be added while a save writes to disk."""
+    path = str(tmp_path / "index")
+    embedder = HashingEmbedder(dim=32)
+    index = SegmentedIndex(embedder, segment_size=20, background_compaction=False)
+    index.add(_texts(0, 25))
+    save = VectorIndex.save
+
+    def save_while_adding(vector_index, segment_path):
+        if segment_path.endswith("segment-000001"):
+            adder = threading.Thread(target=index.add, args=(_texts(25, 30),))
+            adder.start()
+            adder.join(timeout=5)
+            assert not adder.is_alive()
+        save(vector_index, segment_path)
+
+    monkeypatch.setattr(VectorIndex, "save", save_while_adding)
+    index.save(path)
+    monkeypatch.undo()
+    # The active segment changed while it was written, so it is written again
+    assert len(SegmentedIndex.load(path, embedder)) == 25
+    index.save(path)
+    assert len(SegmentedIndex.load(path, embedder)) == 30
+
+
+def test_invalid_arguments():
+    """Test validation of the index settings."""
+    with pytest.raises(ValueError):
+        SegmentedIndex(segment_size=0)
+    with pytest.raises(ValueError):
+        SegmentedIndex(max_segments=0)
+    with pytest.raises(ValueError):
+        SegmentedIndex(max_dead_ratio=0)
+    with pytest.raises(ValueError):
+        SegmentedIndex().search("query", k=0)
+
+
+def test_iter_records_in_id_order():
+    """Test iterating over live documents across merged segments."""
+    index = SegmentedIndex(
+        HashingEmbedder(dim=16), segment_size=4, background_compaction=False
+    )
+    index.add(_texts(0, 10))
+    index.delete([2, 5])
+    index.compact()
+    index.add(_texts(10, 13))
+    assert [i for i, _, _ in index.iter_records()] == [
+        i for i in range(13) if i not in (2, 5)
+    ]
+    assert next(index.iter_records(start_id=5))[:2] == (6, _texts(6, 7)[0])
+
+    flat = VectorIndex(HashingEmbedder(dim=16))
+    flat.add(["a", {"text": "b", "metadata": {"x": 1}}])
+    assert list(flat.iter_records(1)) == [(1, "b", {"x": 1})]
@@ -0,0 +1,79 @@
+"""Tests for document summaries."""
+
+import pickle
+
+from dynoagent.summaries import (
+    SummaryStore,
+    content_hash,
+    summarize_text,
+    summary_pages,
+)
+
+
+def test_summarize_text():
+    """Test extractive summaries by leading sentences."""
+    assert summarize_text("  Short   text. ") == "Short text."
+    text = "First sentence here. Second one follows! Third is long " + "x" * 300
+    assert summarize_text(text, max_chars=45) == (
+        "First sentence here. Second one follows!"
+    )
+    summary = summarize_text("word " * 100, max_chars=22)
+    assert summary == "word word word word…"
+    assert len(summary) <= 22
+
+
+def test_summary_store_persists(tmp_path):
+    """Test storing and looking up summaries by content hash."""
+    path = str(tmp_path / "store" / "summaries.sqlite3")
+    store = SummaryStore(path)
+    store.put_many([(content_hash("a"), "summary a"), (content_hash("b"), "b")])
+    assert store.get_many([content_hash("a"), content_hash("c")]) == {
+        content_hash("a"): "summary a"
+    }
+    store.close()
+
+    reopened = SummaryStore(path)
+    assert len(reopened) == 2
+    many = [(content_hash(str(i)), str(i)) for i in range(1200)]
+    reopened.put_many(many)
+    assert reopened.get_many(h for h, _ in many) == dict(many)
+    reopened.clear()
+    assert len(reopened) == 0
+    assert content_hash("a") != content_hash("b")
+
+
+def test_pickled_summary_store(tmp_path):
+    """Test that copies of a store reopen its file, or copy it if in memory."""
+    memory = SummaryStore()
+    memory.put_many([(content_hash("a"), "summary a")])
+    copy = pickle.loads(pickle.dumps(memory))
+    assert copy.get_many([content_hash("a")]) == {content_hash("a"): "summary a"}
+
+    path = str(tmp_path / "summaries.sqlite3")
+    store = SummaryStore(path)
+    copy = pickle.loads(pickle.dumps(store))
+    copy.put_many([(content_hash("b"), "b")])
+    assert len(store) == 1
+
+
+def test_summary_pages_are_lazy_and_reuse_stored_summaries():
+    """Test that only requested pages are summarized, each content only once."""
+    calls = []
+
+    def summarize(text):
+        calls.append(text)
+        return text.upper()
+
+    records = [(i, f"text {i % 3}", {"n": i}) for i in range(7)]
+    store = SummaryStore()
+    pages = summary_pages(iter(records), store, summarize, page_size=3)
+    assert calls == []
+
+    first = next(pages)
+    assert first[0] == {"id": 0, "summary": "TEXT 0", "metadata": {"n": 0}}
+    assert sorted(calls) == ["text 0", "text 1", "text 2"]
+    assert [len(page) for page in pages] == [3, 1]
+    assert len(calls) == 3  # Later pages repeat the same texts
+
+    list(summary_pages(iter(records), store, summarize, page_size=2))
+    assert len(calls) == 3
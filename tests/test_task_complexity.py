@@ -1,8 +1,15 @@
 """Tests for the TaskComplexityAnalyzer class."""
 
+import gzip
+import json
+import os
+import random
+import re
+import threading
+
 import pytest
 
-from dynoagent import TaskComplexityAnalyzer
+from dynoagent import ComplexityRuleSet, TaskComplexityAnalyzer
 
 
 def test_analyze_complexity_simple():
@@ -50,3 +57,383 @@ def test_estimate_token_needs():
     with_refs = analyzer.estimate_token_needs("medium", with_references=True)
     without_refs = analyzer.estimate_token_needs("medium", with_references=False)
     assert with_refs > without_refs
+
+
+def _legacy_analyze_complexity(text, role=None):
+    """Reference implementation scanning the text once per indicator."""
+    text = text.lower().strip()
+    word_count = len(text.split())
+    base_complexity = "simple"
+    if word_count > 50:
+        base_complexity = "medium"
+    if word_count > 200:
+        base_complexity = "complex"
+    scores = {"simple": 0, "medium": 0, "complex": 0, "creative": 0}
+    for level, indicators in TaskComplexityAnalyzer.COMPLEXITY_INDICATORS.items():
+        for indicator in indicators:
+            scores[level] += len(re.findall(r"\b" + re.escape(indicator) + r"\b", text))
+    max_score = 0
+    content_complexity = base_complexity
+    for level, score in scores.items():
+        if score > max_score:
+            max_score = score
+            content_complexity = level
+    mapping = TaskComplexityAnalyzer.ROLE_COMPLEXITY_MAPPING
+    if role and role.lower() in mapping:
+        role_complexity = mapping[role.lower()]
+        if content_complexity == role_complexity or max_score >= 3:
+            return content_complexity
+        return role_complexity
+    return content_complexity
+
+
+def test_analyze_complexity_matches_per_indicator_scan():
+    """Test that the single-pass matcher gives the same results as per-indicator regexes."""
+    rng = random.Random(3)
+    vocabulary = [
+        indicator
+        for indicators in TaskComplexityAnalyzer.COMPLEXITY_INDICATORS.values()
+        for indicator in indicators
+    ]
+    vocabulary += ["Deep", "dive", "in", "depth", "listing", "designer", "novels"]
+    vocabulary += ["the", "data", "report", "a", "-", "of", "in-depth-ish", "EASY,"]
+    roles = [None, "researcher", "writer", "summarizer", "unknown"]
+    for _ in range(300):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(0, 260))]
+        text = rng.choice([" ", "  ", "\n"]).join(words)
+        role = rng.choice(roles)
+        assert TaskComplexityAnalyzer.analyze_complexity(text, role) == (
+            _legacy_analyze_complexity(text, role)
+        ), text
+
+
+def test_analyze_batch_matches_single_analysis():
+    """Test that batch analysis agrees with per-text analysis and token estimates."""
+    rng = random.Random(5)
+    vocabulary = [
+        indicator
+        for indicators in TaskComplexityAnalyzer.COMPLEXITY_INDICATORS.values()
+        for indicator in indicators
+    ] + ["the", "data", "report", "of", "summarized"]
+    texts = [
+        " ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 230)))
+        for _ in range(200)
+    ]
+    roles = [
+        rng.choice([None, "analyst", "Writer", "extractor", "other"]) for _ in texts
+    ]
+
+    levels, tokens = TaskComplexityAnalyzer.analyze_batch(texts, roles)
+    _, tokens_with_refs = TaskComplexityAnalyzer.analyze_batch(
+        texts, roles, with_references=True
+    )
+    for i, (text, role) in enumerate(zip(texts, roles)):
+        expected = TaskComplexityAnalyzer.analyze_complexity(text, role)
+        assert levels[i] == expected
+        assert tokens[i] == TaskComplexityAnalyzer.estimate_token_needs(expected)
+        assert tokens_with_refs[i] == TaskComplexityAnalyzer.estimate_token_needs(
+            expected, with_references=True
+        )
+
+
+def test_analyze_batch_edge_cases():
+    """Test empty batches, a shared role and mismatched roles."""
+    levels, tokens = TaskComplexityAnalyzer.analyze_batch([])
+    assert len(levels) == 0 and len(tokens) == 0
+
+    levels, _ = TaskComplexityAnalyzer.analyze_batch(
+        ["", "Write a summary"], "researcher"
+    )
+    assert list(levels) == ["complex", "complex"]
+
+    with pytest.raises(ValueError):
+        TaskComplexityAnalyzer.analyze_batch(["a", "b"], ["writer"])
+
+
+@pytest.fixture
+def analysis_cache():
+    """Enable the analysis cache for a test and disable it afterwards."""
+    TaskComplexityAnalyzer.enable_cache(maxsize=2)
+    yield
+    TaskComplexityAnalyzer.disable_cache()
+
+
+def test_analysis_cache_hits_and_eviction(analysis_cache):
+    """Test that repeated analyses are served from the cache."""
+    text = "Provide a comprehensive analysis of the economic impact"
+    assert TaskComplexityAnalyzer.analyze_complexity(text) == "complex"
+    # Surrounding whitespace and role case do not change the key
+    assert TaskComplexityAnalyzer.analyze_complexity(f"  {text}\n") == "complex"
+    assert TaskComplexityAnalyzer.analyze_complexity("Hello", "Analyst") == "complex"
+    assert TaskComplexityAnalyzer.analyze_complexity("Hello", "analyst") == "complex"
+    info = TaskComplexityAnalyzer.cache_info()
+    assert info["hits"] == 2
+    assert info["misses"] == 2
+    assert info["size"] == 2
+
+    # Long texts are cached under a digest and stay distinct from each other
+    long_simple = "brief " * 500
+    long_complex = "detailed " * 500
+    assert TaskComplexityAnalyzer.analyze_complexity(long_simple) == "simple"
+    assert TaskComplexityAnalyzer.analyze_complexity(long_complex) == "complex"
+    assert TaskComplexityAnalyzer.cache_info()["size"] == 2
+
+    TaskComplexityAnalyzer.enable_cache(maxsize=1)
+    assert TaskComplexityAnalyzer.cache_info()["size"] == 1
+    TaskComplexityAnalyzer.clear_cache()
+    assert TaskComplexityAnalyzer.cache_info()["size"] == 0
+
+
+def test_analysis_cache_disabled_by_default():
+    """Test that the cache is opt-in."""
+    assert TaskComplexityAnalyzer.cache_info() is None
+    TaskComplexityAnalyzer.clear_cache()  # No-op without a cache
+
+
+def _random_chunks(rng, text):
+    """Split a text at random positions."""
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, 8)))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def test_analyze_complexity_stream_matches_analyze_complexity():
+    """Test that streamed analysis agrees with analysis of the whole text."""
+    rng = random.Random(11)
+    vocabulary = [
+        "Deep Dive",
+        "deep",
+        "dive",
+        "in-depth",
+        "brief",
+        "design",
+        "explain",
+        "the",
+        "quick brown",
+        "\n",
+    ]
+    for _ in range(300):
+        text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 120)))
+        role = rng.choice([None, "analyst", "writer", "summarizer", "other"])
+        expected = TaskComplexityAnalyzer.analyze_complexity(text, role)
+        chunks = _random_chunks(rng, text)
+        assert (
+            TaskComplexityAnalyzer.analyze_complexity_stream(chunks, role) == expected
+        )
+        assert (
+            TaskComplexityAnalyzer.analyze_complexity_stream(
+                chunks, role, total_length=len(text)
+            )
+            == expected
+        )
+
+
+def test_analyze_complexity_stream_finds_indicator_across_chunks():
+    """Test that an indicator split between chunks is counted once."""
+    chunks = ["Let's do a de", "ep di", "ve into it"]
+    assert TaskComplexityAnalyzer.analyze_complexity_stream(chunks) == "complex"
+    # A word split between chunks is counted once
+    chunks = ["word " * 60 + "wo", "rd"]
+    assert TaskComplexityAnalyzer.analyze_complexity_stream(chunks) == "medium"
+
+
+def test_analyze_complexity_stream_stops_early():
+    """Test that reading stops once the remaining text cannot change the result."""
+    chunks = ["detailed " * 100] * 100
+    read = []
+
+    def source():
+        for chunk in chunks:
+            read.append(chunk)
+            yield chunk
+
+    total_length = sum(map(len, chunks))
+    result = TaskComplexityAnalyzer.analyze_complexity_stream(
+        source(), total_length=total_length
+    )
+    assert result == "complex"
+    assert len(read) < len(chunks)
+
+
+# Simple indicators first and complex ones after filler, so that stopping on a
+# wrong bound of the remaining text gives "simple"
+LATE_COMPLEX_TEXT = "brief quick " * 10 + "filler " * 12000 + "detailed thorough " * 20
+
+
+def test_analyze_complexity_stream_reads_pipes_to_the_end():
+    """Test that a pipe, which reports a size of 0, is not taken as exhausted."""
+    assert TaskComplexityAnalyzer.analyze_complexity(LATE_COMPLEX_TEXT) == "complex"
+    read_fd, write_fd = os.pipe()
+
+    def write():
+        with os.fdopen(write_fd, "w", encoding="utf-8") as writer:
+            writer.write(LATE_COMPLEX_TEXT)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    with os.fdopen(read_fd, encoding="utf-8") as reader:
+        assert TaskComplexityAnalyzer.analyze_complexity_stream(reader) == "complex"
+    writer.join()
+
+
+def test_analyze_complexity_stream_reads_compressed_files_to_the_end(tmp_path):
+    """Test that the compressed size of a gzip file is not taken as a bound."""
+    path = tmp_path / "task.txt.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write(LATE_COMPLEX_TEXT)
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        assert TaskComplexityAnalyzer.analyze_complexity_stream(file) == "complex"
+    with gzip.open(path, "rb") as file:
+        assert TaskComplexityAnalyzer.analyze_complexity_stream(file) == "complex"
+
+
+def test_analyze_complexity_stream_bounds_files_from_their_position(tmp_path):
+    """Test that the part of a file already read does not count as remaining."""
+    path = tmp_path / "task.txt"
+    path.write_text(LATE_COMPLEX_TEXT, encoding="utf-8")
+    with open(path, "rb") as file:
+        file.read(100)
+        assert TaskComplexityAnalyzer._remaining_file_length(file) == (
+            len(LATE_COMPLEX_TEXT) - 100
+        )
+        assert TaskComplexityAnalyzer.analyze_complexity_stream(file) == "complex"
+
+
+def test_analyze_complexity_stream_reads_files(tmp_path):
+    """Test streaming from text and binary file objects."""
+    text = "Imagine a story. " * 5000 + "brief " * 10
+    path = tmp_path / "task.txt"
+    path.write_text(text, encoding="utf-8")
+    expected = TaskComplexityAnalyzer.analyze_complexity(text)
+    with open(path, encoding="utf-8") as file:
+        assert TaskComplexityAnalyzer.analyze_complexity_stream(file) == expected
+    with open(path, "rb") as file:
+        assert TaskComplexityAnalyzer.analyze_complexity_stream(file) == expected
+
+
+@pytest.fixture
+def restore_rule_set():
+    """Restore the default rule set after a test."""
+    yield
+    TaskComplexityAnalyzer.set_rule_set(TaskComplexityAnalyzer.DEFAULT_RULE_SET)
+
+
+def test_rule_set_from_dict_and_json(tmp_path):
+    """Test building rule sets, inheriting missing sections and round-tripping."""
+    defaults = TaskComplexityAnalyzer.DEFAULT_RULE_SET
+    rule_set = ComplexityRuleSet.from_dict(
+        {"indicators": {"complex": ["Root Cause", "postmortem"]}}, defaults
+    )
+    assert rule_set.indicators == {"complex": ("root cause", "postmortem")}
+    assert rule_set.role_mapping == defaults.role_mapping
+    assert rule_set.token_estimates == defaults.token_estimates
+
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rule_set.to_dict()), encoding="utf-8")
+    loaded = ComplexityRuleSet.from_json(str(path))
+    assert loaded.to_dict() == rule_set.to_dict()
+
+
+def test_rule_set_fills_missing_sections_and_levels():
+    """Test that rule sets never fall back to a flat estimate or lose the roles."""
+    defaults = TaskComplexityAnalyzer.DEFAULT_RULE_SET
+    rule_set = ComplexityRuleSet.from_dict(
+        {
+            "indicators": {"complex": ["postmortem"]},
+            "token_estimates": {"complex": 4000},
+        }
+    )
+    assert rule_set.role_mapping == defaults.role_mapping
+    assert rule_set.token_estimates == {**defaults.token_estimates, "complex": 4000}
+
+    tokens_only = ComplexityRuleSet.from_dict({"token_estimates": {"simple": 300}})
+    assert tokens_only.indicators == defaults.indicators
+    assert tokens_only.token_estimates["simple"] == 300
+
+    # Explicitly empty roles are kept
+    assert (
+        ComplexityRuleSet.from_dict({"indicators": {}, "roles": {}}).role_mapping == {}
+    )
+
+    direct = ComplexityRuleSet({"simple": ["word"]}, token_estimates={"medium": 700})
+    assert direct.role_mapping == {}
+    assert direct.token_estimates == {**defaults.token_estimates, "medium": 700}
+
+
+def test_load_rule_set_with_token_estimates_only(restore_rule_set):
+    """Test hot-swapping only the token estimates of the active rule set."""
+    TaskComplexityAnalyzer.load_rule_set({"token_estimates": {"simple": 300}})
+    assert TaskComplexityAnalyzer.analyze_complexity("A brief list") == "simple"
+    assert TaskComplexityAnalyzer.estimate_token_needs("simple") == 300
+    assert TaskComplexityAnalyzer.estimate_token_needs("complex") == 2000
+
+
+def test_overlapping_indicators_use_longest_match(restore_rule_set):
+    """Test that only the longest indicator matching at a position is counted."""
+    TaskComplexityAnalyzer.load_rule_set(
+        {"indicators": {"simple": ["deep"], "complex": ["deep dive"]}}
+    )
+    assert TaskComplexityAnalyzer.analyze_complexity("A deep dive") == "complex"
+    assert TaskComplexityAnalyzer.analyze_complexity("A deep pool") == "simple"
+
+
+def test_rule_set_validation():
+    """Test that malformed rule sets are rejected."""
+    with pytest.raises(ValueError):
+        ComplexityRuleSet({"impossible": ["word"]})
+    with pytest.raises(ValueError):
+        ComplexityRuleSet({"simple": [""]})
+    with pytest.raises(ValueError):
+        ComplexityRuleSet({"simple": ["word"]}, role_mapping={"pilot": "hard"})
+    with pytest.raises(ValueError):
+        ComplexityRuleSet({"simple": ["word"]}, token_estimates={"simple": 0})
+    with pytest.raises(ValueError):
+        ComplexityRuleSet.from_dict({"indicators": {}, "extra": {}})
+    with pytest.raises(ValueError):
+        TaskComplexityAnalyzer.set_rule_set({"indicators": {}})
+
+
+def test_load_rule_set_changes_analysis(restore_rule_set, analysis_cache):
+    """Test that every analysis path uses the active rule set."""
+    text = "Write the postmortem for the outage"
+    assert TaskComplexityAnalyzer.analyze_complexity(text) == "simple"
+
+    TaskComplexityAnalyzer.load_rule_set(
+        {
+            "indicators": {"complex": ["postmortem", "root cause"]},
+            "roles": {"sre": "medium"},
+            "token_estimates": {"complex": 4000},
+        }
+    )
+    # Cached results from the previous rule set are not reused
+    assert TaskComplexityAnalyzer.analyze_complexity(text) == "complex"
+    assert TaskComplexityAnalyzer.analyze_complexity("Root cause?", "SRE") == "medium"
+    assert TaskComplexityAnalyzer.analyze_complexity("Hello", "analyst") == "simple"
+    assert TaskComplexityAnalyzer.estimate_token_needs("complex") == 4000
+    assert TaskComplexityAnalyzer.estimate_token_needs("simple") == 500
+
+    levels, tokens = TaskComplexityAnalyzer.analyze_batch([text, "Hello"])
+    assert list(levels) == ["complex", "simple"]
+    assert list(tokens) == [4000, 500]
+    assert TaskComplexityAnalyzer.analyze_complexity_stream(["post", "mortem"]) == (
+        "complex"
+    )
+
+
+def test_large_rule_set_matches_naive_scan(restore_rule_set):
+    """Test a rule set with thousands of indicators per level against a naive count."""
+    rng = random.Random(3)
+    levels = ("simple", "medium", "complex", "creative")
+    indicators = {
+        level: {
+            "".join(rng.choice("abcdefgh") for _ in range(rng.randint(3, 7)))
+            for _ in range(3000)
+        }
+        for level in levels
+    }
+    TaskComplexityAnalyzer.load_rule_set({"indicators": indicators})
+    vocabulary = sorted(set().union(*indicators.values())) + ["zz", "qqqq"]
+    for _ in range(100):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(0, 40))]
+        scores = [sum(word in indicators[level] for word in words) for level in levels]
+        expected = levels[scores.index(max(scores))] if max(scores) else "simple"
+        assert TaskComplexityAnalyzer.analyze_complexity(" ".join(words)) == expected
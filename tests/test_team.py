@@ -1,8 +1,13 @@
 """Tests for the Team class."""
 
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
-from dynoagent import DynoAgent, Team
+from dynoagent import DynoAgent, DynoAgentWithTools, Team, TokenBudgetEstimator
 
 
 def test_team_initialization(basic_team, team_agents):
@@ -53,3 +58,511 @@ def test_team_circular_dependency_detection(team_agents):
                 "agent2": ["agent1"],  # Creates a cycle
             },
         )
+
+
+def test_team_incremental_add_agent_matches_full_rebuild():
+    """Test that incremental add_agent produces the same plan as a full rebuild."""
+
+    def build(incremental):
+        team = Team(
+            "IncrementalTeam",
+            [DynoAgent("loader", "loader", ["loading"], "load_data")],
+            incremental=incremental,
+        )
+        team.agents[0].register_tool("parse", lambda x: x)
+        team.add_agent(DynoAgent("parser", "parser", ["parsing"], "parse_input"))
+        team.add_agent(
+            DynoAgent("indexer", "indexer", ["indexing"], "index_data"),
+            dependencies=["parser"],
+        )
+        team.add_agent(
+            DynoAgent("reporter", "reporter", ["reporting"], "report"),
+            dependencies=["loader"],
+        )
+        return team
+
+    full = build(incremental=False)
+    incremental = build(incremental=True)
+    assert [set(level) for level in incremental.execution_plan] == [
+        set(level) for level in full.execution_plan
+    ]
+    assert set(incremental.dependency_graph.edges) == set(full.dependency_graph.edges)
+    assert incremental.execution_plan == [
+        ["loader"],
+        ["parser", "reporter"],
+        ["indexer"],
+    ]
+
+
+def test_team_incremental_add_agent_updates_downstream_levels():
+    """Test that edges from a new agent to existing agents push them down a level."""
+    consumer = DynoAgent("consumer", "consumer", ["consuming"], "use the fetch tool")
+    team = Team("IncrementalTeam", [consumer], incremental=True)
+    provider = DynoAgent(
+        "provider", "provider", ["providing"], "provide", tools_dataloaders={}
+    )
+    provider.register_tool("fetch", lambda: None)
+    team.add_agent(provider)
+    assert team.execution_plan == [["provider"], ["consumer"]]
+
+
+def test_team_incremental_add_agent_cycle_rolls_back():
+    """Test that a new agent creating a cycle is rejected and removed."""
+    first = DynoAgent("first", "first", ["one"], "needs alpha")
+    first.register_tool("beta", lambda: None)
+    team = Team("IncrementalTeam", [first], incremental=True)
+
+    second = DynoAgent("second", "second", ["two"], "needs beta")
+    second.register_tool("alpha", lambda: None)
+    with pytest.raises(ValueError):
+        team.add_agent(second)
+
+    assert "second" not in team.agent_map
+    assert "second" not in team.dependency_graph
+    assert team.execution_plan == [["first"]]
+
+
+def test_team_add_agents_bulk():
+    """Test adding several agents at once with in-batch dependencies."""
+    team = Team("BulkTeam", [DynoAgent("a", "r", ["s"], "g")], incremental=True)
+    team.add_agents(
+        [DynoAgent("b", "r", ["s"], "g"), DynoAgent("c", "r", ["s"], "g")],
+        dependencies={"b": ["a"], "c": ["b"]},
+    )
+    assert team.execution_plan == [["a"], ["b"], ["c"]]
+
+    with pytest.raises(ValueError):
+        team.add_agents([DynoAgent("d", "r", ["s"], "g")], {"d": ["missing"]})
+    assert "d" not in team.agent_map
+
+
+def test_team_add_agents_rejects_duplicate_names():
+    """Test that duplicate names are rejected before the team is changed."""
+    team = Team("BulkTeam", [DynoAgent("a", "r", ["s"], "g")], incremental=True)
+    team.add_agents([DynoAgent("b", "r", ["s"], "g")], dependencies={"b": ["a"]})
+    existing = team.agent_map["a"]
+
+    with pytest.raises(ValueError, match="already in the team"):
+        team.add_agents([DynoAgent("c", "r", ["s"], "g"), DynoAgent("a", "r", [], "g")])
+    with pytest.raises(ValueError, match="already in the team"):
+        team.add_agents([DynoAgent("d", "r", ["s"], "g"), DynoAgent("d", "r", [], "g")])
+    with pytest.raises(ValueError, match="already in the team"):
+        team.add_agent(DynoAgent("b", "r", ["s"], "g"))
+
+    assert team.agent_map["a"] is existing
+    assert [agent.name for agent in team.agents] == ["a", "b"]
+    assert team.dependency_graph.has_edge("a", "b")
+    assert team.execution_plan == [["a"], ["b"]]
+
+
+def test_team_dependency_inference_matches_pairwise_checks():
+    """Test that indexed dependency inference finds the same edges as pairwise checks."""
+
+    class Report:
+        pass
+
+    class Dataset:
+        pass
+
+    agents = [
+        DynoAgent("fetcher", "data provider", ["Dataset Loading"], "fetch"),
+        DynoAgent("cleaner", "cleaner", ["cleaning"], "clean with scrape results"),
+        DynoAgent("writer", "report writer", ["writing"], "write"),
+        DynoAgent(
+            "reviewer",
+            "reviewer",
+            ["reviewing"],
+            "review",
+            input_dependencies=[Report(), Dataset()],
+        ),
+        DynoAgent("scrape_bot", "scraper", ["scraping"], "scrape pages"),
+    ]
+    agents[0].register_tool("scrape", lambda: None)
+    agents[2].register_tool("clean", lambda: None)
+    team = Team("InferenceTeam", agents)
+
+    expected = Team("PairwiseTeam")
+    for agent in agents:
+        expected.dependency_graph.add_node(agent.name)
+    for provider in agents:
+        for consumer in agents:
+            if provider != consumer:
+                expected._check_tool_dependencies(provider, consumer)
+                expected._check_input_dependencies(provider, consumer)
+
+    assert set(team.dependency_graph.edges) == set(expected.dependency_graph.edges)
+    assert ("fetcher", "reviewer") in team.dependency_graph.edges
+    assert ("fetcher", "scrape_bot") in team.dependency_graph.edges
+
+
+def test_team_circular_dependency_reports_cycle_path():
+    """Test that the reported cycle names the offending agents in order."""
+    agents = [DynoAgent(f"agent{i}", "role", ["skill"], "goal") for i in range(4)]
+    with pytest.raises(ValueError, match="agent0 -> agent1 -> agent2 -> agent0"):
+        Team(
+            "CycleTeam",
+            agents,
+            explicit_dependencies={
+                "agent1": ["agent0"],
+                "agent2": ["agent1"],
+                "agent0": ["agent2"],
+            },
+        )
+
+
+class GatedAgent(DynoAgent):
+    """Agent that signals when it starts and can wait for another agent to start."""
+
+    def __init__(self, name, waits_for=None):
+        super().__init__(name, "worker", ["work"], "g")
+        self.started = threading.Event()
+        self.waits_for = waits_for
+        self.saw_start = None
+
+    def perform_task(self, task, context=None):
+        self.started.set()
+        if self.waits_for is not None:
+            self.saw_start = self.waits_for.started.wait(timeout=5)
+        return super().perform_task(task, context)
+
+
+@pytest.mark.asyncio
+async def test_team_execute_parallel_dataflow_scheduling():
+    """Test that dataflow scheduling starts agents as soon as their inputs are ready."""
+    fast = GatedAgent("fast")
+    follower = GatedAgent("follower")
+    # The slow agent only finishes once the follower has started, which level by
+    # level scheduling would only allow after the slow agent's level is done
+    slow = GatedAgent("slow", waits_for=follower)
+    team = Team(
+        "SkewedTeam",
+        [slow, fast, follower],
+        explicit_dependencies={"follower": ["fast"]},
+    )
+
+    results = await team.execute_parallel(scheduling="dataflow")
+
+    assert set(results) == {"slow", "fast", "follower"}
+    assert slow.saw_start
+
+    with pytest.raises(ValueError):
+        await team.execute_parallel(scheduling="unknown")
+
+
+class CountingAgent(DynoAgent):
+    """Agent that records how many agents of its kind run at the same time."""
+
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def perform_task(self, task, context=None):
+        with CountingAgent.lock:
+            CountingAgent.running += 1
+            CountingAgent.peak = max(CountingAgent.peak, CountingAgent.running)
+        time.sleep(0.02)
+        with CountingAgent.lock:
+            CountingAgent.running -= 1
+        return super().perform_task(task, context)
+
+
+class CoroutineAgent(DynoAgent):
+    """Agent whose perform_task is a coroutine."""
+
+    async def perform_task(self, task, context=None):
+        await asyncio.sleep(0.01)
+        return f"{self.name} awaited {task}"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scheduling", ["levels", "dataflow"])
+async def test_team_max_concurrency(scheduling):
+    """Test that no more than max_concurrency agents run at once."""
+    CountingAgent.peak = 0
+    agents = [CountingAgent(f"agent{i}", "worker", ["work"], "g") for i in range(12)]
+    team = Team("BoundedTeam", agents, max_concurrency=3)
+    results = await team.execute_parallel(scheduling=scheduling)
+    assert len(results) == 12
+    assert CountingAgent.peak <= 3
+
+
+@pytest.mark.asyncio
+async def test_team_executors():
+    """Test running agents on the event loop, a process pool and a custom executor."""
+    agents = [
+        CoroutineAgent("coroutine", "worker", ["work"], "g"),
+        DynoAgent("process", "worker", ["work"], "g"),
+        DynoAgent("custom", "worker", ["work"], "g"),
+        DynoAgent("thread", "worker", ["work"], "g"),
+    ]
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        team = Team(
+            "ExecutorTeam",
+            agents,
+            executor="async",
+            agent_executors={"process": "process", "custom": pool, "thread": "thread"},
+        )
+        try:
+            results = await team.execute_parallel()
+        finally:
+            team.shutdown()
+
+    assert results["coroutine"] == "coroutine awaited Execute coroutine"
+    assert results["process"] == "process executed Execute process with role: worker"
+    assert results["custom"] == "custom executed Execute custom with role: worker"
+    assert results["thread"] == "thread executed Execute thread with role: worker"
+    # The process pool works on a copy of the agent
+    assert len(agents[1].history) == 0
+    assert len(agents[2].history) == 1
+
+
+def _lookup_tool(table):
+    return {"table": table}
+
+
+@pytest.mark.asyncio
+async def test_team_process_executor_with_tools_agent():
+    """Test that agents holding caches, locks and indexes run in a process pool."""
+    agent = DynoAgentWithTools(
+        "indexer",
+        "Researcher",
+        ["research"],
+        "g",
+        auto_parameters=True,
+        token_budget=TokenBudgetEstimator(),
+        segment_size=4,
+    )
+    agent.index_documents([f"document {i}" for i in range(10)])
+    agent.query_index("document 3")
+    agent.register_tool("lookup", _lookup_tool, cache=True)
+    agent.use_tool("lookup", "orders")
+    agent.get_document_summaries()
+    history_length = len(agent.history)
+
+    with Team("ProcessTeam", [agent], executor="process") as team:
+        results = await team.execute_parallel()
+    assert results["indexer"]["metrics"]["complexity"] == "complex"
+    # The process pool works on a copy of the agent
+    assert len(agent.history) == history_length
+
+
+def test_team_invalid_executor_configuration(team_agents):
+    """Test that invalid executor settings are rejected."""
+    with pytest.raises(ValueError):
+        Team("BadTeam", team_agents, executor="gpu")
+    with pytest.raises(ValueError):
+        Team("BadTeam", team_agents, max_concurrency=0)
+    team = Team("Team", team_agents)
+    with pytest.raises(ValueError):
+        team.set_agent_executor("missing", "thread")
+
+
+class NativeAsyncAgent(DynoAgent):
+    """Agent implementing perform_task_async natively."""
+
+    async def perform_task_async(self, task, context=None):
+        self.thread_id = threading.get_ident()
+        await asyncio.sleep(0.05)
+        return f"{self.name} finished {task}"
+
+
+class GatheringAgent(DynoAgent):
+    """Async agent that waits until a number of agents of its kind run at once."""
+
+    running = 0
+    peak = 0
+    gathered = None
+    target = 0
+
+    async def perform_task_async(self, task, context=None):
+        cls = GatheringAgent
+        cls.running += 1
+        cls.peak = max(cls.peak, cls.running)
+        if cls.running >= cls.target:
+            cls.gathered.set()
+        await asyncio.wait_for(cls.gathered.wait(), timeout=10)
+        cls.running -= 1
+        return f"{self.name} finished {task}"
+
+    @classmethod
+    def reset(cls, target):
+        cls.running = cls.peak = 0
+        cls.gathered = asyncio.Event()
+        cls.target = target
+
+
+@pytest.mark.asyncio
+async def test_team_awaits_native_async_agents():
+    """Test that agents overriding perform_task_async run on the event loop."""
+    agents = [NativeAsyncAgent(f"agent{i}", "io", ["io"], "g") for i in range(20)]
+    results = await Team("AsyncTeam", agents).execute_parallel()
+
+    assert results["agent0"] == "agent0 finished Execute agent0"
+    assert {agent.thread_id for agent in agents} == {threading.get_ident()}
+    assert Team._has_native_async(agents[0])
+    assert not Team._has_native_async(DynoAgent("plain", "r", ["s"], "g"))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_concurrency", [None, 50])
+async def test_team_native_async_agents_run_concurrently(max_concurrency):
+    """Test that thousands of async agents all run at once, up to the limit."""
+    limit = max_concurrency or 2000
+    GatheringAgent.reset(target=limit)
+    agents = [GatheringAgent(f"agent{i}", "io", ["io"], "g") for i in range(2000)]
+    team = Team("AsyncTeam", agents, max_concurrency=max_concurrency)
+
+    results = await team.execute_parallel()
+
+    assert len(results) == 2000
+    assert GatheringAgent.peak == limit
+
+
+def test_team_execute_optimal_is_synchronous(team_agents):
+    """Test that execute_optimal always returns results and reuses its event loop."""
+    team = Team("OptimalTeam", team_agents)
+    assert len(team.execution_plan) == 1
+
+    try:
+        results = team.execute_optimal()
+        assert set(results) == {"agent1", "agent2"}
+        runner = team._runner
+        loop = runner.get_loop()
+        team.execute_optimal()
+        assert team._runner is runner
+        assert runner.get_loop() is loop
+    finally:
+        team.shutdown()
+    assert team._runner is None
+
+
+@pytest.mark.asyncio
+async def test_team_execute_optimal_async(team_agents):
+    """Test the async variant and that the sync one refuses a running loop."""
+    team = Team("OptimalTeam", team_agents)
+    results = await team.execute_optimal_async()
+    assert set(results) == {"agent1", "agent2"}
+    with pytest.raises(RuntimeError):
+        team.execute_optimal()
+
+
+def test_team_context_manager_releases_event_loop(team_agents):
+    """Test that leaving the team's context closes the event loop it created."""
+    with Team("OptimalTeam", team_agents) as team:
+        team.execute_optimal()
+        loop = team._runner.get_loop()
+    assert team._runner is None
+    assert loop.is_closed()
+
+
+@pytest.mark.asyncio
+async def test_team_execute_optimal_async_sequential_does_not_block_loop():
+    """Test that a sequential run leaves the caller's event loop responsive."""
+
+    loop_ran = threading.Event()
+
+    class WaitingAgent(DynoAgent):
+        def perform_task(self, task, context=None):
+            # Only the event loop sets the event, so this waits in vain if the
+            # sequential run blocks the loop
+            self.saw_loop = loop_ran.wait(timeout=5)
+            return self.name
+
+    agents = [WaitingAgent(f"slow{i}", "worker", ["work"], "g") for i in range(3)]
+    team = Team(
+        "ChainTeam",
+        agents,
+        explicit_dependencies={"slow1": ["slow0"], "slow2": ["slow1"]},
+    )
+    assert team._choose_strategy() == "sequential"
+
+    async def signal():
+        await asyncio.sleep(0)
+        loop_ran.set()
+
+    signaller = asyncio.create_task(signal())
+    results = await team.execute_optimal_async()
+    await signaller
+    assert set(results) == {"slow0", "slow1", "slow2"}
+    assert all(agent.saw_loop for agent in agents)
+
+
+def test_team_optimal_strategy_uses_measured_costs():
+    """Test that measured agent costs decide the execution strategy."""
+    agents = [DynoAgent(f"agent{i}", "worker", ["work"], "g") for i in range(4)]
+    team = Team("CostTeam", agents)
+    # Shape alone favors parallel execution for a single wide level
+    assert team._choose_strategy() == "parallel"
+
+    team.execute_sequential()
+    assert set(team.agent_costs) == {agent.name for agent in agents}
+    team.agent_costs = {agent.name: 1e-6 for agent in agents}
+    assert team._choose_strategy() == "sequential"
+
+    team.agent_costs = {agent.name: 0.5 for agent in agents}
+    assert team._choose_strategy() == "parallel"
+
+
+class RetrievingAgent(DynoAgentWithTools):
+    """Agent that queries its index while performing a task."""
+
+    def perform_task(self, task, context=None):
+        return self.query_index(f"{self.name} topic", k=2)
+
+
+def test_team_coalesces_queries_of_agents_sharing_an_index():
+    """Test that parallel agents sharing an index have their queries batched."""
+    agents = [
+        RetrievingAgent(f"retriever{i}", "retriever", [], f"find topic {i}")
+        for i in range(12)
+    ]
+    agents[0].index_documents([f"retriever{i} topic" for i in range(12)])
+    batches = []
+    index = agents[0].index
+    search_batch = index.search_batch
+
+    def recording_search_batch(queries, k):
+        batches.append(len(queries))
+        return search_batch(queries, k)
+
+    index.search_batch = recording_search_batch
+    for agent in agents[1:]:
+        agent.index = index
+
+    team = Team("RetrievalTeam", agents, coalesce_queries=True, query_window=0.05)
+    results = asyncio.run(team.execute_parallel())
+
+    assert sum(batches) == 12
+    assert len(batches) < 12
+    assert all(
+        results[f"retriever{i}"][0]["text"] == f"retriever{i} topic" for i in range(12)
+    )
+    # Coalescing only lasts for the execution
+    assert all(agent.query_coalescer is None for agent in agents)
+    assert agents[0].query_index("retriever3 topic", k=1)[0]["id"] == 3
+
+
+def test_team_keeps_query_coalescers_set_by_the_user():
+    """Test that the team only replaces and resets coalescers it attached."""
+    own, shared = [
+        DynoAgentWithTools(f"agent{i}", "retriever", [], "g") for i in range(2)
+    ]
+    own.index_documents(["a document"])
+    shared.index = own.index
+    user_coalescer = object()
+    own.query_coalescer = user_coalescer
+    attached = []
+
+    class RecordingAgent(DynoAgentWithTools):
+        def perform_task(self, task, context=None):
+            attached.append((own.query_coalescer, shared.query_coalescer))
+            return task
+
+    recorder = RecordingAgent("recorder", "observer", [], "g")
+    team = Team("RetrievalTeam", [own, shared, recorder], coalesce_queries=True)
+    asyncio.run(team.execute_parallel())
+
+    assert attached[0][0] is user_coalescer
+    assert attached[0][1] is not None
+    assert own.query_coalescer is user_coalescer
+    assert shared.query_coalescer is None
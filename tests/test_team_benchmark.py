@@ -0,0 +1,176 @@
+"""
+Benchmarks for building and running execution plans of large teams.
+
+The plans built for large teams are always checked; the timing limits only run
+with --run-benchmarks, since they depend on the speed of the machine.
+"""
+
+import asyncio
+import random
+import time
+
+import networkx as nx
+import pytest
+
+from dynoagent import DynoAgent, Team
+
+NUM_AGENTS = 10_000
+
+
+def _legacy_execution_plan(graph):
+    """Level assignment as computed by the original quadratic algorithm."""
+    topo_sort = list(nx.topological_sort(graph))
+    plan = []
+    visited = set()
+    for agent_name in topo_sort:
+        if agent_name in visited:
+            continue
+        level = set()
+        for node in topo_sort:
+            if node in visited:
+                continue
+            if all(pred in visited for pred in graph.predecessors(node)):
+                level.add(node)
+        plan.append(level)
+        visited.update(level)
+    return plan
+
+
+def _build_team(edges):
+    """Build a team of NUM_AGENTS agents and add the given edges to its graph."""
+    agents = [
+        DynoAgent(f"agent{i}", "worker", ["work"], "g") for i in range(NUM_AGENTS)
+    ]
+    start = time.perf_counter()
+    team = Team("BenchmarkTeam", agents)
+    construction = time.perf_counter() - start
+
+    team.dependency_graph.add_edges_from(edges)
+    start = time.perf_counter()
+    team._create_execution_plan()
+    planning = time.perf_counter() - start
+    return team, construction, planning
+
+
+def test_execution_plan_matches_legacy_levels():
+    """Test that the plan levels are identical to the original algorithm."""
+    rng = random.Random(42)
+    for _ in range(20):
+        team = Team("RandomTeam")
+        for i in range(40):
+            team.dependency_graph.add_node(f"n{i}")
+        for _ in range(80):
+            a, b = sorted(rng.sample(range(40), 2))
+            team.dependency_graph.add_edge(f"n{a}", f"n{b}")
+        team._create_execution_plan()
+        assert [set(level) for level in team.execution_plan] == (
+            _legacy_execution_plan(team.dependency_graph)
+        )
+
+
+def _chain_edges():
+    return [(f"agent{i}", f"agent{i + 1}") for i in range(NUM_AGENTS - 1)]
+
+
+def _wide_dag_edges():
+    """Edges of a DAG of 10 wide layers, each node depending on 3 of the last layer."""
+    width = NUM_AGENTS // 10
+    rng = random.Random(0)
+    edges = []
+    for i in range(width, NUM_AGENTS):
+        layer_start = (i // width - 1) * width
+        for parent in rng.sample(range(layer_start, layer_start + width), 3):
+            edges.append((f"agent{parent}", f"agent{i}"))
+    return edges
+
+
+def _build_explicit_team():
+    """Build a team whose explicit dependencies all run against the initial order."""
+    num_agents = 2 * NUM_AGENTS
+    agents = [
+        DynoAgent(f"agent{i}", "worker", ["work"], "g") for i in range(num_agents)
+    ]
+    # Each agent depends on the next two, so every edge runs against the initial order
+    explicit_dependencies = {
+        f"agent{i}": [f"agent{j}" for j in range(i + 1, min(i + 3, num_agents))]
+        for i in range(num_agents)
+    }
+    start = time.perf_counter()
+    team = Team("ExplicitTeam", agents, explicit_dependencies=explicit_dependencies)
+    return team, time.perf_counter() - start
+
+
+def test_chain_execution_plan():
+    """Test the plan of a 10k-node dependency chain."""
+    team, _, _ = _build_team(_chain_edges())
+    assert len(team.execution_plan) == NUM_AGENTS
+    assert team.execution_plan[-1] == [f"agent{NUM_AGENTS - 1}"]
+
+
+def test_wide_dag_execution_plan():
+    """Test the plan of a 10k-node DAG of 10 wide layers."""
+    team, _, _ = _build_team(_wide_dag_edges())
+    assert len(team.execution_plan) == 10
+    assert all(len(level) == NUM_AGENTS // 10 for level in team.execution_plan)
+
+
+def test_explicit_dependency_execution_plan():
+    """Test the plan of a team with tens of thousands of explicit dependencies."""
+    team, _ = _build_explicit_team()
+    assert len(team.execution_plan) == 2 * NUM_AGENTS
+    assert team.execution_plan[0] == [f"agent{2 * NUM_AGENTS - 1}"]
+
+
+@pytest.mark.benchmark
+def test_benchmark_chain_construction():
+    """Benchmark plan construction for a 10k-node dependency chain."""
+    _, construction, planning = _build_team(_chain_edges())
+    print(
+        f"\nchain: {NUM_AGENTS} agents, construction {construction:.3f}s, "
+        f"execution plan {planning:.3f}s"
+    )
+    assert planning < 10
+
+
+@pytest.mark.benchmark
+def test_benchmark_wide_dag_construction():
+    """Benchmark plan construction for a 10k-node DAG of 10 wide layers."""
+    edges = _wide_dag_edges()
+    _, construction, planning = _build_team(edges)
+    print(
+        f"\nwide DAG: {NUM_AGENTS} agents, {len(edges)} edges, "
+        f"construction {construction:.3f}s, execution plan {planning:.3f}s"
+    )
+    assert planning < 10
+
+
+@pytest.mark.benchmark
+def test_benchmark_explicit_dependency_construction():
+    """Benchmark construction with tens of thousands of explicit dependencies."""
+    team, construction = _build_explicit_team()
+    print(
+        f"\nexplicit: {len(team.agents)} agents, "
+        f"{team.dependency_graph.number_of_edges()} edges, "
+        f"construction {construction:.3f}s"
+    )
+    assert construction < 30
+
+
+class _SleepingAsyncAgent(DynoAgent):
+    """Agent waiting on I/O natively on the event loop."""
+
+    async def perform_task_async(self, task, context=None):
+        await asyncio.sleep(0.05)
+        return task
+
+
+@pytest.mark.benchmark
+def test_benchmark_native_async_agents():
+    """Benchmark running 2000 agents that each wait 50ms on the event loop."""
+    agents = [_SleepingAsyncAgent(f"agent{i}", "io", ["io"], "g") for i in range(2000)]
+    team = Team("AsyncTeam", agents)
+    start = time.perf_counter()
+    results = asyncio.run(team.execute_parallel())
+    elapsed = time.perf_counter() - start
+    print(f"\nnative async: {len(results)} agents in {elapsed:.3f}s")
+    assert elapsed < 2
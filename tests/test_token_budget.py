@@ -0,0 +1,81 @@
+"""Tests for the TokenBudgetEstimator class."""
+
+import json
+import pickle
+
+import pytest
+
+from dynoagent import TaskComplexityAnalyzer, TokenBudgetEstimator
+
+
+def test_estimate_falls_back_to_fixed_estimates():
+    """Test that fixed estimates are used until enough usage is observed."""
+    estimator = TokenBudgetEstimator(min_observations=5)
+    assert estimator.estimate("complex") == 2000
+    assert estimator.estimate("simple", with_references=True) == (
+        TaskComplexityAnalyzer.estimate_token_needs("simple", with_references=True)
+    )
+    for tokens in range(4):
+        estimator.record("simple", 50, 100 + tokens)
+    assert estimator.estimate("simple", 50) == 500
+
+
+def test_estimate_learns_per_level_and_length_bucket():
+    """Test that estimates come from the most specific group with enough data."""
+    estimator = TokenBudgetEstimator(length_buckets=(100, 1000), min_observations=10)
+    for tokens in range(1, 101):
+        estimator.record("medium", 80, tokens)
+    for tokens in range(1, 11):
+        estimator.record("medium", 5000, tokens * 100)
+
+    assert estimator.observation_count("medium") == 110
+    assert 90 <= estimator.estimate("medium", 80) <= 100
+    assert 500 <= estimator.estimate("medium", 5000) <= 1000
+    # No observations for this bucket, so the level as a whole is used
+    assert estimator.estimate("medium", 500) == estimator.estimate("medium")
+    # Other levels still use fixed estimates
+    assert estimator.estimate("creative", 80) == 1500
+
+
+def test_save_and_load_round_trip(tmp_path):
+    """Test atomic saving and loading at construction."""
+    path = tmp_path / "budgets.json"
+    estimator = TokenBudgetEstimator(str(path), min_observations=3)
+    for tokens in (300, 320, 340, 360, 380, 400, 420):
+        estimator.record("complex", 1200, tokens)
+    estimator.save()
+    assert json.loads(path.read_text())["version"] == 1
+    assert list(tmp_path.iterdir()) == [path]
+
+    loaded = TokenBudgetEstimator(str(path), min_observations=3)
+    assert loaded.estimate("complex", 1200) == estimator.estimate("complex", 1200)
+    assert loaded.observation_count("complex") == 7
+
+    with pytest.raises(ValueError):
+        TokenBudgetEstimator(str(path), quantile=0.5)
+
+
+def test_pickled_estimator_keeps_observations():
+    """Test that a copy of an estimator has the observations and its own lock."""
+    estimator = TokenBudgetEstimator(min_observations=3)
+    for tokens in (300, 320, 340):
+        estimator.record("complex", 1200, tokens)
+    copy = pickle.loads(pickle.dumps(estimator))
+    assert copy.estimate("complex", 1200) == estimator.estimate("complex", 1200)
+    copy.record("complex", 1200, 5000)
+    assert copy.observation_count("complex") == 4
+    assert estimator.observation_count("complex") == 3
+
+
+def test_invalid_arguments():
+    """Test validation of configuration and observations."""
+    with pytest.raises(ValueError):
+        TokenBudgetEstimator(quantile=1.5)
+    with pytest.raises(ValueError):
+        TokenBudgetEstimator(length_buckets=(500, 100))
+    with pytest.raises(ValueError):
+        TokenBudgetEstimator(min_observations=0)
+    with pytest.raises(ValueError):
+        TokenBudgetEstimator().record("impossible", 10, 10)
+    with pytest.raises(ValueError):
+        TokenBudgetEstimator().save()
@@ -0,0 +1,173 @@
+"""Tests for the ToolCache class."""
+
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+import pytest
+
+from dynoagent.tool_cache import ToolCache, _digest
+
+
+def _counting_tool(calls):
+    def tool(*args, **kwargs):
+        calls.append((args, kwargs))
+        return {"args": args, "kwargs": kwargs}
+
+    return tool
+
+
+def test_results_are_memoized_per_arguments():
+    """Test memoization keyed by arguments, in any keyword order."""
+    calls = []
+    tool = _counting_tool(calls)
+    cache = ToolCache(maxsize=2)
+
+    first = cache.call(tool, "a", limit=1, fields="x")
+    assert cache.call(tool, "a", fields="x", limit=1) is first
+    cache.call(tool, "b")
+    cache.call(tool, "c")  # Evicts the least recently used call, "a"
+    cache.call(tool, "a", limit=1, fields="x")
+    assert len(calls) == 4
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 4, 2)
+    assert stats["hit_rate"] == pytest.approx(0.2)
+
+
+def test_key_function_ttl_and_uncacheable_calls():
+    """Test custom keys, expiry and calls that cannot be keyed."""
+    calls = []
+    tool = _counting_tool(calls)
+    cache = ToolCache(ttl=0.05, key=lambda query, **options: query.lower())
+
+    cache.call(tool, "Users", verbose=True)
+    cache.call(tool, "USERS")
+    time.sleep(0.1)
+    cache.call(tool, "users")
+    assert len(calls) == 2
+
+    plain = ToolCache()
+    plain.call(tool, ["unhashable"])
+    plain.call(tool, ["unhashable"])
+    assert len(calls) == 4
+    assert plain.stats()["uncacheable"] == 2
+
+
+def test_errors_are_not_cached():
+    """Test that a failing call is retried on the next use."""
+    attempts = []
+
+    def flaky(x):
+        attempts.append(x)
+        if len(attempts) == 1:
+            raise RuntimeError("temporary failure")
+        return x * 2
+
+    cache = ToolCache()
+    with pytest.raises(RuntimeError):
+        cache.call(flaky, 2)
+    assert cache.call(flaky, 2) == 4
+    assert cache.call(flaky, 2) == 4
+    assert len(attempts) == 2
+    assert cache.stats()["errors"] == 1
+
+
+def test_disk_tier_survives_new_caches(tmp_path):
+    """Test that results stored on disk serve a fresh cache."""
+    path = str(tmp_path / "tools" / "schema.sqlite3")
+    calls = []
+    tool = _counting_tool(calls)
+
+    ToolCache(disk_path=path).call(tool, "orders")
+    cache = ToolCache(disk_path=path)
+    assert cache.call(tool, "orders") == {"args": ("orders",), "kwargs": {}}
+    assert cache.call(tool, "orders") == {"args": ("orders",), "kwargs": {}}
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+
+    cache.call(lambda: lambda: None)  # Unpicklable results stay in memory only
+    cache.clear()
+    assert cache.stats()["hits"] == 0
+    ToolCache(disk_path=path).call(tool, "orders")
+    assert len(calls) == 2
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    """Test that the disk tier keeps only the most recently stored results."""
+    path = str(tmp_path / "schema.sqlite3")
+    calls = []
+    tool = _counting_tool(calls)
+    cache = ToolCache(maxsize=2, disk_path=path)
+    for table in ("a", "b", "c", "d"):
+        cache.call(tool, table)
+    assert len(cache.disk) == 2
+
+    fresh = ToolCache(maxsize=2, disk_maxsize=3, disk_path=path)
+    fresh.call(tool, "d")
+    fresh.call(tool, "a")
+    assert len(calls) == 5  # "a" was evicted from disk, "d" was not
+    assert len(fresh.disk) == 3
+    with pytest.raises(ValueError):
+        ToolCache(disk_path=path, disk_maxsize=0)
+
+
+def test_disk_tier_deletes_expired_results(tmp_path):
+    """Test that expired results are removed from disk, not only ignored."""
+    path = str(tmp_path / "schema.sqlite3")
+    tool = _counting_tool([])
+    cache = ToolCache(ttl=0.05, disk_path=path)
+    cache.call(tool, "a")
+    cache.call(tool, "b")
+    time.sleep(0.1)
+
+    fresh = ToolCache(ttl=0.05, disk_path=path)
+    fresh.call(tool, "a")  # The expired row is deleted, then stored anew
+    assert len(fresh.disk) == 1
+    assert fresh.stats()["misses"] == 1
+    time.sleep(0.1)
+    fresh.disk.put("other", 1, None)
+    assert len(fresh.disk) == 1
+
+
+def test_pickled_cache_reopens_disk_tier(tmp_path):
+    """Test that a copy of a cache keeps its results and shares the disk tier."""
+    path = str(tmp_path / "schema.sqlite3")
+    calls = []
+    tool = _counting_tool(calls)
+    cache = ToolCache(disk_path=path)
+    cache.call(tool, "orders")
+
+    copy = pickle.loads(pickle.dumps(cache))
+    copy.call(tool, "orders")
+    copy.memory.clear()
+    copy.call(tool, "orders")
+    assert len(calls) == 1
+    assert copy.stats()["memory_hits"] == 1
+    assert copy.stats()["disk_hits"] == 1
+
+
+def test_disk_keys_are_stable_across_processes():
+    """Test that digests of set keys do not depend on the hash seed."""
+    key = (("tables", frozenset(f"table{i}" for i in range(20))), ())
+    script = (
+        "from dynoagent.tool_cache import _digest; "
+        "print(_digest((('tables', frozenset(f'table{i}' for i in range(20))), ())))"
+    )
+    digests = {
+        subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env={"PYTHONHASHSEED": seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        for seed in ("1", "2", "3")
+    }
+    assert digests == {_digest(key)}
+    assert _digest((True,)) != _digest((1,))
+    assert _digest((frozenset({1, 2}),)) == _digest((frozenset({2, 1}),))
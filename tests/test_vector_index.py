@@ -0,0 +1,213 @@
+"""Tests for the VectorIndex class."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from dynoagent.vector_index import HashingEmbedder, VectorIndex, document_text, top_k
+
+
+def _random_embedder(dim=32, seed=0):
+    """Embedder mapping each distinct text to a fixed random vector."""
+    rng = np.random.default_rng(seed)
+    cache = {}
+
+    def embed(texts):
+        for text in texts:
+            if text not in cache:
+                cache[text] = rng.normal(size=dim)
+        return np.array([cache[text] for text in texts])
+
+    return embed
+
+
+def test_hashing_embedder_is_normalized_and_stable():
+    """Test that embeddings are unit length and similar for shared words."""
+    embedder = HashingEmbedder(dim=64)
+    vectors = embedder(["red apples", "red apples and pears", "fast cars", ""])
+    assert vectors.shape == (4, 64)
+    assert np.allclose(np.linalg.norm(vectors[:3], axis=1), 1)
+    assert not vectors[3].any()
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+    assert np.array_equal(embedder(["red apples"])[0], vectors[0])
+
+
+def test_search_matches_brute_force():
+    """Test that search returns the exact top-k by cosine similarity."""
+    embedder = _random_embedder()
+    index = VectorIndex(embedder)
+    texts = [f"document {i}" for i in range(500)]
+    ids = index.add(texts[:200])
+    ids += index.add(
+        {"text": text, "metadata": {"n": i}} for i, text in enumerate(texts[200:])
+    )
+    assert ids == list(range(500))
+
+    vectors = embedder(texts)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query = embedder(["query"])[0]
+    expected = np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:10]
+
+    results = index.search("query", k=10)
+    assert [result["id"] for result in results] == list(expected)
+    assert results[0]["score"] >= results[-1]["score"]
+    assert results[0]["text"] == texts[results[0]["id"]]
+    assert len(index.search("query", k=1000)) == 500
+
+
+def test_ivf_search_has_high_recall():
+    """Test that partitioned search finds nearly all exact top-k results."""
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(20, 16))
+    points = centers[rng.integers(0, 20, 4000)] + 0.1 * rng.normal(size=(4000, 16))
+    lookup = {f"p{i}": point for i, point in enumerate(points)}
+    lookup.update({f"q{i}": center for i, center in enumerate(centers)})
+    index = VectorIndex(lambda texts: np.array([lookup[text] for text in texts]))
+    index.add(f"p{i}" for i in range(3000))
+
+    index.build_ivf(n_lists=40, n_probe=4)
+    # Documents added after partitioning are assigned to partitions too
+    index.add(f"p{i}" for i in range(3000, 4000))
+    approximate = [{r["id"] for r in index.search(f"q{i}", k=10)} for i in range(20)]
+    index.drop_ivf()
+    exact = [{r["id"] for r in index.search(f"q{i}", k=10)} for i in range(20)]
+    recall = np.mean([len(a & e) / 10 for a, e in zip(approximate, exact)])
+    assert recall >= 0.9
+
+
+def test_save_and_load(tmp_path):
+    """Test that a saved index, including partitions, loads identically."""
+    index = VectorIndex(HashingEmbedder(dim=32))
+    index.add(
+        [
+            {"text": f"note {i} about topic {i % 7}", "metadata": {"i": i}}
+            for i in range(50)
+        ]
+    )
+    index.build_ivf(n_lists=5, n_probe=2)
+    index.save(str(tmp_path / "index"))
+
+    loaded = VectorIndex.load(str(tmp_path / "index"), HashingEmbedder(dim=32))
+    assert len(loaded) == 50
+    assert loaded.search("topic 3", k=5) == index.search("topic 3", k=5)
+    loaded.add(["one more note"])
+    assert len(loaded) == 51
+
+
+def test_validation_and_helpers():
+    """Test argument validation, document parsing and top_k."""
+    index = VectorIndex(HashingEmbedder(dim=8))
+    assert index.search("anything") == []
+    with pytest.raises(ValueError):
+        index.build_ivf()
+    index.add(["text"])
+    with pytest.raises(ValueError):
+        index.search("text", k=0)
+    with pytest.raises(ValueError):
+        index.build_ivf(n_lists=2)
+
+    class Doc:
+        text = "body"
+        metadata = {"a": 1}
+
+    assert document_text(Doc()) == ("body", {"a": 1})
+    assert document_text({"content": "c"}) == ("c", {})
+    with pytest.raises(ValueError):
+        document_text({"metadata": {}})
+    assert list(top_k(np.array([0.1, 0.9, 0.5]), 2)) == [1, 2]
+
+
+def test_load_memory_maps_index_files(tmp_path):
+    """Test that embeddings, texts and metadata are mapped rather than read."""
+    path = str(tmp_path / "index")
+    index = VectorIndex(HashingEmbedder(dim=16))
+    index.add(
+        [
+            {"text": "naïve café ☕", "metadata": {"lang": "fr"}},
+            "plain text",
+            {"text": "", "metadata": {}},
+        ]
+    )
+    index.save(path)
+    assert sorted(os.listdir(path)) == [
+        "embeddings.npy",
+        "manifest.json",
+        "metadata.bin",
+        "metadata_offsets.npy",
+        "texts.bin",
+        "texts_offsets.npy",
+    ]
+
+    mapped = VectorIndex.load(path, HashingEmbedder(dim=16))
+    assert isinstance(mapped.vectors, np.memmap)
+    assert list(mapped.texts) == ["naïve café ☕", "plain text", ""]
+    assert mapped.metadata[0] == {"lang": "fr"}
+    assert mapped.metadata[-1] == {}
+    with pytest.raises(IndexError):
+        mapped.texts[3]
+
+    read = VectorIndex.load(path, HashingEmbedder(dim=16), mmap=False)
+    assert not isinstance(read.vectors, np.memmap)
+    assert read.search("café", k=3) == mapped.search("café", k=3)
+
+    # A mapped index can grow and be saved over the files it maps
+    mapped.add(["one more"])
+    mapped.save(path)
+    reloaded = VectorIndex.load(path, HashingEmbedder(dim=16))
+    assert list(reloaded.texts) == ["naïve café ☕", "plain text", "", "one more"]
+
+
+def test_load_rejects_unknown_or_inconsistent_files(tmp_path):
+    """Test validation of the manifest and blob sizes."""
+    path = tmp_path / "index"
+    index = VectorIndex(HashingEmbedder(dim=8))
+    index.add(["a", "b"])
+    index.save(str(path))
+
+    (path / "texts.bin").write_bytes(b"abc")
+    with pytest.raises(ValueError):
+        VectorIndex.load(str(path))
+
+    manifest = json.loads((path / "manifest.json").read_text())
+    manifest["version"] = 99
+    (path / "manifest.json").write_text(json.dumps(manifest))
+    with pytest.raises(ValueError):
+        VectorIndex.load(str(path))
+
+
+def _assert_same_results(batch_results, single_results):
+    """Check results agree, allowing ties to be ordered differently."""
+    assert len(batch_results) == len(single_results)
+    for batch, single in zip(batch_results, single_results):
+        assert [r["score"] for r in batch] == pytest.approx(
+            [r["score"] for r in single], abs=1e-5
+        )
+        if single:
+            # Results scoring clearly above the last one are the same either way
+            cutoff = single[-1]["score"] + 1e-5
+            assert {r["id"] for r in batch if r["score"] > cutoff} == {
+                r["id"] for r in single if r["score"] > cutoff
+            }
+
+
+def test_search_batch_matches_individual_searches():
+    """Test that batched search gives the same results as one search per query."""
+    index = VectorIndex(HashingEmbedder(dim=64))
+    index.add(f"note {i} about topic {i % 13} and item {i % 7}" for i in range(300))
+    queries = ["topic 3", "item 5 topic 1", "nothing matches", "note 42"]
+
+    _assert_same_results(
+        index.search_batch(queries, k=7), [index.search(q, k=7) for q in queries]
+    )
+    assert index.search_batch([], k=3) == []
+    assert VectorIndex().search_batch(["a", "b"]) == [[], []]
+
+    index.build_ivf(n_lists=4, n_probe=4)
+    _assert_same_results(
+        index.search_batch(queries, k=5), [index.search(q, k=5) for q in queries]
+    )
+
+    scores = np.array([[0.1, 0.9, 0.5], [0.7, 0.2, 0.8]])
+    assert top_k(scores, 2).tolist() == [[1, 2], [2, 0]]